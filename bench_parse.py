@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+
+#
+# This file is part of Linux-on-LiteX-VexRiscv
+#
+# Copyright (c) 2019-2022, Linux-on-LiteX-VexRiscv Developers
+# SPDX-License-Identifier: BSD-2-Clause
+
+import re
+import sys
+import json
+import argparse
+
+# Benchmark Output Parser --------------------------------------------------------------------------
+#
+# Parses the console output of the on-target benchmarks (dhrystone-opt, membench-stream,
+# membench-memcpy, openssl-bench, packet-bench buildroot packages, and CoreMark), from a console
+# log of the simulation or hardware or from a headless run results file (sim.py --headless), into a
+# single schema: a list of results
+#   {"benchmark": str, "metric": str, "value": float, "unit": str, "params": {str: value}}
+# where params identify the run (block size, buffer size, VexRiscv AES build option...).
+
+DMIPS_REFERENCE = 1757 # Dhrystones per second of the VAX 11/780 (1 DMIPS).
+
+def result(benchmark, metric, value, unit, **params):
+    return {"benchmark": benchmark, "metric": metric, "value": float(value), "unit": unit, "params": params}
+
+def parse_dhrystone(text):
+    results = []
+    runs    = None
+    for line in text.splitlines():
+        m = re.search(r"Execution starts, (\d+) runs through Dhrystone", line)
+        if m:
+            runs = int(m.group(1))
+        m = re.search(r"Dhrystones per Second:\s+([\d.]+)", line)
+        if m:
+            dps = float(m.group(1))
+            results.append(result("dhrystone", "dhrystones_per_second", dps,                   "1/s",   runs=runs))
+            results.append(result("dhrystone", "dmips",                 dps/DMIPS_REFERENCE, "DMIPS", runs=runs))
+    return results
+
+def parse_coremark(text):
+    results = []
+    # One run per "CoreMark Size" report.
+    for run in re.split(r"^(?=CoreMark Size)", text, flags=re.M)[1:]:
+        rate = re.search(r"^Iterations/Sec\s*:\s*([\d.]+)", run, re.M)
+        if rate is None:
+            continue
+        iterations = re.search(r"^Iterations\s*:\s*(\d+)",             run, re.M)
+        time       = re.search(r"^Total time \(secs\)\s*:\s*([\d.]+)", run, re.M)
+        results.append(result("coremark", "iterations_per_second", rate.group(1), "1/s",
+            iterations = int(iterations.group(1)) if iterations else None,
+            time       = float(time.group(1)) if time else None,
+            valid      = "Correct operation validated" in run and "ERROR!" not in run))
+    return results
+
+def parse_stream(text):
+    results = []
+    words   = None
+    for line in text.splitlines():
+        m = re.match(r"Array size = (\d+) words", line)
+        if m:
+            words = int(m.group(1))
+        m = re.match(r"(Copy|Scale|Add|Triad):\s+([\d.]+)\s+[\d.]+\s+[\d.]+\s+[\d.]+\s*$", line)
+        if m and words is not None:
+            results.append(result("stream", m.group(1).lower(), m.group(2), "MB/s", words=words))
+    return results
+
+def parse_memcpy(text):
+    results = []
+    for line in text.splitlines():
+        m = re.match(r"(memcpy|memset)\s+(\d+)\s+([\d.]+)\s*$", line)
+        if m:
+            results.append(result("memcpy", m.group(1), m.group(3), "MB/s", size=int(m.group(2))))
+    return results
+
+def parse_openssl(text):
+    results = []
+    aes     = None
+    sizes   = None
+    for line in text.splitlines():
+        m = re.match(r"openssl-bench: vexriscv_aes=(\d)", line)
+        if m:
+            aes = bool(int(m.group(1)))
+            continue
+        # Table header: "type  16 bytes  64 bytes ...", values in 1000s of bytes per second.
+        if re.match(r"type(\s+\d+ bytes)+\s*$", line):
+            sizes = [int(s) for s in re.findall(r"(\d+) bytes", line)]
+            continue
+        if sizes is None:
+            continue
+        m = re.match(r"(\S.*?)((?:\s+[\d.]+k)+)\s*$", line)
+        if m is None:
+            sizes = None
+            continue
+        values = re.findall(r"([\d.]+)k", m.group(2))
+        for size, value in zip(sizes, values):
+            results.append(result("openssl", m.group(1).replace(" ", "-"), value, "kB/s",
+                block_size   = size,
+                vexriscv_aes = aes))
+    return results
+
+def parse_packet(text):
+    results = []
+    for m in re.finditer(r"packet-bench: threads=(\d+) packets=(\d+) time=[\d.]+ rate=([\d.]+) packets/s", text):
+        results.append(result("packet", "packets_per_second", m.group(3), "1/s",
+            threads = int(m.group(1)),
+            packets = int(m.group(2))))
+    return results
+
+parsers = [parse_dhrystone, parse_coremark, parse_stream, parse_memcpy, parse_openssl, parse_packet]
+
+def parse(text):
+    """Return the results of all the benchmark outputs found in text."""
+    results = []
+    for parser in parsers:
+        results += parser(text)
+    return results
+
+def load(filename):
+    """Return the console output of a log file or of a headless run results file."""
+    with open(filename, errors="replace") as f:
+        text = f.read()
+    try:
+        return "\n".join(json.loads(text)["output"])
+    except (ValueError, KeyError, TypeError):
+        return text
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse on-target benchmark outputs to JSON.")
+    parser.add_argument("files", nargs="+",                 help="Console logs or headless results files (- for stdin).")
+    parser.add_argument("--output", default=None,           help="JSON output file (default: stdout).")
+    parser.add_argument("--table",  action="store_true",    help="Print a results table instead of JSON.")
+    args = parser.parse_args()
+
+    results = []
+    for filename in args.files:
+        text = sys.stdin.read() if filename == "-" else load(filename)
+        for r in parse(text):
+            r["source"] = filename
+            results.append(r)
+
+    if args.table:
+        for r in results:
+            params = " ".join("{}={}".format(k, v) for k, v in r["params"].items())
+            print("{:10s} {:24s} {:14.2f} {:6s} {}".format(r["benchmark"], r["metric"], r["value"], r["unit"], params))
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+    elif not args.table:
+        print(json.dumps(results, indent=4))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+
+#
+# This file is part of Linux-on-LiteX-VexRiscv
+#
+# Copyright (c) 2019-2022, Linux-on-LiteX-VexRiscv Developers
+# SPDX-License-Identifier: BSD-2-Clause
+
+import os
+import sys
+import json
+import struct
+import argparse
+
+# Boot Image Layout --------------------------------------------------------------------------------
+#
+# Computes the main_ram layout of the boot images (boot.json) from their actual sizes: the kernel
+# at the main_ram base (OpenSBI FW_JUMP_ADDR), images with an address compiled in OpenSBI at their
+# fixed address (prebuilt OpenSBI: DTB at 0x40ef0000/FW_JUMP_FDT_ADDR, itself at 0x40f00000/
+# FW_TEXT_START), the others packed first-fit with their alignment. Checks for overlaps (the
+# kernel footprint includes its bss, from the RISC-V Image header) and reports the memory left.
+#
+# OpenSBI protects its firmware with a naturally aligned power-of-2 (NAPOT) PMP region: its
+# footprint is rounded up to a power of 2 and aligned on it, so no other image is in that region.
+
+KiB = 1024
+MiB = 1024*KiB
+
+# Default images order (boot.json, the BIOS/litex_term boot at the last image: OpenSBI).
+IMAGES = ["Image", "rv32.dtb", "rootfs.cpio", "opensbi.bin"]
+
+# Address alignments (kernel: PMD alignment for rv32 Linux, others: page).
+ALIGNMENTS = {"Image": 4*MiB}
+DEFAULT_ALIGNMENT = 4*KiB
+
+# Minimal footprints of the images (OpenSBI: firmware + per-hart scratch/stacks).
+RESERVES = {"opensbi.bin": 512*KiB}
+
+# Images protected by a NAPOT PMP region.
+NAPOT = ["opensbi.bin"]
+
+# Addresses compiled in the prebuilt OpenSBI (offsets from the main_ram base).
+PREBUILT_FIXED = {"rv32.dtb": 0xef0000, "opensbi.bin": 0xf00000}
+
+RISCV_IMAGE_MAGIC = b"RISCV\x00\x00\x00"
+
+def image_footprint(filename):
+    """Memory footprint of an image: file size, or the RISC-V Image header image_size (kernel with
+    its bss) when larger."""
+    size = os.path.getsize(filename)
+    with open(filename, "rb") as f:
+        header = f.read(64)
+    if len(header) == 64 and header[48:56] == RISCV_IMAGE_MAGIC:
+        image_size, = struct.unpack_from("<Q", header, 16)
+        size = max(size, image_size)
+    return size
+
+def align_up(value, alignment):
+    return (value + alignment - 1)//alignment*alignment
+
+def napot_size(size):
+    """Smallest power of 2 >= size."""
+    return 1 << max(size - 1, 0).bit_length()
+
+def compute_layout(sizes, ram_size, fixed={}, alignments={}, kernel="Image", napot=NAPOT):
+    """Return {name: (offset, size)} (offsets from the main_ram base, itself aligned on the NAPOT
+    regions) for the images sizes ({name: size}, in boot order). The kernel is placed at offset 0,
+    fixed images at their offsets, the others first-fit; the napot images footprints are their
+    NAPOT region. Raises ValueError on overlaps, misaligned NAPOT regions or if the images do not
+    fit."""
+    regions    = {}
+    sizes      = dict(sizes)
+    alignments = dict(alignments)
+    for name in napot:
+        if name in sizes:
+            sizes[name]      = napot_size(max(sizes[name], RESERVES.get(name, 0)))
+            alignments[name] = max(alignments.get(name, DEFAULT_ALIGNMENT), sizes[name])
+
+    def overlaps(offset, size):
+        return [n for n, (o, s) in regions.items() if offset < o + s and o < offset + size]
+
+    def place(name, offset):
+        size = sizes[name]
+        if name in napot and offset % size:
+            raise ValueError("{} at 0x{:x} is not aligned on its 0x{:x} bytes PMP region.".format(
+                name, offset, size))
+        collisions = overlaps(offset, size)
+        if collisions:
+            raise ValueError("{} [0x{:x}-0x{:x}] overlaps {}.".format(
+                name, offset, offset + size - 1, ", ".join(collisions)))
+        if offset + size > ram_size:
+            raise ValueError("{} [0x{:x}-0x{:x}] does not fit in main_ram (0x{:x} bytes).".format(
+                name, offset, offset + size - 1, ram_size))
+        regions[name] = (offset, size)
+
+    # Kernel and fixed images.
+    if kernel in sizes:
+        place(kernel, fixed.get(kernel, 0))
+    for name, offset in fixed.items():
+        if name in sizes and name not in regions:
+            place(name, offset)
+
+    # Others, first-fit.
+    for name in sizes:
+        if name in regions:
+            continue
+        alignment = alignments.get(name, DEFAULT_ALIGNMENT)
+        offset    = 0
+        while True:
+            offset     = align_up(offset, alignment)
+            collisions = overlaps(offset, sizes[name])
+            if not collisions:
+                break
+            offset = max(o + s for n, (o, s) in regions.items() if n in collisions)
+        place(name, offset)
+    return {name: regions[name] for name in sizes}
+
+def free_memory(layout, ram_size):
+    """Free memory (bytes) and largest free contiguous region (offset, size) of a layout."""
+    free    = ram_size - sum(s for o, s in layout.values())
+    largest = (0, 0)
+    end     = 0
+    for o, s in sorted(layout.values()) + [(ram_size, 0)]:
+        if o - end > largest[1]:
+            largest = (end, o - end)
+        end = max(end, o + s)
+    return free, largest
+
+def initrd_region(boot_json, ram_base):
+    """(offset from ram_base, size) of the initramfs of a boot.json, (None, None) if not found."""
+    if not os.path.exists(boot_json):
+        return None, None
+    with open(boot_json) as f:
+        images = json.load(f)
+    for name, base in images.items():
+        if os.path.basename(name).startswith("rootfs.cpio"):
+            filename = os.path.join(os.path.dirname(boot_json), name)
+            if os.path.exists(filename):
+                return int(base, 0) - ram_base, os.path.getsize(filename)
+    return None, None
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate boot.json from the boot images sizes.")
+    parser.add_argument("--csr-json",   default=None,                  help="SoC csr.json (main_ram base/size).")
+    parser.add_argument("--ram-base",   default=0x40000000, type=lambda x: int(x, 0), help="main_ram base (without --csr-json).")
+    parser.add_argument("--ram-size",   default=None,       type=lambda x: int(x, 0), help="main_ram size (without --csr-json).")
+    parser.add_argument("--images-dir", default="images",              help="Images directory.")
+    parser.add_argument("--images",     default=",".join(IMAGES),      help="Comma-separated images, in boot order (last booted).")
+    parser.add_argument("--fixed",      action="append", default=[],   help="Image at a fixed address: name=address (repeatable).")
+    parser.add_argument("--tight",      action="store_true",           help="No prebuilt OpenSBI fixed addresses (OpenSBI to rebuild).")
+    parser.add_argument("--output",     default=None,                  help="Output boot.json (default: IMAGES_DIR/boot.json).")
+    parser.add_argument("--check",      action="store_true",           help="Only check the existing boot.json.")
+    args = parser.parse_args()
+
+    # main_ram.
+    if args.csr_json is not None:
+        with open(args.csr_json) as f:
+            main_ram = json.load(f)["memories"]["main_ram"]
+        ram_base, ram_size = main_ram["base"], main_ram["size"]
+    elif args.ram_size is not None:
+        ram_base, ram_size = args.ram_base, args.ram_size
+    else:
+        parser.error("--csr-json or --ram-size required.")
+
+    # Image sizes (rootfs possibly compressed: rootfs.cpio.lz4...).
+    sizes = {}
+    for name in args.images.split(","):
+        if not os.path.exists(os.path.join(args.images_dir, name)):
+            candidates = sorted(f for f in os.listdir(args.images_dir) if f.startswith(name + "."))
+            if not candidates:
+                parser.error("{} not found in {}.".format(name, args.images_dir))
+            name = candidates[0]
+        footprint   = image_footprint(os.path.join(args.images_dir, name))
+        sizes[name] = max(footprint, RESERVES.get(name, 0))
+
+    # Fixed addresses.
+    fixed = {} if args.tight else {k: v for k, v in PREBUILT_FIXED.items()}
+    for f in args.fixed:
+        name, _, address = f.partition("=")
+        fixed[name] = int(address, 0) - ram_base
+    output = args.output or os.path.join(args.images_dir, "boot.json")
+    if args.check:
+        with open(output) as f:
+            fixed = {k: int(v, 0) - ram_base for k, v in json.load(f).items()}
+
+    try:
+        layout = compute_layout(sizes, ram_size, fixed=fixed, alignments=ALIGNMENTS)
+    except ValueError as e:
+        print("Invalid layout: {}".format(e), file=sys.stderr)
+        sys.exit(1)
+
+    # Report.
+    print("{:20s} {:>12s} {:>12s} {:>10s}".format("Image", "Start", "End", "Size(KiB)"))
+    for name, (offset, size) in sorted(layout.items(), key=lambda x: x[1][0]):
+        print("{:20s} {:>12s} {:>12s} {:10d}".format(name,
+            "0x{:08x}".format(ram_base + offset),
+            "0x{:08x}".format(ram_base + offset + size - 1),
+            size//KiB))
+    free, largest = free_memory(layout, ram_size)
+    print("main_ram: {} KiB, images: {} KiB, left for Linux: {} KiB (largest free region: {} KiB at 0x{:08x}).".format(
+        ram_size//KiB, (ram_size - free)//KiB, free//KiB, largest[1]//KiB, ram_base + largest[0]))
+    if "opensbi.bin" in layout and "opensbi.bin" not in fixed:
+        print("Rebuild OpenSBI with FW_TEXT_START=0x{:x} FW_JUMP_FDT_ADDR=0x{:x}.".format(
+            ram_base + layout["opensbi.bin"][0], ram_base + layout.get("rv32.dtb", (0, 0))[0]))
+
+    if not args.check:
+        with open(output, "w") as f:
+            json.dump({name: "0x{:08x}".format(ram_base + offset) for name, (offset, size) in layout.items()}, f, indent=4)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+
+#
+# This file is part of Linux-on-LiteX-VexRiscv
+#
+# Copyright (c) 2019-2022, Linux-on-LiteX-VexRiscv Developers
+# SPDX-License-Identifier: BSD-2-Clause
+
+import os
+import sys
+import json
+import zlib
+import shutil
+import struct
+import argparse
+import subprocess
+
+from boot_layout import KiB, MiB, RESERVES, image_footprint, compute_layout
+
+# Boot Images Packer -------------------------------------------------------------------------------
+#
+# Packs the boot.json images to reduce the Serial/TFTP load times:
+# - Kernel/OpenSBI: LZ4 blocks, loaded at staging addresses and decompressed to their boot addresses
+#   by the boot_unpack stub (last boot.json image, jumps to OpenSBI once done).
+# - Initramfs: zstd (or legacy LZ4) compressed, loaded at its boot address and decompressed by the
+#   kernel (CONFIG_RD_ZSTD/CONFIG_RD_LZ4). Already compressed rootfs (rootfs.cpio.lz4...) are kept.
+# - DTB: kept (generated per build).
+# All the images but the DTB are CRC32 checked by the stub before jumping to OpenSBI.
+
+PACK_MAGIC        = b"LXPK"
+PACK_VERSION      = 1
+PACK_TABLE_OFFSET = 16
+PACK_TABLE_SIZE   = 1024
+PACK_MAX_ENTRIES  = 24
+
+PACK_STORE = 0
+PACK_LZ4   = 1
+
+# Stub footprint (code, pack table, stack).
+STUB_RESERVE = 64*KiB
+
+# DTB footprint when not in the images directory (generated per build).
+DTB_RESERVE = 64*KiB
+
+# Legacy LZ4 format (lz4 -l) used by the kernel for the initramfs.
+LZ4_LEGACY_MAGIC      = 0x184c2102
+LZ4_LEGACY_BLOCK_SIZE = 8*MiB
+
+COMPRESSED_EXTENSIONS = (".gz", ".bz2", ".lzma", ".xz", ".lzo", ".lz4", ".zst")
+
+def lz4_block(data):
+    try:
+        import lz4.block
+    except ImportError:
+        raise RuntimeError("LZ4 compression requires the lz4 Python package (pip3 install lz4).")
+    return lz4.block.compress(data, mode="high_compression", compression=12, store_size=False)
+
+def lz4_legacy(data):
+    out = struct.pack("<I", LZ4_LEGACY_MAGIC)
+    for i in range(0, len(data), LZ4_LEGACY_BLOCK_SIZE):
+        block = lz4_block(data[i:i + LZ4_LEGACY_BLOCK_SIZE])
+        out  += struct.pack("<I", len(block)) + block
+    return out
+
+def zstd_frame(data):
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("zstd compression requires the zstandard Python package (pip3 install zstandard).")
+    return zstandard.ZstdCompressor(level=19).compress(data)
+
+rootfs_compressions = {
+    "zstd" : (".zst", zstd_frame),
+    "lz4"  : (".lz4", lz4_legacy),
+    "none" : ("",     lambda data: data),
+}
+
+def pack_table(entries, entry, fdt=0, uart_rxtx=0, uart_txfull=0):
+    """Pack table of the stub: header + entries (dicts with name, method, src, src_size, dst,
+    dst_size, crc32)."""
+    if len(entries) > PACK_MAX_ENTRIES:
+        raise ValueError("Too many images ({}, max {}).".format(len(entries), PACK_MAX_ENTRIES))
+    table = struct.pack("<4s7I", PACK_MAGIC, PACK_VERSION, len(entries), entry, fdt, uart_rxtx, uart_txfull, 0)
+    for e in entries:
+        table += struct.pack("<16s6I", e["name"].encode()[:16],
+            e["method"], e["src"], e["src_size"], e["dst"], e["dst_size"], e["crc32"])
+    return table.ljust(PACK_TABLE_SIZE, b"\x00")
+
+def patch_stub(stub, table):
+    """Stub binary with its pack table filled."""
+    if stub[PACK_TABLE_OFFSET:PACK_TABLE_OFFSET + 4] != PACK_MAGIC:
+        raise ValueError("Invalid boot_unpack stub (no pack table at 0x{:x}).".format(PACK_TABLE_OFFSET))
+    return stub[:PACK_TABLE_OFFSET] + table + stub[PACK_TABLE_OFFSET + PACK_TABLE_SIZE:]
+
+def pack_images(images, images_dir, output_dir, ram_base, ram_size, stub,
+    kernel_compression = "lz4",
+    rootfs_compression = "zstd",
+    uart_rxtx          = 0,
+    uart_txfull        = 0):
+    """Pack the images ({name: address}, boot.json order, last one booted) to output_dir and return
+    the packed boot.json ({name: address}, stub last)."""
+    names   = list(images)
+    entry   = int(images[names[-1]], 0)
+    fdt     = int(images["rv32.dtb"], 0) if "rv32.dtb" in images else 0
+    entries = []
+    boot    = {}
+    staged  = {}
+    inplace = set()
+    os.makedirs(output_dir, exist_ok=True)
+
+    for name in names:
+        address  = int(images[name], 0)
+        filename = os.path.join(images_dir, name)
+        # DTB: kept, not checked (generated per build).
+        if name == "rv32.dtb":
+            if os.path.exists(filename):
+                shutil.copy(filename, output_dir)
+            boot[name] = images[name]
+            continue
+        with open(filename, "rb") as f:
+            data = f.read()
+        # Initramfs: compressed for the kernel, at its boot address.
+        if name.startswith("rootfs.cpio"):
+            if not name.endswith(COMPRESSED_EXTENSIONS):
+                extension, compress = rootfs_compressions[rootfs_compression]
+                name, data = name + extension, compress(data)
+            with open(os.path.join(output_dir, name), "wb") as f:
+                f.write(data)
+            boot[name] = "0x{:08x}".format(address)
+            inplace.add(filename)
+            entries.append({"name": name, "method": PACK_STORE, "src": address, "src_size": len(data),
+                "dst": address, "dst_size": len(data), "crc32": zlib.crc32(data)})
+            continue
+        # Others: LZ4 compressed for the stub, at a staging address (or kept, at their boot address).
+        if kernel_compression == "none":
+            shutil.copy(filename, output_dir)
+            boot[name] = images[name]
+            inplace.add(filename)
+            entries.append({"name": name, "method": PACK_STORE, "src": address, "src_size": len(data),
+                "dst": address, "dst_size": len(data), "crc32": zlib.crc32(data)})
+            continue
+        packed = lz4_block(data)
+        with open(os.path.join(output_dir, name + ".lz4"), "wb") as f:
+            f.write(packed)
+        staged[name + ".lz4"] = len(entries)
+        entries.append({"name": name, "method": PACK_LZ4, "src": None, "src_size": len(packed),
+            "dst": address, "dst_size": len(data), "crc32": zlib.crc32(data)})
+
+    # Staging addresses: packed images and stub placed around the boot regions (images footprints).
+    sizes = {}
+    fixed = {}
+    for name in names:
+        filename = os.path.join(images_dir, name)
+        if name == "rv32.dtb":
+            sizes[name] = os.path.getsize(filename) if os.path.exists(filename) else DTB_RESERVE
+        elif filename in inplace:
+            continue
+        else:
+            sizes[name] = max(image_footprint(filename), RESERVES.get(name, 0))
+        fixed[name] = int(images[name], 0) - ram_base
+    for e in entries:
+        if e["src"] is not None:
+            sizes[e["name"]] = max(e["src_size"], RESERVES.get(e["name"], 0))
+            fixed[e["name"]] = e["src"] - ram_base
+    for staged_name, i in staged.items():
+        sizes[staged_name] = entries[i]["src_size"]
+    sizes["unpack.bin"] = STUB_RESERVE
+    layout = compute_layout(sizes, ram_size, fixed=fixed)
+    for staged_name, i in staged.items():
+        entries[i]["src"] = ram_base + layout[staged_name][0]
+        boot[staged_name] = "0x{:08x}".format(entries[i]["src"])
+
+    # Stub (last image: booted).
+    with open(stub, "rb") as f:
+        data = patch_stub(f.read(), pack_table(entries, entry, fdt, uart_rxtx, uart_txfull))
+    with open(os.path.join(output_dir, "unpack.bin"), "wb") as f:
+        f.write(data)
+    boot["unpack.bin"] = "0x{:08x}".format(ram_base + layout["unpack.bin"][0])
+    with open(os.path.join(output_dir, "boot.json"), "w") as f:
+        json.dump(boot, f, indent=4)
+    return boot
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack the boot images (compression + on-target unpacking).")
+    parser.add_argument("--images-dir",         default="images",                   help="Images directory (with its boot.json).")
+    parser.add_argument("--output-dir",         default="images_packed",            help="Packed images directory (with its boot.json).")
+    parser.add_argument("--csr-json",           default=None,                       help="SoC csr.json (main_ram base/size, UART for the stub messages).")
+    parser.add_argument("--ram-base",           default=0x40000000, type=lambda x: int(x, 0), help="main_ram base (without --csr-json).")
+    parser.add_argument("--ram-size",           default=None,       type=lambda x: int(x, 0), help="main_ram size (without --csr-json).")
+    parser.add_argument("--stub",               default="boot_unpack/unpack.bin",   help="boot_unpack stub binary (built if missing).")
+    parser.add_argument("--kernel-compression", default="lz4", choices=["lz4", "none"],          help="Kernel/OpenSBI compression (stub).")
+    parser.add_argument("--rootfs-compression", default="zstd", choices=list(rootfs_compressions), help="Initramfs compression (kernel).")
+    parser.add_argument("--baudrate",           default=115200,     type=int,       help="Serial baudrate (load time estimate).")
+    parser.add_argument("--tftp-rate",          default=100e6,      type=float,     help="Ethernet rate in bit/s (load time estimate).")
+    args = parser.parse_args()
+
+    # main_ram/UART.
+    uart_rxtx = uart_txfull = 0
+    if args.csr_json is not None:
+        with open(args.csr_json) as f:
+            csr_json = json.load(f)
+        main_ram           = csr_json["memories"]["main_ram"]
+        ram_base, ram_size = main_ram["base"], main_ram["size"]
+        if "uart_rxtx" in csr_json["csr_registers"]:
+            uart_rxtx   = csr_json["csr_registers"]["uart_rxtx"]["addr"]
+            uart_txfull = csr_json["csr_registers"]["uart_txfull"]["addr"]
+    elif args.ram_size is not None:
+        ram_base, ram_size = args.ram_base, args.ram_size
+    else:
+        parser.error("--csr-json or --ram-size required.")
+
+    if not os.path.exists(args.stub):
+        subprocess.check_call(["make", "-C", os.path.dirname(args.stub)])
+
+    with open(os.path.join(args.images_dir, "boot.json")) as f:
+        images = json.load(f)
+    try:
+        boot = pack_images(images, args.images_dir, args.output_dir, ram_base, ram_size, args.stub,
+            kernel_compression = args.kernel_compression,
+            rootfs_compression = args.rootfs_compression,
+            uart_rxtx          = uart_rxtx,
+            uart_txfull        = uart_txfull)
+    except (ValueError, RuntimeError) as e:
+        print("Packing failed: {}".format(e), file=sys.stderr)
+        sys.exit(1)
+
+    # Report.
+    def total(directory, names):
+        return sum(os.path.getsize(os.path.join(directory, n)) for n in names if os.path.exists(os.path.join(directory, n)))
+    def load_times(size):
+        return "{:8.1f}s (serial) {:6.2f}s (TFTP)".format(size*10/args.baudrate, size*8/args.tftp_rate)
+    print("{:20s} {:>12s}".format("Image", "Address"))
+    for name, address in boot.items():
+        print("{:20s} {:>12s}".format(name, address))
+    unpacked = total(args.images_dir, images)
+    packed   = total(args.output_dir, boot)
+    print("Unpacked: {:8d} KiB {}".format(unpacked//KiB, load_times(unpacked)))
+    print("Packed:   {:8d} KiB {} ({:.1f}x smaller)".format(packed//KiB, load_times(packed), unpacked/max(packed, 1)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+
+#
+# This file is part of Linux-on-LiteX-VexRiscv
+#
+# Copyright (c) 2019-2022, Linux-on-LiteX-VexRiscv Developers
+# SPDX-License-Identifier: BSD-2-Clause
+
+import os
+import re
+import json
+import shutil
+import argparse
+import subprocess
+
+from sweep import run_headless
+
+# Boot Profile Comparison --------------------------------------------------------------------------
+#
+# Builds the Linux images of each buildroot profile (defconfig) and measures the time-to-userspace
+# in simulation (headless run, sys_clk cycles until the login prompt), with the kernel milestones
+# from dmesg (printk timestamps, also available with the quiet fast-boot command line).
+
+profiles = {
+    "default"  : "litex_vexriscv_defconfig",
+    "fastboot" : "litex_vexriscv_fastboot_defconfig",
+}
+
+# dmesg milestones: name -> regex.
+milestones = {
+    "initramfs_unpacked" : r"Freeing initrd memory",
+    "init"               : r"Run /init as init process|Freeing unused kernel",
+}
+
+def build_images(profile, buildroot, profile_dir):
+    """Build the profile with buildroot and gather its images (+ OpenSBI, boot.json)."""
+    output     = os.path.abspath(os.path.join(profile_dir, "buildroot"))
+    images_dir = os.path.join(profile_dir, "images")
+    external   = os.path.abspath("buildroot")
+    subprocess.check_call(["make", "-C", buildroot, "O=" + output, "BR2_EXTERNAL=" + external, profiles[profile]])
+    subprocess.check_call(["make", "-C", buildroot, "O=" + output])
+
+    # Same layout as images/boot.json, rootfs possibly compressed (detected by the kernel).
+    os.makedirs(images_dir, exist_ok=True)
+    with open(os.path.join("images", "boot.json")) as f:
+        boot = json.load(f)
+    rootfs = [name for name in os.listdir(os.path.join(output, "images")) if name.startswith("rootfs.cpio")]
+    images = {}
+    for name, base in boot.items():
+        if name == "rootfs.cpio":
+            name = sorted(rootfs, key=len)[-1]
+        images[name] = base
+        if name == "rv32.dtb":
+            continue # Generated per simulation build.
+        src = os.path.join(output, "images", name)
+        if not os.path.exists(src):
+            src = os.path.join("images", name) # OpenSBI is not built by buildroot.
+        shutil.copy(src, images_dir)
+    with open(os.path.join(images_dir, "boot.json"), "w") as f:
+        json.dump(images, f, indent=4)
+    return images_dir
+
+def parse_dmesg(lines):
+    """Kernel milestones (seconds since the kernel start) from dmesg lines."""
+    r = {}
+    for line in lines:
+        m = re.match(r"\[\s*([\d.]+)\] (.*)", line)
+        if m is None:
+            continue
+        for name, regex in milestones.items():
+            if name not in r and re.search(regex, m.group(2)):
+                r[name] = float(m.group(1))
+    return r
+
+def main():
+    parser = argparse.ArgumentParser(description="Linux on LiteX-VexRiscv boot profiles comparison (simulation).")
+    parser.add_argument("--buildroot",    default=None,                 help="Buildroot source tree (to build the profiles).")
+    parser.add_argument("--profiles",     default="default,fastboot",   help="Comma-separated profiles: {}.".format(", ".join(profiles)))
+    parser.add_argument("--skip-build",   action="store_true",          help="Reuse the previously built profile images.")
+    parser.add_argument("--sys-clk-freq", default=100e6, type=float,    help="sys_clk frequency used to convert cycles to seconds.")
+    parser.add_argument("--timeout",      default=int(50e9), type=int,  help="Headless timeout per profile (sys_clk cycles).")
+    parser.add_argument("--profile-dir",  default="build/boot_profile", help="Output directory (one directory per profile).")
+    args, sim_args = parser.parse_known_args()
+
+    if not args.skip_build and args.buildroot is None:
+        parser.error("--buildroot required (or --skip-build).")
+
+    results = []
+    for profile in args.profiles.split(","):
+        if profile not in profiles:
+            parser.error("Unknown profile: {}.".format(profile))
+        profile_dir = os.path.join(args.profile_dir, profile)
+        if args.skip_build:
+            images_dir = os.path.join(profile_dir, "images")
+        else:
+            images_dir = build_images(profile, args.buildroot, profile_dir)
+        with open(os.path.join(images_dir, "boot.json")) as f:
+            images = json.load(f)
+
+        status, wall_time, headless = run_headless(os.path.join(profile_dir, "sim"), "dmesg",
+            args.timeout, ["--images-dir", images_dir] + sim_args)
+        r = {"profile": profile, "status": status, "wall_time": wall_time}
+        r["image_sizes"] = {name: os.path.getsize(os.path.join(images_dir, name))
+            for name in images if os.path.exists(os.path.join(images_dir, name))}
+        if headless is not None:
+            r["boot_cycles"] = headless["boot_cycles"]
+            r["boot_time"]   = headless["boot_cycles"]/args.sys_clk_freq
+            r.update(parse_dmesg(headless["output"]))
+        results.append(r)
+
+    # Report.
+    with open(os.path.join(args.profile_dir, "boot_profile.json"), "w") as f:
+        json.dump(results, f, indent=4)
+    print("{:10s} {:>14s} {:>12s} {:>12s} {:>12s} {:>12s}".format(
+        "Profile", "Boot cycles", "Userspace(s)", "Initramfs(s)", "Init(s)", "Images(KiB)"))
+    for r in results:
+        if "boot_cycles" not in r:
+            print("{:10s} failed (status {})".format(r["profile"], r["status"]))
+            continue
+        print("{:10s} {:14d} {:12.3f} {:>12s} {:>12s} {:12d}".format(r["profile"],
+            int(r["boot_cycles"]),
+            r["boot_time"],
+            "{:.3f}".format(r["initramfs_unpacked"]) if "initramfs_unpacked" in r else "-",
+            "{:.3f}".format(r["init"]) if "init" in r else "-",
+            sum(r["image_sizes"].values())//1024))
+    reference = results[0].get("boot_cycles")
+    for r in results[1:]:
+        if reference and r.get("boot_cycles"):
+            print("{}: {:.2f}x faster to userspace than {}".format(r["profile"], reference/r["boot_cycles"], results[0]["profile"]))
+
+if __name__ == "__main__":
+    main()
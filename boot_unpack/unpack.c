@@ -0,0 +1,219 @@
+/*
+ * Boot images unpacker.
+ *
+ * Checks (CRC32) and decompresses (LZ4 blocks) the images loaded by the BIOS/litex_term at their
+ * staging addresses to their boot addresses, as described by the pack table of boot_pack.py.
+ * Stored images (DTB, initramfs compressed for the kernel) are only checked (and moved if needed).
+ */
+
+#include <stdint.h>
+
+#define PACK_MAGIC       0x4b50584c /* "LXPK" */
+#define PACK_VERSION     1
+#define PACK_MAX_ENTRIES 24
+
+#define PACK_STORE 0
+#define PACK_LZ4   1
+
+struct pack_header {
+	uint32_t magic;
+	uint32_t version;
+	uint32_t count;
+	uint32_t entry;
+	uint32_t fdt;
+	uint32_t uart_rxtx;
+	uint32_t uart_txfull;
+	uint32_t reserved;
+};
+
+struct pack_entry {
+	char     name[16];
+	uint32_t method;
+	uint32_t src;
+	uint32_t src_size;
+	uint32_t dst;
+	uint32_t dst_size;
+	uint32_t crc32;
+};
+
+struct pack_table {
+	struct pack_header header;
+	struct pack_entry  entries[PACK_MAX_ENTRIES];
+};
+
+extern struct pack_table pack_table;
+
+uint32_t unpack(void);
+
+/* UART (LiteX UART CSRs, optional) ----------------------------------------------------------------*/
+
+static volatile uint32_t *uart_rxtx;
+static volatile uint32_t *uart_txfull;
+
+static void uart_putc(char c)
+{
+	if (!uart_rxtx)
+		return;
+	while (*uart_txfull);
+	*uart_rxtx = c;
+}
+
+static void uart_puts(const char *s)
+{
+	while (*s)
+		uart_putc(*s++);
+}
+
+static void uart_putname(const char *name)
+{
+	int i;
+	for (i = 0; i < 16 && name[i]; i++)
+		uart_putc(name[i]);
+}
+
+static void uart_puthex(uint32_t value)
+{
+	int i;
+	uart_puts("0x");
+	for (i = 28; i >= 0; i -= 4)
+		uart_putc("0123456789abcdef"[(value >> i) & 0xf]);
+}
+
+/* CRC32 (zlib) ------------------------------------------------------------------------------------*/
+
+static uint32_t crc_table[256];
+
+static void crc32_init(void)
+{
+	uint32_t i, j, c;
+	for (i = 0; i < 256; i++) {
+		c = i;
+		for (j = 0; j < 8; j++)
+			c = (c & 1) ? (c >> 1) ^ 0xedb88320 : c >> 1;
+		crc_table[i] = c;
+	}
+}
+
+static uint32_t crc32(const uint8_t *data, uint32_t size)
+{
+	uint32_t crc = 0xffffffff;
+	while (size--)
+		crc = crc_table[(crc ^ *data++) & 0xff] ^ (crc >> 8);
+	return crc ^ 0xffffffff;
+}
+
+/* LZ4 block decompression -------------------------------------------------------------------------*/
+
+/* Returns the decompressed size, or -1 on a malformed block/output overflow. */
+static int32_t lz4_decompress(const uint8_t *src, uint32_t src_size, uint8_t *dst, uint32_t dst_size)
+{
+	const uint8_t *ip   = src;
+	const uint8_t *iend = src + src_size;
+	uint8_t       *op   = dst;
+	uint8_t       *oend = dst + dst_size;
+	const uint8_t *match;
+	uint32_t token, length, offset, s;
+
+	while (ip < iend) {
+		/* Literals. */
+		token  = *ip++;
+		length = token >> 4;
+		if (length == 15) {
+			do {
+				if (ip >= iend)
+					return -1;
+				s = *ip++;
+				length += s;
+			} while (s == 255);
+		}
+		if (length > (uint32_t)(iend - ip) || length > (uint32_t)(oend - op))
+			return -1;
+		while (length--)
+			*op++ = *ip++;
+
+		/* Last sequence: literals only. */
+		if (ip == iend)
+			break;
+
+		/* Match. */
+		if (iend - ip < 2)
+			return -1;
+		offset = ip[0] | (ip[1] << 8);
+		ip += 2;
+		if (offset == 0 || offset > (uint32_t)(op - dst))
+			return -1;
+		length = token & 15;
+		if (length == 15) {
+			do {
+				if (ip >= iend)
+					return -1;
+				s = *ip++;
+				length += s;
+			} while (s == 255);
+		}
+		length += 4;
+		if (length > (uint32_t)(oend - op))
+			return -1;
+		match = op - offset;
+		while (length--)
+			*op++ = *match++;
+	}
+	return op - dst;
+}
+
+/* Unpack ------------------------------------------------------------------------------------------*/
+
+static int unpack_entry(const struct pack_entry *e)
+{
+	const uint8_t *src = (const uint8_t *)(uintptr_t)e->src;
+	uint8_t       *dst = (uint8_t *)(uintptr_t)e->dst;
+	uint32_t i;
+
+	switch (e->method) {
+	case PACK_STORE:
+		if (e->src_size != e->dst_size)
+			return -1;
+		if (dst != src)
+			for (i = 0; i < e->dst_size; i++)
+				dst[i] = src[i];
+		break;
+	case PACK_LZ4:
+		if (lz4_decompress(src, e->src_size, dst, e->dst_size) != (int32_t)e->dst_size)
+			return -1;
+		break;
+	default:
+		return -1;
+	}
+	return 0;
+}
+
+uint32_t unpack(void)
+{
+	const struct pack_header *h = &pack_table.header;
+	const struct pack_entry  *e;
+	uint32_t i;
+
+	if (h->magic != PACK_MAGIC || h->version != PACK_VERSION || h->count > PACK_MAX_ENTRIES)
+		return 0;
+	uart_rxtx   = (volatile uint32_t *)(uintptr_t)h->uart_rxtx;
+	uart_txfull = (volatile uint32_t *)(uintptr_t)h->uart_txfull;
+
+	crc32_init();
+	for (i = 0; i < h->count; i++) {
+		e = &pack_table.entries[i];
+		uart_puts("Unpacking ");
+		uart_putname(e->name);
+		uart_puts(" to ");
+		uart_puthex(e->dst);
+		if (unpack_entry(e) != 0) {
+			uart_puts(": decompression error\n");
+			return 0;
+		}
+		if (crc32((const uint8_t *)(uintptr_t)e->dst, e->dst_size) != e->crc32) {
+			uart_puts(": CRC error\n");
+			return 0;
+		}
+		uart_puts(": OK\n");
+	}
+	return h->entry;
+}
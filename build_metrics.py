@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+
+#
+# This file is part of Linux-on-LiteX-VexRiscv
+#
+# Copyright (c) 2019-2022, Linux-on-LiteX-VexRiscv Developers
+# SPDX-License-Identifier: BSD-2-Clause
+
+import os
+import re
+import json
+import glob
+import time
+import argparse
+import subprocess
+
+# Build Metrics ------------------------------------------------------------------------------------
+#
+# Extracts the resource utilization (LUT/FF/BRAM/DSP) and timing (achieved Fmax per clock, worst
+# setup slack) of a board build from the toolchain reports into a JSON record (one per build, in
+# build/metrics) and compares records:
+# - Yosys/nextpnr: nextpnr JSON report (post place & route, enabled by enable_reports()).
+# - Vivado:        NAME_utilization_place.rpt, NAME_timing.rpt.
+# - Quartus:       NAME.fit.summary, NAME.sta.rpt, NAME.sta.summary.
+
+METRICS_DIR = os.path.join("build", "metrics")
+
+# nextpnr BELs -> resources.
+nextpnr_resources = {
+    "lut"  : ["TRELLIS_COMB", "ICESTORM_LC", "OXIDE_COMB", "LUT4", "GENERIC_SLICE"],
+    "ff"   : ["TRELLIS_FF", "OXIDE_FF", "DFF"],
+    "bram" : ["DP16KD", "ICESTORM_RAM", "OXIDE_EBR", "BSRAM"],
+    "dsp"  : ["MULT18X18D", "ICESTORM_DSP", "OXIDE_DSP", "MULT18X18"],
+}
+
+# Vivado utilization rows -> resources.
+vivado_resources = {
+    "lut"  : ["Slice LUTs", "CLB LUTs"],
+    "ff"   : ["Slice Registers", "CLB Registers"],
+    "bram" : ["Block RAM Tile"],
+    "dsp"  : ["DSPs"],
+}
+
+# Quartus fit summary rows -> resources.
+quartus_resources = {
+    "lut"  : ["Total logic elements", "Logic utilization (in ALMs)"],
+    "ff"   : ["Total registers", "Dedicated logic registers"],
+    "bram" : ["Total RAM Blocks", "Total block memory bits", "Total memory bits"],
+    "dsp"  : ["Total DSP Blocks", "Embedded Multiplier 9-bit elements"],
+}
+
+def enable_reports(platform, build_name):
+    """Enable the nextpnr JSON report (Yosys/nextpnr toolchains, Vivado/Quartus reports are
+    generated by default)."""
+    toolchain = platform.toolchain
+    if hasattr(toolchain, "_pnr_opts"):
+        toolchain._pnr_opts += " --report {}_report.json".format(build_name)
+
+def _number(s):
+    return float(s.replace(",", ""))
+
+# nextpnr ------------------------------------------------------------------------------------------
+
+def parse_nextpnr_report(filename):
+    with open(filename) as f:
+        report = json.load(f)
+    resources = {}
+    for name, bels in nextpnr_resources.items():
+        for bel in bels:
+            if bel in report.get("utilization", {}):
+                u = report["utilization"][bel]
+                resources[name] = {"used": u["used"], "available": u["available"]}
+                break
+    # iCE40 logic cells hold a LUT and a FF.
+    if "ff" not in resources and "ICESTORM_LC" in report.get("utilization", {}):
+        resources["ff"] = resources["lut"]
+    fmax  = {}
+    slack = None
+    for clk, f in report.get("fmax", {}).items():
+        fmax[clk] = f["achieved"]
+        clk_slack = 1e3/f["constraint"] - 1e3/f["achieved"]
+        slack     = clk_slack if slack is None else min(slack, clk_slack)
+    return resources, {"fmax": fmax, "wns": slack}
+
+# Vivado -------------------------------------------------------------------------------------------
+
+def parse_vivado_utilization(filename):
+    resources = {}
+    with open(filename) as f:
+        for line in f:
+            cells = [c.strip() for c in line.strip().strip("|").split("|")]
+            if len(cells) < 5:
+                continue
+            for name, rows in vivado_resources.items():
+                if name not in resources and cells[0].rstrip("*") in rows:
+                    resources[name] = {"used": _number(cells[1]), "available": _number(cells[-2])}
+    return resources
+
+def _vivado_table(lines, title):
+    """Rows (list of columns) of a report_timing_summary table."""
+    rows = []
+    for i, line in enumerate(lines):
+        if line.strip() == "| " + title:
+            break
+    else:
+        return rows
+    for line in lines[i + 2:]:
+        if re.match(r"^\s*-+(\s+-+)+\s*$", line):
+            rows = [] # Header separator: rows follow.
+            continue
+        if line.startswith("| ") or re.match(r"^-+$", line):
+            if rows:
+                break
+            continue
+        if line.strip() == "":
+            if rows:
+                break
+            continue
+        rows.append(line.split())
+    return rows
+
+def parse_vivado_timing(filename):
+    with open(filename) as f:
+        lines = f.read().splitlines()
+    periods = {}
+    for row in _vivado_table(lines, "Clock Summary"):
+        m = re.match(r"(\S+)\s+\{[^}]*\}\s+([\d.]+)", " ".join(row))
+        if m is not None:
+            periods[m.group(1)] = float(m.group(2))
+    fmax = {}
+    for row in _vivado_table(lines, "Intra Clock Table"):
+        if len(row) > 1 and row[0] in periods and re.match(r"-?[\d.]+$", row[1]):
+            fmax[row[0]] = 1e3/(periods[row[0]] - float(row[1]))
+    wns = None
+    summary = _vivado_table(lines, "Design Timing Summary")
+    if summary and re.match(r"-?[\d.]+$", summary[0][0]):
+        wns = float(summary[0][0])
+    return {"fmax": fmax, "wns": wns}
+
+# Quartus ------------------------------------------------------------------------------------------
+
+def parse_quartus_fit(filename):
+    resources = {}
+    with open(filename) as f:
+        for line in f:
+            m = re.match(r"^\s*(.+?)\s*:\s*([\d,]+)(?:\s*/\s*([\d,]+))?", line)
+            if m is None:
+                continue
+            for name, rows in quartus_resources.items():
+                if name not in resources and m.group(1) in rows:
+                    resources[name] = {"used": _number(m.group(2)),
+                        "available": _number(m.group(3)) if m.group(3) else None}
+    return resources
+
+def parse_quartus_timing(sta_rpt, sta_summary=None):
+    fmax = {}
+    with open(sta_rpt) as f:
+        for line in f:
+            m = re.match(r"^;\s*([\d.]+) MHz\s*;\s*([\d.]+) MHz\s*;\s*(\S+)\s*;", line)
+            if m is not None:
+                # Restricted Fmax, worst corner.
+                clk       = m.group(3)
+                fmax[clk] = min(fmax.get(clk, float("inf")), float(m.group(2)))
+    wns = None
+    if sta_summary is not None and os.path.exists(sta_summary):
+        setup = False
+        with open(sta_summary) as f:
+            for line in f:
+                if line.startswith("Type"):
+                    setup = "Setup" in line
+                m = re.match(r"^Slack\s*:\s*(-?[\d.]+)", line)
+                if setup and m is not None:
+                    wns = float(m.group(1)) if wns is None else min(wns, float(m.group(1)))
+    return {"fmax": fmax, "wns": wns}
+
+# Record -------------------------------------------------------------------------------------------
+
+def git_revision():
+    try:
+        rev   = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+        dirty = subprocess.call(["git", "diff", "--quiet", "HEAD"], stderr=subprocess.DEVNULL) != 0
+        return rev + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def collect(board, gateware_dir, build_name, sys_clk_freq=None, args=[]):
+    """Build metrics record of a board build (None if no toolchain report is found)."""
+    def report(suffix):
+        filename = os.path.join(gateware_dir, build_name + suffix)
+        return filename if os.path.exists(filename) else None
+
+    if report("_report.json"):
+        toolchain         = "nextpnr"
+        resources, timing = parse_nextpnr_report(report("_report.json"))
+    elif report("_utilization_place.rpt"):
+        toolchain = "vivado"
+        resources = parse_vivado_utilization(report("_utilization_place.rpt"))
+        timing    = parse_vivado_timing(report("_timing.rpt")) if report("_timing.rpt") else {"fmax": {}, "wns": None}
+    elif report(".fit.summary"):
+        toolchain = "quartus"
+        resources = parse_quartus_fit(report(".fit.summary"))
+        timing    = parse_quartus_timing(report(".sta.rpt"), report(".sta.summary")) if report(".sta.rpt") else {"fmax": {}, "wns": None}
+    else:
+        return None
+    return {
+        "board"        : board,
+        "time"         : time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git"          : git_revision(),
+        "args"         : args,
+        "toolchain"    : toolchain,
+        "sys_clk_freq" : sys_clk_freq,
+        "resources"    : resources,
+        "timing"       : timing,
+    }
+
+def save(record, metrics_dir=METRICS_DIR):
+    os.makedirs(metrics_dir, exist_ok=True)
+    filename = os.path.join(metrics_dir, "{}-{}.json".format(record["board"], record["time"].replace(":", "")))
+    with open(filename, "w") as f:
+        json.dump(record, f, indent=4)
+    return filename
+
+def load_records(metrics_dir=METRICS_DIR):
+    records = []
+    for filename in sorted(glob.glob(os.path.join(metrics_dir, "*.json"))):
+        with open(filename) as f:
+            records.append(json.load(f))
+    return sorted(records, key=lambda r: r["time"])
+
+# Compare ------------------------------------------------------------------------------------------
+
+def metrics(record):
+    """Flat {metric: value} of a record."""
+    r = {}
+    for name, u in record["resources"].items():
+        r[name] = u["used"]
+    for clk, f in record["timing"]["fmax"].items():
+        r["fmax:" + clk] = f
+    if record["timing"]["wns"] is not None:
+        r["wns"] = record["timing"]["wns"]
+    return r
+
+def compare(a, b):
+    """[(metric, a, b, delta%)] between two records."""
+    ma, mb = metrics(a), metrics(b)
+    rows   = []
+    for m in list(ma) + [m for m in mb if m not in ma]:
+        va, vb = ma.get(m), mb.get(m)
+        delta  = 100*(vb - va)/va if va not in (None, 0) and vb is not None else None
+        rows.append((m, va, vb, delta))
+    return rows
+
+def summary(record):
+    s = ", ".join("{}: {:g}".format(k.upper(), v) for k, v in metrics(record).items() if not k.startswith("fmax") and k != "wns")
+    for clk, f in record["timing"]["fmax"].items():
+        s += ", Fmax({}): {:.2f}MHz".format(clk, f)
+    if record["timing"]["wns"] is not None:
+        s += ", WNS: {:.3f}ns".format(record["timing"]["wns"])
+    return s
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare board build metrics (resources/timing).")
+    parser.add_argument("records",       nargs="*",                help="Two records to compare (default: last two records of each board).")
+    parser.add_argument("--metrics-dir", default=METRICS_DIR,      help="Build metrics records directory.")
+    parser.add_argument("--board",       default=None,             help="Only this board.")
+    parser.add_argument("--list",        action="store_true",      help="List the records.")
+    args = parser.parse_args()
+
+    if args.records:
+        if len(args.records) != 2:
+            parser.error("Two records required.")
+        pairs = []
+        with open(args.records[0]) as fa, open(args.records[1]) as fb:
+            pairs.append((json.load(fa), json.load(fb)))
+    else:
+        records = [r for r in load_records(args.metrics_dir) if args.board in (None, r["board"])]
+        if args.list:
+            for r in records:
+                print("{} {:20s} {:10s} {}".format(r["time"], r["board"], str(r["git"]), summary(r)))
+            return
+        boards = sorted(set(r["board"] for r in records))
+        pairs  = []
+        for board in boards:
+            board_records = [r for r in records if r["board"] == board]
+            if len(board_records) < 2:
+                print("{}: only one record.".format(board))
+                continue
+            pairs.append((board_records[-2], board_records[-1]))
+
+    for a, b in pairs:
+        print("{}: {} ({}) -> {} ({})".format(b["board"], a["time"], a["git"], b["time"], b["git"]))
+        print("{:24s} {:>12s} {:>12s} {:>9s}".format("Metric", "Before", "After", "Delta"))
+        for m, va, vb, delta in compare(a, b):
+            print("{:24s} {:>12s} {:>12s} {:>9s}".format(m,
+                "-" if va is None else "{:g}".format(round(va, 3)),
+                "-" if vb is None else "{:g}".format(round(vb, 3)),
+                "-" if delta is None else "{:+.2f}%".format(delta)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+################################################################################
+#
+# litex-perf
+#
+################################################################################
+
+LITEX_PERF_VERSION = 1.0
+LITEX_PERF_SITE = $(BR2_EXTERNAL_LITEX_VEXRISCV_PATH)/package/litex-perf/src
+LITEX_PERF_SITE_METHOD = local
+
+define LITEX_PERF_BUILD_CMDS
+	$(TARGET_CONFIGURE_OPTS) $(MAKE) -C $(@D)
+endef
+
+define LITEX_PERF_INSTALL_TARGET_CMDS
+	$(INSTALL) -D $(@D)/litex-perf $(TARGET_DIR)/usr/bin/litex-perf
+endef
+
+$(eval $(generic-package))
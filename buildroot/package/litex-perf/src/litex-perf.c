@@ -0,0 +1,240 @@
+/*
+ * This file is part of Linux-on-LiteX-VexRiscv
+ *
+ * Copyright (c) 2019-2022, Linux-on-LiteX-VexRiscv Developers
+ * SPDX-License-Identifier: BSD-2-Clause
+ *
+ * litex-perf: samples the SoC performance counters (monitor/perf.py) described by the
+ * "litex,perf-counters" Device Tree node, through /dev/mem.
+ *
+ * Usage: litex-perf [-i interval_ms] [-n samples] [-z] [command [args...]]
+ * - With a command: counter deltas over the command execution.
+ * - Without: counter deltas over each interval.
+ */
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <stdint.h>
+#include <unistd.h>
+#include <fcntl.h>
+#include <dirent.h>
+#include <sys/mman.h>
+#include <sys/wait.h>
+#include <arpa/inet.h>
+
+#define DT_SOC        "/proc/device-tree/soc"
+#define COMPATIBLE    "litex,perf-counters"
+#define MAX_COUNTERS  64
+#define PROP_SIZE     4096
+
+struct perf_s {
+  volatile uint32_t *regs;
+  uint32_t control;
+  uint32_t reset;
+  uint32_t snapshot;
+  uint32_t words;
+  int count;
+  char *names[MAX_COUNTERS];
+  uint32_t offsets[MAX_COUNTERS];
+  char names_buf[PROP_SIZE];
+};
+
+static int read_prop(const char *node, const char *prop, void *buf, int size)
+{
+  char path[1024];
+  int fd, len;
+
+  snprintf(path, sizeof(path), "%s/%s", node, prop);
+  fd = open(path, O_RDONLY);
+  if(fd < 0)
+    return -1;
+  len = read(fd, buf, size);
+  close(fd);
+  return len;
+}
+
+static uint32_t read_u32_prop(const char *node, const char *prop)
+{
+  uint32_t value = 0;
+
+  read_prop(node, prop, &value, sizeof(value));
+  return ntohl(value);
+}
+
+static int perf_find(char *node, int size)
+{
+  char compatible[256];
+  struct dirent *entry;
+  DIR *dir;
+  int len;
+
+  dir = opendir(DT_SOC);
+  if(!dir)
+    return -1;
+  while((entry = readdir(dir))) {
+    snprintf(node, size, "%s/%s", DT_SOC, entry->d_name);
+    len = read_prop(node, "compatible", compatible, sizeof(compatible) - 1);
+    if(len <= 0)
+      continue;
+    compatible[len] = '\0';
+    if(!strcmp(compatible, COMPATIBLE)) {
+      closedir(dir);
+      return 0;
+    }
+  }
+  closedir(dir);
+  return -1;
+}
+
+static int perf_open(struct perf_s *p)
+{
+  char node[512];
+  uint32_t reg[2];
+  uint32_t offsets[MAX_COUNTERS];
+  long page = sysconf(_SC_PAGESIZE);
+  uint32_t base, size, map_base;
+  uint8_t *map;
+  int fd, len, i;
+  char *name;
+
+  if(perf_find(node, sizeof(node)) < 0) {
+    fprintf(stderr, "No %s node in the Device Tree.\n", COMPATIBLE);
+    return -1;
+  }
+  if(read_prop(node, "reg", reg, sizeof(reg)) != sizeof(reg))
+    return -1;
+  base = ntohl(reg[0]);
+  size = ntohl(reg[1]);
+  p->control  = read_u32_prop(node, "litex,control-offset");
+  p->reset    = read_u32_prop(node, "litex,reset-offset");
+  p->snapshot = read_u32_prop(node, "litex,snapshot-offset");
+  p->words    = read_u32_prop(node, "litex,counter-words");
+
+  /* Counter names (NUL-separated strings) and offsets. */
+  len = read_prop(node, "litex,counters", p->names_buf, sizeof(p->names_buf));
+  for(name = p->names_buf; len > 0 && name < p->names_buf + len && p->count < MAX_COUNTERS; name += strlen(name) + 1)
+    p->names[p->count++] = name;
+  len = read_prop(node, "litex,counter-offsets", offsets, sizeof(offsets));
+  if(len != (int) (p->count*sizeof(uint32_t))) {
+    fprintf(stderr, "Invalid %s node.\n", COMPATIBLE);
+    return -1;
+  }
+  for(i = 0; i < p->count; i++)
+    p->offsets[i] = ntohl(offsets[i]);
+
+  fd = open("/dev/mem", O_RDWR | O_SYNC);
+  if(fd < 0) {
+    perror("/dev/mem");
+    return -1;
+  }
+  map_base = base & ~(page - 1);
+  map = mmap(NULL, size + (base - map_base), PROT_READ | PROT_WRITE, MAP_SHARED, fd, map_base);
+  close(fd);
+  if(map == MAP_FAILED) {
+    perror("mmap");
+    return -1;
+  }
+  p->regs = (volatile uint32_t *) (map + (base - map_base));
+  return 0;
+}
+
+static void perf_write(struct perf_s *p, uint32_t offset, uint32_t value)
+{
+  p->regs[offset/4] = value;
+}
+
+/* Latch all the counters, then read them (multi-word CSRs: MSB word first). */
+static void perf_sample(struct perf_s *p, uint64_t *values)
+{
+  uint32_t w;
+  int i;
+
+  perf_write(p, p->snapshot, 1);
+  for(i = 0; i < p->count; i++) {
+    values[i] = 0;
+    for(w = 0; w < p->words; w++)
+      values[i] = (values[i] << 32) | p->regs[p->offsets[i]/4 + w];
+  }
+}
+
+static void perf_print(struct perf_s *p, uint64_t *before, uint64_t *after)
+{
+  uint64_t cycles = 0;
+  uint64_t delta;
+  int i;
+
+  for(i = 0; i < p->count; i++)
+    if(!strcmp(p->names[i], "cycles"))
+      cycles = after[i] - before[i];
+  for(i = 0; i < p->count; i++) {
+    delta = after[i] - before[i];
+    if(cycles && (strstr(p->names[i], "_busy") || strstr(p->names[i], "_wait")))
+      printf("%-32s %20llu  (%5.1f%% of cycles)\n", p->names[i], (unsigned long long) delta, 100.0*delta/cycles);
+    else
+      printf("%-32s %20llu\n", p->names[i], (unsigned long long) delta);
+  }
+}
+
+static int run(char **argv)
+{
+  int status;
+  pid_t pid;
+
+  pid = fork();
+  if(pid == 0) {
+    execvp(argv[0], argv);
+    perror(argv[0]);
+    _exit(127);
+  }
+  waitpid(pid, &status, 0);
+  return WIFEXITED(status) ? WEXITSTATUS(status) : 1;
+}
+
+int main(int argc, char **argv)
+{
+  static struct perf_s p;
+  uint64_t before[MAX_COUNTERS];
+  uint64_t after[MAX_COUNTERS];
+  int interval = 1000;
+  int samples = 1;
+  int zero = 0;
+  int status = 0;
+  int opt, n;
+
+  while((opt = getopt(argc, argv, "+i:n:zh")) != -1) {
+    switch(opt) {
+    case 'i': interval = atoi(optarg); break;
+    case 'n': samples  = atoi(optarg); break;
+    case 'z': zero     = 1;            break;
+    default:
+      fprintf(stderr, "Usage: %s [-i interval_ms] [-n samples] [-z (reset)] [command [args...]]\n", argv[0]);
+      return 1;
+    }
+  }
+
+  if(perf_open(&p) < 0)
+    return 1;
+  perf_write(&p, p.control, 1);
+  if(zero)
+    perf_write(&p, p.reset, 1);
+
+  if(optind < argc) {
+    perf_sample(&p, before);
+    status = run(&argv[optind]);
+    perf_sample(&p, after);
+    perf_print(&p, before, after);
+    return status;
+  }
+
+  perf_sample(&p, before);
+  for(n = 0; n < samples; n++) {
+    usleep(interval*1000);
+    perf_sample(&p, after);
+    if(samples > 1)
+      printf("--- sample %d\n", n);
+    perf_print(&p, before, after);
+    memcpy(before, after, sizeof(before));
+  }
+  return 0;
+}
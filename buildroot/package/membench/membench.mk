@@ -0,0 +1,20 @@
+################################################################################
+#
+# membench
+#
+################################################################################
+
+MEMBENCH_VERSION = 1.0
+MEMBENCH_SITE = $(BR2_EXTERNAL_LITEX_VEXRISCV_PATH)/package/membench/src
+MEMBENCH_SITE_METHOD = local
+
+define MEMBENCH_BUILD_CMDS
+	$(TARGET_CONFIGURE_OPTS) $(MAKE) -C $(@D)
+endef
+
+define MEMBENCH_INSTALL_TARGET_CMDS
+	$(INSTALL) -D $(@D)/membench-stream $(TARGET_DIR)/usr/bin/membench-stream
+	$(INSTALL) -D $(@D)/membench-memcpy $(TARGET_DIR)/usr/bin/membench-memcpy
+endef
+
+$(eval $(generic-package))
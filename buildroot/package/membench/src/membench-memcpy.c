@@ -0,0 +1,86 @@
+/*
+ * This file is part of Linux-on-LiteX-VexRiscv
+ *
+ * Copyright (c) 2019-2022, Linux-on-LiteX-VexRiscv Developers
+ * SPDX-License-Identifier: BSD-2-Clause
+ *
+ * membench-memcpy: libc memcpy/memset throughput over a range of buffer sizes (from in-cache to
+ * main memory sizes).
+ *
+ * Usage: membench-memcpy [-s max_size] [-t min_time_s]
+ * Sizes go from 64 bytes to max_size by powers of 4, each repeated for at least min_time_s.
+ */
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <unistd.h>
+#include <time.h>
+
+static double now(void)
+{
+  struct timespec ts;
+
+  clock_gettime(CLOCK_MONOTONIC, &ts);
+  return ts.tv_sec + ts.tv_nsec*1e-9;
+}
+
+/* MB/s of memcpy (memset if src is NULL) of size bytes, repeated for at least min_time seconds. */
+static double rate(char *dst, const char *src, size_t size, double min_time)
+{
+  double start, elapsed;
+  long loops = 0;
+  long i, n = 1;
+
+  start = now();
+  do {
+    for(i = 0; i < n; i++) {
+      if(src)
+        memcpy(dst, src, size);
+      else
+        memset(dst, (int) i, size);
+    }
+    /* Keep the calls from being optimized away. */
+    __asm__ volatile("" : : "r" (dst) : "memory");
+    loops  += n;
+    n      *= 2;
+    elapsed = now() - start;
+  } while(elapsed < min_time);
+  return 1e-6*size*loops/elapsed;
+}
+
+int main(int argc, char **argv)
+{
+  size_t max_size = 4 << 20;
+  double min_time = 0.5;
+  char *src, *dst;
+  size_t size;
+  int opt;
+
+  while((opt = getopt(argc, argv, "s:t:h")) != -1) {
+    switch(opt) {
+    case 's': max_size = strtoul(optarg, NULL, 0); break;
+    case 't': min_time = atof(optarg);             break;
+    default:
+      fprintf(stderr, "Usage: %s [-s max_size] [-t min_time_s]\n", argv[0]);
+      return 1;
+    }
+  }
+
+  src = malloc(max_size);
+  dst = malloc(max_size);
+  if(!src || !dst) {
+    fprintf(stderr, "Unable to allocate 2x%zu bytes.\n", max_size);
+    return 1;
+  }
+  memset(src, 0x5a, max_size);
+  memset(dst, 0, max_size);
+
+  printf("memcpy/memset throughput\n");
+  printf("Function    Size (B)    Rate MB/s\n");
+  for(size = 64; size <= max_size; size *= 4)
+    printf("%-8s%12zu %12.1f\n", "memcpy", size, rate(dst, src, size, min_time));
+  for(size = 64; size <= max_size; size *= 4)
+    printf("%-8s%12zu %12.1f\n", "memset", size, rate(dst, NULL, size, min_time));
+  return 0;
+}
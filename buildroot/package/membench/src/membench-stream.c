@@ -0,0 +1,126 @@
+/*
+ * This file is part of Linux-on-LiteX-VexRiscv
+ *
+ * Copyright (c) 2019-2022, Linux-on-LiteX-VexRiscv Developers
+ * SPDX-License-Identifier: BSD-2-Clause
+ *
+ * membench-stream: STREAM-style sustainable memory bandwidth (Copy/Scale/Add/Triad kernels), on
+ * 32-bit integer words so the results do not depend on the FPU/soft-float configuration.
+ *
+ * Usage: membench-stream [-n words_per_array] [-t ntimes]
+ * Bytes counted per kernel iteration as STREAM: Copy/Scale 2 words, Add/Triad 3 words.
+ */
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <stdint.h>
+#include <unistd.h>
+#include <time.h>
+
+#define SCALAR 3
+
+static double now(void)
+{
+  struct timespec ts;
+
+  clock_gettime(CLOCK_MONOTONIC, &ts);
+  return ts.tv_sec + ts.tv_nsec*1e-9;
+}
+
+int main(int argc, char **argv)
+{
+  static const char *names[4] = {"Copy:", "Scale:", "Add:", "Triad:"};
+  static const int words[4] = {2, 2, 3, 3};
+  double times[4][64];
+  double t, avg, min, max;
+  uint32_t *a, *b, *c;
+  uint32_t ea, eb, ec;
+  long n = 1 << 20;
+  int ntimes = 10;
+  int opt, i, k, errors;
+  long j;
+
+  while((opt = getopt(argc, argv, "n:t:h")) != -1) {
+    switch(opt) {
+    case 'n': n      = atol(optarg); break;
+    case 't': ntimes = atoi(optarg); break;
+    default:
+      fprintf(stderr, "Usage: %s [-n words_per_array] [-t ntimes]\n", argv[0]);
+      return 1;
+    }
+  }
+  if(ntimes < 2 || ntimes > 64) {
+    fprintf(stderr, "ntimes must be in [2, 64].\n");
+    return 1;
+  }
+
+  a = malloc(n*sizeof(uint32_t));
+  b = malloc(n*sizeof(uint32_t));
+  c = malloc(n*sizeof(uint32_t));
+  if(!a || !b || !c) {
+    fprintf(stderr, "Unable to allocate 3x%ld words.\n", n);
+    return 1;
+  }
+  for(j = 0; j < n; j++) {
+    a[j] = 1;
+    b[j] = 2;
+    c[j] = 0;
+  }
+
+  printf("STREAM-style memory bandwidth (32-bit words)\n");
+  printf("Array size = %ld words (%ld KiB per array), Ntimes = %d\n", n, n*sizeof(uint32_t)/1024, ntimes);
+
+  for(k = 0; k < ntimes; k++) {
+    t = now();
+    for(j = 0; j < n; j++)
+      c[j] = a[j];
+    times[0][k] = now() - t;
+    t = now();
+    for(j = 0; j < n; j++)
+      b[j] = SCALAR*c[j];
+    times[1][k] = now() - t;
+    t = now();
+    for(j = 0; j < n; j++)
+      c[j] = a[j] + b[j];
+    times[2][k] = now() - t;
+    t = now();
+    for(j = 0; j < n; j++)
+      a[j] = b[j] + SCALAR*c[j];
+    times[3][k] = now() - t;
+  }
+
+  /* Results (first iteration skipped, as STREAM). */
+  printf("Function    Best Rate MB/s  Avg time     Min time     Max time\n");
+  for(i = 0; i < 4; i++) {
+    avg = 0;
+    min = max = times[i][1];
+    for(k = 1; k < ntimes; k++) {
+      avg += times[i][k];
+      if(times[i][k] < min) min = times[i][k];
+      if(times[i][k] > max) max = times[i][k];
+    }
+    avg /= ntimes - 1;
+    printf("%-8s%14.1f  %11.6f  %11.6f  %11.6f\n", names[i],
+      1e-6*words[i]*sizeof(uint32_t)*n/min, avg, min, max);
+  }
+
+  /* Validation. */
+  ea = 1;
+  eb = 2;
+  ec = 0;
+  for(k = 0; k < ntimes; k++) {
+    ec = ea;
+    eb = SCALAR*ec;
+    ec = ea + eb;
+    ea = eb + SCALAR*ec;
+  }
+  errors = 0;
+  for(j = 0; j < n; j++)
+    if(a[j] != ea || b[j] != eb || c[j] != ec)
+      errors++;
+  if(errors)
+    printf("Failed Validation: %d errors\n", errors);
+  else
+    printf("Solution Validates\n");
+  return errors ? 1 : 0;
+}
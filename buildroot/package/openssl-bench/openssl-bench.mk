@@ -0,0 +1,17 @@
+################################################################################
+#
+# openssl-bench
+#
+################################################################################
+
+OPENSSL_BENCH_VERSION = 1.0
+OPENSSL_BENCH_SITE = $(BR2_EXTERNAL_LITEX_VEXRISCV_PATH)/package/openssl-bench/src
+OPENSSL_BENCH_SITE_METHOD = local
+OPENSSL_BENCH_DEPENDENCIES = openssl
+
+define OPENSSL_BENCH_INSTALL_TARGET_CMDS
+	$(INSTALL) -D -m 0755 $(@D)/openssl-bench $(TARGET_DIR)/usr/bin/openssl-bench
+	$(SED) 's/@VEXRISCV_AES@/$(if $(BR2_PACKAGE_VEXRISCV_AES),1,0)/' $(TARGET_DIR)/usr/bin/openssl-bench
+endef
+
+$(eval $(generic-package))
@@ -0,0 +1,19 @@
+################################################################################
+#
+# packet-bench
+#
+################################################################################
+
+PACKET_BENCH_VERSION = 1.0
+PACKET_BENCH_SITE = $(BR2_EXTERNAL_LITEX_VEXRISCV_PATH)/package/packet-bench/src
+PACKET_BENCH_SITE_METHOD = local
+
+define PACKET_BENCH_BUILD_CMDS
+	$(TARGET_CONFIGURE_OPTS) $(MAKE) -C $(@D)
+endef
+
+define PACKET_BENCH_INSTALL_TARGET_CMDS
+	$(INSTALL) -D $(@D)/packet-bench $(TARGET_DIR)/usr/bin/packet-bench
+endef
+
+$(eval $(generic-package))
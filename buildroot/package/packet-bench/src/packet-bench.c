@@ -0,0 +1,175 @@
+/*
+ * This file is part of Linux-on-LiteX-VexRiscv
+ *
+ * Copyright (c) 2019-2022, Linux-on-LiteX-VexRiscv Developers
+ * SPDX-License-Identifier: BSD-2-Clause
+ *
+ * packet-bench: multi-threaded packet exchange benchmark. One thread per hart (pinned), threads
+ * are connected in a ring by single-producer/single-consumer queues: each thread encodes test core
+ * packets ({dx, dy, axon, tick} layout, test_core_final/packet.py defaults) to the next thread and
+ * decodes the packets of the previous one. Throughput is limited by the cache line transfers
+ * between the harts (coherency, shared bus/L2).
+ *
+ * Usage: packet-bench [-t threads] [-n packets_per_thread] [-q queue_depth]
+ */
+
+#define _GNU_SOURCE
+#include <stdio.h>
+#include <stdlib.h>
+#include <stdint.h>
+#include <unistd.h>
+#include <time.h>
+#include <sched.h>
+#include <pthread.h>
+
+/* Packet layout (Verilog defaults). */
+#define DX_LSB     21
+#define DX_WIDTH   9
+#define DY_LSB     12
+#define DY_WIDTH   9
+#define AXON_LSB   4
+#define AXON_WIDTH 8
+#define TICK_LSB   0
+#define TICK_WIDTH 4
+
+#define FIELD(packet, name) (((packet) >> name##_LSB) & ((1 << name##_WIDTH) - 1))
+
+struct queue_s {
+  uint32_t *packets;
+  uint32_t mask;
+  /* Producer and consumer indexes on separate cache lines. */
+  volatile uint32_t head __attribute__((aligned(64)));
+  volatile uint32_t tail __attribute__((aligned(64)));
+};
+
+struct thread_s {
+  pthread_t thread;
+  int id;
+  long count;
+  struct queue_s *rx;
+  struct queue_s *tx;
+  uint64_t checksum;
+};
+
+static uint32_t encode(long n, int id)
+{
+  return ((uint32_t) (id & ((1 << DX_WIDTH) - 1)) << DX_LSB) |
+         ((uint32_t) ((n >> 12) & ((1 << DY_WIDTH) - 1)) << DY_LSB) |
+         ((uint32_t) ((n >> 4) & ((1 << AXON_WIDTH) - 1)) << AXON_LSB) |
+         ((uint32_t) (n & ((1 << TICK_WIDTH) - 1)) << TICK_LSB);
+}
+
+static uint64_t expected_checksum(long count)
+{
+  uint64_t checksum = 0;
+  long n;
+
+  for(n = 0; n < count; n++)
+    checksum += FIELD(encode(n, 0), DY) + FIELD(encode(n, 0), AXON) + FIELD(encode(n, 0), TICK);
+  return checksum;
+}
+
+static void *worker(void *arg)
+{
+  struct thread_s *t = arg;
+  long sent = 0, received = 0;
+  uint32_t packet;
+  cpu_set_t cpus;
+  int idle;
+
+  CPU_ZERO(&cpus);
+  CPU_SET(t->id, &cpus);
+  pthread_setaffinity_np(pthread_self(), sizeof(cpus), &cpus);
+
+  while(sent < t->count || received < t->count) {
+    idle = 1;
+    /* Send (if room in the next thread queue). */
+    if(sent < t->count && t->tx->head - __atomic_load_n(&t->tx->tail, __ATOMIC_ACQUIRE) <= t->tx->mask) {
+      t->tx->packets[t->tx->head & t->tx->mask] = encode(sent++, t->id);
+      __atomic_store_n(&t->tx->head, t->tx->head + 1, __ATOMIC_RELEASE);
+      idle = 0;
+    }
+    /* Receive (if available from the previous thread). */
+    if(received < t->count && __atomic_load_n(&t->rx->head, __ATOMIC_ACQUIRE) != t->rx->tail) {
+      packet = t->rx->packets[t->rx->tail & t->rx->mask];
+      __atomic_store_n(&t->rx->tail, t->rx->tail + 1, __ATOMIC_RELEASE);
+      t->checksum += FIELD(packet, DY) + FIELD(packet, AXON) + FIELD(packet, TICK);
+      received++;
+      idle = 0;
+    }
+    /* Blocked on both queues: let the other threads run (more threads than harts). */
+    if(idle)
+      sched_yield();
+  }
+  return NULL;
+}
+
+int main(int argc, char **argv)
+{
+  struct queue_s *queues;
+  struct thread_s *threads;
+  struct timespec start, end;
+  int nthreads = sysconf(_SC_NPROCESSORS_ONLN);
+  long count = 100000;
+  int depth = 256;
+  uint64_t expected;
+  double elapsed;
+  int opt, i, errors;
+
+  while((opt = getopt(argc, argv, "t:n:q:h")) != -1) {
+    switch(opt) {
+    case 't': nthreads = atoi(optarg); break;
+    case 'n': count    = atol(optarg); break;
+    case 'q': depth    = atoi(optarg); break;
+    default:
+      fprintf(stderr, "Usage: %s [-t threads] [-n packets_per_thread] [-q queue_depth (power of 2)]\n", argv[0]);
+      return 1;
+    }
+  }
+  if(nthreads < 1 || depth < 1 || (depth & (depth - 1))) {
+    fprintf(stderr, "Invalid threads/queue depth.\n");
+    return 1;
+  }
+
+  /* Cache line aligned queues (posix_memalign: sizes not multiple of the alignment). */
+  threads = calloc(nthreads, sizeof(*threads));
+  if(posix_memalign((void **) &queues, 64, nthreads*sizeof(*queues)) || !threads) {
+    fprintf(stderr, "Out of memory.\n");
+    return 1;
+  }
+  for(i = 0; i < nthreads; i++) {
+    if(posix_memalign((void **) &queues[i].packets, 64, depth*sizeof(uint32_t))) {
+      fprintf(stderr, "Out of memory.\n");
+      return 1;
+    }
+    queues[i].mask    = depth - 1;
+    queues[i].head    = 0;
+    queues[i].tail    = 0;
+  }
+
+  clock_gettime(CLOCK_MONOTONIC, &start);
+  for(i = 0; i < nthreads; i++) {
+    threads[i].id    = i;
+    threads[i].count = count;
+    threads[i].rx    = &queues[i];
+    threads[i].tx    = &queues[(i + 1) % nthreads];
+    pthread_create(&threads[i].thread, NULL, worker, &threads[i]);
+  }
+  for(i = 0; i < nthreads; i++)
+    pthread_join(threads[i].thread, NULL);
+  clock_gettime(CLOCK_MONOTONIC, &end);
+  elapsed = (end.tv_sec - start.tv_sec) + (end.tv_nsec - start.tv_nsec)*1e-9;
+
+  printf("packet-bench: threads=%d packets=%ld time=%.6f rate=%.1f packets/s\n",
+    nthreads, nthreads*count, elapsed, nthreads*count/elapsed);
+  expected = expected_checksum(count);
+  errors   = 0;
+  for(i = 0; i < nthreads; i++)
+    if(threads[i].checksum != expected)
+      errors++;
+  if(errors)
+    printf("Failed Validation: %d threads\n", errors);
+  else
+    printf("Solution Validates\n");
+  return errors ? 1 : 0;
+}
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+
+#
+# This file is part of Linux-on-LiteX-VexRiscv
+#
+# Copyright (c) 2019-2022, Linux-on-LiteX-VexRiscv Developers
+# SPDX-License-Identifier: BSD-2-Clause
+
+import sys
+import time
+import argparse
+
+from csr_client import EtherboneTransport, UARTboneTransport, CSRClient
+
+# Bus Monitor Host Tool ----------------------------------------------------------------------------
+#
+# Reads the windows of the bus monitor (monitor/busmon.py, --with-bus-monitor) over Etherbone or
+# UARTbone and reports the per-master utilization, wait/contention cycles and latencies, and the
+# per master/slave pair transactions/wait cycles.
+
+MASTER_FIELDS = ["transactions", "busy", "wait", "contention", "latency_max"]
+PAIR_FIELDS   = ["transactions", "wait"]
+
+def busmon_layout(client, name="busmon"):
+    """Return the monitored masters and master/slave pairs from the csr.json registers."""
+    prefix    = name + "_"
+    registers = [r[len(prefix):] for r in client.registers if r.startswith(prefix)]
+    masters   = [r[:-len("_latency_max")] for r in registers if r.endswith("_latency_max")]
+    pairs     = []
+    for r in registers:
+        if r.endswith("_wait") and "_to_" in r:
+            master, _, slave = r[:-len("_wait")].partition("_to_")
+            if master in masters:
+                pairs.append((master, slave))
+    return masters, pairs
+
+def read_window(client, masters, pairs, name="busmon"):
+    """Read a complete window (retried if the window ends during the read)."""
+    while True:
+        with client.batch() as b:
+            start  = b.read(name + "_windows")
+            window = b.read(name + "_window")
+            values = {}
+            for m in masters:
+                for f in MASTER_FIELDS:
+                    values[(m, f)] = b.read("{}_{}_{}".format(name, m, f))
+            for m, s in pairs:
+                for f in PAIR_FIELDS:
+                    values[(m, s, f)] = b.read("{}_{}_to_{}_{}".format(name, m, s, f))
+            end = b.read(name + "_windows")
+        if start.value == end.value:
+            return end.value, window.value, {k: v.value for k, v in values.items()}
+
+def report(windows, window, values, masters, pairs, csv=False):
+    if csv:
+        for m in masters:
+            print(",".join(str(x) for x in [windows, m, ""] + [values[(m, f)] for f in MASTER_FIELDS]))
+        for m, s in pairs:
+            print(",".join(str(x) for x in [windows, m, s] + [values.get((m, s, f), "") for f in MASTER_FIELDS]))
+        return
+    print("Window {} ({} cycles)".format(windows, window))
+    print("  {:24s} {:>12s} {:>7s} {:>7s} {:>7s} {:>8s} {:>8s}".format(
+        "Master", "Transactions", "Busy%", "Wait%", "Cont%", "AvgLat", "MaxLat"))
+    for m in masters:
+        v = lambda f: values[(m, f)]
+        print("  {:24s} {:12d} {:7.2f} {:7.2f} {:7.2f} {:8.2f} {:8d}".format(m,
+            v("transactions"),
+            100*v("busy")/window,
+            100*v("wait")/window,
+            100*v("contention")/window,
+            v("busy")/v("transactions") if v("transactions") else 0,
+            v("latency_max")))
+    active = [(m, s) for m, s in pairs if values[(m, s, "transactions")] or values[(m, s, "wait")]]
+    if active:
+        print("  {:40s} {:>12s} {:>7s}".format("Master -> Slave", "Transactions", "Wait%"))
+        for m, s in active:
+            print("  {:40s} {:12d} {:7.2f}".format("{} -> {}".format(m, s),
+                values[(m, s, "transactions")],
+                100*values[(m, s, "wait")]/window))
+
+def main():
+    parser = argparse.ArgumentParser(description="Bus utilization/contention monitor.")
+    parser.add_argument("--csr-json",  required=True,              help="SoC csr.json.")
+    parser.add_argument("--etherbone", default=None,               help="Etherbone IP address.")
+    parser.add_argument("--uartbone",  default=None,               help="UARTbone serial port.")
+    parser.add_argument("--baudrate",  default=115200, type=int,   help="UARTbone baudrate.")
+    parser.add_argument("--window",    default=None,   type=int,   help="Set the window length (sys_clk cycles).")
+    parser.add_argument("--count",     default=0,      type=int,   help="Number of windows to report (0 for endless).")
+    parser.add_argument("--csv",       action="store_true",        help="CSV output (window,master,slave,values...).")
+    args = parser.parse_args()
+
+    if args.etherbone is not None:
+        transport = EtherboneTransport(ip=args.etherbone)
+    elif args.uartbone is not None:
+        transport = UARTboneTransport(port=args.uartbone, baudrate=args.baudrate)
+    else:
+        parser.error("--etherbone or --uartbone required.")
+    client = CSRClient(transport, args.csr_json)
+
+    try:
+        masters, pairs = busmon_layout(client)
+        if not masters:
+            raise ValueError("Bus monitor not found in csr.json (build with --with-bus-monitor).")
+        if args.window is not None:
+            client.write("busmon_window", args.window)
+        if args.csv:
+            print("window,master,slave," + ",".join(MASTER_FIELDS))
+        last = client.read("busmon_windows")
+        n    = 0
+        while args.count == 0 or n < args.count:
+            windows, window, values = read_window(client, masters, pairs)
+            if windows == last:
+                time.sleep(0.01)
+                continue
+            if windows != last + 1:
+                print("Missed {} window(s).".format(windows - last - 1), file=sys.stderr)
+            last = windows
+            report(windows, window, values, masters, pairs, csv=args.csv)
+            n += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    main()
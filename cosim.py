@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+
+#
+# This file is part of Linux-on-LiteX-VexRiscv
+#
+# Copyright (c) 2019-2022, Linux-on-LiteX-VexRiscv Developers
+# SPDX-License-Identifier: BSD-2-Clause
+
+import os
+import sys
+import json
+import time
+import socket
+import struct
+import asyncio
+import argparse
+import subprocess
+
+# Co-Simulation Hub --------------------------------------------------------------------------------
+
+class CoSimHub:
+    """Routes test core packets between simulation nodes (see sim_modules/packetlink)."""
+    def __init__(self, nodes, topology="ring", sync=0):
+        self.nodes    = nodes
+        self.topology = topology
+        self.sync     = sync
+        self.writers  = {}
+        self.pending  = {n: [] for n in range(nodes)}
+        self.active   = set(range(nodes))
+        self.synced   = set()
+        self.stats    = {n: {"tx_packets": 0, "rx_packets": 0, "cycles": 0} for n in range(nodes)}
+        self.start    = None
+
+    def destinations(self, node):
+        if self.topology == "ring":
+            return [(node + 1) % self.nodes]
+        if self.topology == "broadcast":
+            return [n for n in range(self.nodes) if n != node]
+        if self.topology == "loopback":
+            return [node]
+        raise ValueError("Unknown topology: {}".format(self.topology))
+
+    def send(self, node, frame):
+        if node in self.writers:
+            self.writers[node].write(frame)
+        else:
+            self.pending[node].append(frame)
+
+    def check_sync(self):
+        if self.synced and self.synced >= self.active:
+            cycle = max(self.stats[n]["cycles"] for n in self.synced)
+            for n in self.synced:
+                self.send(n, b"G" + struct.pack("<Q", cycle))
+            self.synced = set()
+
+    async def handle(self, reader, writer):
+        node = len(self.writers)
+        if node >= self.nodes:
+            writer.close()
+            return
+        if self.start is None:
+            self.start = time.time()
+        self.writers[node] = writer
+        for frame in self.pending[node]:
+            writer.write(frame)
+        self.pending[node] = []
+        try:
+            while True:
+                frame_type = await reader.readexactly(1)
+                if frame_type == b"P":
+                    data = await reader.readexactly(4)
+                    self.stats[node]["tx_packets"] += 1
+                    for dst in self.destinations(node):
+                        self.stats[dst]["rx_packets"] += 1
+                        self.send(dst, b"P" + data)
+                elif frame_type == b"S":
+                    self.stats[node]["cycles"] = struct.unpack("<Q", await reader.readexactly(8))[0]
+                    self.synced.add(node)
+                    self.check_sync()
+                else:
+                    raise ValueError("Invalid frame type {} from node {}".format(frame_type, node))
+                await writer.drain()
+        except asyncio.IncompleteReadError:
+            pass
+        finally:
+            self.active.discard(node)
+            self.synced.discard(node)
+            self.check_sync()
+
+    def summary(self):
+        duration = time.time() - self.start if self.start is not None else 0
+        r = {"nodes": self.nodes, "topology": self.topology, "sync": self.sync, "duration": duration, "node": {}}
+        for n, stats in self.stats.items():
+            stats = dict(stats)
+            stats["tx_packets_per_second"] = stats["tx_packets"]/duration if duration else 0
+            if stats["cycles"]:
+                stats["tx_packets_per_kcycle"] = 1e3*stats["tx_packets"]/stats["cycles"]
+            r["node"][n] = stats
+        return r
+
+# Co-Simulation ------------------------------------------------------------------------------------
+
+async def run_cosim(hub, sock, gateware_dir, log_dir, duration):
+    server = await asyncio.start_server(hub.handle, sock=sock)
+    processes = []
+    for n in range(hub.nodes):
+        log = open(os.path.join(log_dir, "node{}.log".format(n)), "wb")
+        # Per-node simulation statistics (all the nodes run the same simulation config).
+        env = dict(os.environ, SIMSTATS_OUTPUT=os.path.abspath(os.path.join(log_dir, "node{}.simstats.json".format(n))))
+        processes.append(await asyncio.create_subprocess_exec(os.path.join("obj_dir", "Vsim"),
+            cwd    = gateware_dir,
+            env    = env,
+            stdin  = subprocess.DEVNULL,
+            stdout = log,
+            stderr = subprocess.STDOUT))
+    try:
+        waiters = asyncio.gather(*[p.wait() for p in processes])
+        await asyncio.wait_for(waiters, timeout=duration if duration else None)
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        for p in processes:
+            if p.returncode is None:
+                p.terminate()
+                await p.wait()
+        server.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Linux on LiteX-VexRiscv Multi-SoC Co-Simulation.")
+    parser.add_argument("--nodes",     default=2,      type=int,   help="Number of simulated SoCs.")
+    parser.add_argument("--topology",  default="ring",             help="Packet routing: ring, broadcast or loopback.")
+    parser.add_argument("--sync",      default=0,      type=int,   help="Synchronize the nodes every N cycles (0 for free-running).")
+    parser.add_argument("--port",      default=0,      type=int,   help="Hub TCP port (0 for automatic).")
+    parser.add_argument("--duration",  default=0,      type=float, help="Stop after N seconds (0 to wait for all the nodes to exit).")
+    parser.add_argument("--build-dir", default="build/sim",        help="Simulation build directory.")
+    args, sim_args = parser.parse_known_args()
+
+    # Hub socket (bound first so the address can be passed to the simulation config).
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("127.0.0.1", args.port))
+    sock.listen(args.nodes)
+    address = "127.0.0.1:{}".format(sock.getsockname()[1])
+
+    # Build the simulation once, all the nodes run the same binary.
+    subprocess.check_call([sys.executable, "sim.py", "--no-run",
+        "--build-dir",       args.build_dir,
+        "--packetlink",      address,
+        "--packetlink-sync", str(args.sync)] + sim_args)
+    build_dir    = args.build_dir
+    gateware_dir = os.path.join(build_dir, "gateware")
+    subprocess.check_call(["bash", "build_sim.sh"], cwd=gateware_dir)
+
+    # Run.
+    log_dir = os.path.join(build_dir, "cosim")
+    os.makedirs(log_dir, exist_ok=True)
+    hub = CoSimHub(nodes=args.nodes, topology=args.topology, sync=args.sync)
+    try:
+        asyncio.run(run_cosim(hub, sock, gateware_dir, log_dir, args.duration))
+    except KeyboardInterrupt:
+        pass
+
+    # Report.
+    summary = hub.summary()
+    with open(os.path.join(log_dir, "cosim.json"), "w") as f:
+        json.dump(summary, f, indent=4)
+    print("Co-simulation: {} nodes, {} topology, {:.1f}s".format(args.nodes, args.topology, summary["duration"]))
+    for n, stats in summary["node"].items():
+        print("- node{}: tx={} rx={} ({:.1f} packets/s)".format(
+            n, stats["tx_packets"], stats["rx_packets"], stats["tx_packets_per_second"]))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+
+#
+# This file is part of Linux-on-LiteX-VexRiscv
+#
+# Copyright (c) 2019-2022, Linux-on-LiteX-VexRiscv Developers
+# SPDX-License-Identifier: BSD-2-Clause
+
+import json
+import time
+import socket
+import argparse
+from collections import deque
+
+from litex.tools.remote.etherbone import EtherbonePacket, EtherboneRecord
+from litex.tools.remote.etherbone import EtherboneReads, EtherboneWrites
+
+# Batched CSR/Bus access over a host bridge (Etherbone or UARTbone), without litex_server.
+#
+# Accesses are queued as operations: ("w", addr, data) / ("r", addr). A batch is encoded in as few
+# bridge requests as possible (Etherbone records: write bursts + up to 255 reads, UARTbone: burst
+# commands) and requests are pipelined: up to `window` requests are in flight before waiting for
+# the replies.
+
+# Etherbone Transport ------------------------------------------------------------------------------
+
+class EtherboneTransport:
+    max_writes = 255
+    max_reads  = 255
+
+    def __init__(self, ip="192.168.1.50", port=1234, window=4, timeout=1.0, addr_width=32):
+        self.address    = (ip, port)
+        self.window     = window
+        self.timeout    = timeout
+        self.addr_width = addr_width
+        self.counter    = 0
+        self.socket     = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind(("", port)) # Etherbone replies are sent to the Etherbone port.
+        self.socket.settimeout(timeout)
+
+    def close(self):
+        self.socket.close()
+
+    def records(self, ops):
+        # Group operations in records: one write burst (incrementing addresses) followed by reads,
+        # as the SoC executes the writes of a record before its reads.
+        records = []
+        writes, base, reads = [], None, []
+        for op in ops:
+            if op[0] == "w":
+                if reads or len(writes) == self.max_writes or (writes and op[1] != base + 4*len(writes)):
+                    records.append((base, writes, reads))
+                    writes, base, reads = [], None, []
+                if not writes:
+                    base = op[1]
+                writes.append(op[2])
+            else:
+                if len(reads) == self.max_reads:
+                    records.append((base, writes, reads))
+                    writes, base, reads = [], None, []
+                reads.append(op[1])
+        if writes or reads:
+            records.append((base, writes, reads))
+        return records
+
+    def encode(self, base, writes, reads, tag):
+        addr_size = self.addr_width//8
+        record = EtherboneRecord(addr_size=addr_size)
+        if writes:
+            record.writes = EtherboneWrites(addr_size=addr_size, base_addr=base, datas=writes)
+        if reads:
+            record.reads  = EtherboneReads(addr_size=addr_size, base_ret_addr=tag, addrs=reads)
+        packet = EtherbonePacket(self.addr_width)
+        packet.records = [record]
+        packet.encode()
+        return packet.bytes
+
+    def receive(self, pending, results):
+        try:
+            datas, _ = self.socket.recvfrom(8192)
+        except socket.timeout:
+            raise TimeoutError("No Etherbone reply from {}:{}.".format(*self.address))
+        packet = EtherbonePacket(self.addr_width, datas)
+        packet.decode()
+        if packet.pr or not packet.records:
+            return
+        record = packet.records.pop()
+        tag    = record.writes.base_addr
+        if tag in pending:
+            results[pending.pop(tag)] = record.writes.get_datas()
+
+    def execute(self, ops):
+        records = self.records(ops)
+        results = [None]*len(records)
+        pending = {}
+        for n, (base, writes, reads) in enumerate(records):
+            tag = None
+            if reads:
+                self.counter = (self.counter + 1) & 0xffffffff
+                tag          = self.counter
+                pending[tag] = n
+            else:
+                results[n] = []
+            self.socket.sendto(self.encode(base, writes, reads, tag or 0), self.address)
+            while len(pending) >= self.window:
+                self.receive(pending, results)
+        while pending:
+            self.receive(pending, results)
+        return [value for r in results for value in r]
+
+# UARTbone Transport -------------------------------------------------------------------------------
+
+class UARTboneTransport:
+    max_writes = 8
+    max_reads  = 255
+
+    CMD_WRITE_BURST_INCR = 0x01
+    CMD_READ_BURST_INCR  = 0x02
+
+    def __init__(self, port="/dev/ttyUSB1", baudrate=115200, window=64, timeout=1.0, addr_width=32):
+        import serial
+        self.port       = serial.serial_for_url(port, baudrate, timeout=timeout)
+        self.window     = window
+        self.addr_bytes = addr_width//8
+
+    def close(self):
+        self.port.close()
+
+    def commands(self, ops):
+        # Merge consecutive operations of the same type on incrementing addresses in bursts.
+        cmds = []
+        for op in ops:
+            if cmds:
+                kind, base, datas = cmds[-1]
+                limit = self.max_writes if kind == "w" else self.max_reads
+                if kind == op[0] and op[1] == base + 4*len(datas) and len(datas) < limit:
+                    datas.append(op[2] if kind == "w" else None)
+                    continue
+            cmds.append((op[0], op[1], [op[2] if op[0] == "w" else None]))
+        return cmds
+
+    def encode(self, kind, base, datas):
+        cmd = self.CMD_WRITE_BURST_INCR if kind == "w" else self.CMD_READ_BURST_INCR
+        r   = bytes([cmd, len(datas)]) + (base//4).to_bytes(self.addr_bytes, "big")
+        if kind == "w":
+            r += b"".join(d.to_bytes(4, "big") for d in datas)
+        return r
+
+    def receive(self, length):
+        r = self.port.read(4*length)
+        if len(r) != 4*length:
+            raise TimeoutError("No UARTbone reply on {}.".format(self.port.port))
+        return [int.from_bytes(r[4*i:4*(i+1)], "big") for i in range(length)]
+
+    def execute(self, ops):
+        self.port.reset_input_buffer()
+        results = []
+        pending = deque()
+        for kind, base, datas in self.commands(ops):
+            self.port.write(self.encode(kind, base, datas))
+            if kind == "r":
+                pending.append(len(datas))
+            while sum(pending) >= self.window:
+                results += self.receive(pending.popleft())
+        self.port.flush()
+        while pending:
+            results += self.receive(pending.popleft())
+        return results
+
+# CSR Client ---------------------------------------------------------------------------------------
+
+class BatchRead:
+    def __init__(self, size, raw=False):
+        self.size  = size
+        self.raw   = raw   # True: value is the list of words, False: words combined (MSB first).
+        self.value = None
+
+class Batch:
+    """Queued accesses, executed in one pass on flush (or when leaving the with block)."""
+    def __init__(self, client):
+        self.client = client
+        self.ops    = []
+        self.reads  = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        if args[0] is None:
+            self.flush()
+
+    def read(self, name):
+        addr, size = self.client.register(name)
+        read = BatchRead(size)
+        self.ops   += [("r", addr + 4*i) for i in range(size)]
+        self.reads.append(read)
+        return read
+
+    def write(self, name, value):
+        addr, size = self.client.register(name)
+        # Multi-word CSRs: MSB word first.
+        for i in range(size):
+            self.ops.append(("w", addr + 4*i, (value >> (32*(size - 1 - i))) & 0xffffffff))
+
+    def read_bus(self, addr, length=1):
+        read = BatchRead(length, raw=True)
+        self.ops  += [("r", addr + 4*i) for i in range(length)]
+        self.reads.append(read)
+        return read
+
+    def write_bus(self, addr, datas, incr=True):
+        self.ops += [("w", addr + (4*i if incr else 0), d) for i, d in enumerate(datas)]
+
+    def flush(self):
+        values = self.client.transport.execute(self.ops)
+        for read in self.reads:
+            words, values = values[:read.size], values[read.size:]
+            if read.raw:
+                read.value = words
+            else:
+                read.value = 0
+                for w in words:
+                    read.value = (read.value << 32) | w
+        self.ops   = []
+        self.reads = []
+
+class CSRClient:
+    def __init__(self, transport, csr_json):
+        self.transport = transport
+        with open(csr_json) as f:
+            d = json.load(f)
+        self.registers = {k: (v["addr"], v["size"]) for k, v in d["csr_registers"].items()}
+        self.memories  = d.get("memories", {})
+        self.constants = d.get("constants", {})
+
+    def register(self, name):
+        if isinstance(name, int):
+            return name, 1
+        if name not in self.registers:
+            raise KeyError("Unknown CSR register: {}.".format(name))
+        return self.registers[name]
+
+    def batch(self):
+        return Batch(self)
+
+    def read(self, name):
+        with self.batch() as b:
+            r = b.read(name)
+        return r.value
+
+    def write(self, name, value):
+        with self.batch() as b:
+            b.write(name, value)
+
+    def close(self):
+        self.transport.close()
+
+# Commands -----------------------------------------------------------------------------------------
+
+def dump(client, args):
+    with client.batch() as b:
+        reads = {name: b.read(name) for name in sorted(client.registers)}
+    for name, r in reads.items():
+        print("{:40s} 0x{:08x}".format(name, r.value))
+
+def bench(client, args):
+    # Batched reads of the first CSR (N per flush) vs one round-trip per read.
+    name = args.register or sorted(client.registers)[0]
+    for batch in [1, args.batch]:
+        start = time.time()
+        for _ in range(args.count//batch):
+            with client.batch() as b:
+                for _ in range(batch):
+                    b.read(name)
+        duration = time.time() - start
+        print("batch={:4d}: {:10.0f} reads/s".format(batch, (args.count//batch)*batch/duration))
+
+def inject(client, args):
+    # Random packets written in bursts to the send_core Wishbone window (--test-core-wishbone).
+    from test_core_final.packet import PacketLayout
+    if "send_core" not in client.memories:
+        raise ValueError("send_core Wishbone window not found (build with --test-core-wishbone).")
+    base    = client.memories["send_core"]["base"]
+    layout  = PacketLayout.from_csr_json({"constants": client.constants})
+    packets = [int(p) for p in layout.random(args.count)]
+    start   = time.time()
+    for n in range(0, len(packets), args.batch):
+        with client.batch() as b:
+            b.write_bus(base, packets[n:n + args.batch])
+    duration = time.time() - start
+    print("Injected {} packets in {:.2f}s ({:.0f} packets/s).".format(len(packets), duration, len(packets)/duration))
+
+# Main ---------------------------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Batched CSR access over Etherbone/UARTbone.")
+    parser.add_argument("--csr-json",  required=True,              help="SoC csr.json.")
+    parser.add_argument("--etherbone", default=None,               help="Etherbone IP address.")
+    parser.add_argument("--uartbone",  default=None,               help="UARTbone serial port.")
+    parser.add_argument("--baudrate",  default=115200, type=int,   help="UARTbone baudrate.")
+    parser.add_argument("--window",    default=None,   type=int,   help="Pipelining window (requests for Etherbone, words for UARTbone).")
+    parser.add_argument("--count",     default=10000,  type=int,   help="Number of accesses/packets (bench/inject).")
+    parser.add_argument("--batch",     default=64,     type=int,   help="Accesses per batch (bench/inject).")
+    parser.add_argument("--register",  default=None,               help="CSR register (bench).")
+    parser.add_argument("command",     choices=["read", "write", "dump", "bench", "inject"])
+    parser.add_argument("operands",    nargs="*",                  help="read: registers, write: register value.")
+    args = parser.parse_args()
+
+    kwargs = {} if args.window is None else {"window": args.window}
+    if args.etherbone is not None:
+        transport = EtherboneTransport(ip=args.etherbone, **kwargs)
+    elif args.uartbone is not None:
+        transport = UARTboneTransport(port=args.uartbone, baudrate=args.baudrate, **kwargs)
+    else:
+        parser.error("--etherbone or --uartbone required.")
+    client = CSRClient(transport, args.csr_json)
+
+    try:
+        if args.command == "read":
+            with client.batch() as b:
+                reads = [(name, b.read(name)) for name in args.operands]
+            for name, r in reads:
+                print("{}: 0x{:08x}".format(name, r.value))
+        elif args.command == "write":
+            client.write(args.operands[0], int(args.operands[1], 0))
+        else:
+            {"dump": dump, "bench": bench, "inject": inject}[args.command](client, args)
+    finally:
+        client.close()
+
+if __name__ == "__main__":
+    main()
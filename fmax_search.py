@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+
+#
+# This file is part of Linux-on-LiteX-VexRiscv
+#
+# Copyright (c) 2019-2022, Linux-on-LiteX-VexRiscv Developers
+# SPDX-License-Identifier: BSD-2-Clause
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from build_metrics import collect, git_revision
+
+# Maximum Frequency Search -------------------------------------------------------------------------
+#
+# Searches the highest sys_clk_freq meeting timing for a board/configuration (make.py arguments):
+# each round builds --jobs frequencies in parallel, evenly splitting the remaining interval between
+# the highest passing and the lowest failing frequency (binary search with --jobs=1), until the
+# interval is below --resolution. Timing is met when the build succeeds with a non-negative worst
+# setup slack (build_metrics.py records, nextpnr JSON report for the Yosys/nextpnr boards: ECP5
+# targets such as ulx3s, orangecrab, versa_ecp5...). Results are recorded in FMAX_DIR/fmax.json.
+
+def bounds(results):
+    """(highest passing, lowest failing above it) frequencies of {freq: passed} results."""
+    passing = [f for f, passed in results.items() if passed]
+    lo      = max(passing) if passing else None
+    failing = [f for f, passed in results.items() if not passed and (lo is None or f > lo)]
+    hi      = min(failing) if failing else None
+    return lo, hi
+
+def search_points(lo, hi, jobs, resolution):
+    """Up to jobs frequencies evenly splitting ]lo, hi[ (multiples of resolution)."""
+    step   = (hi - lo)/(jobs + 1)
+    points = set(round((lo + step*(i + 1))/resolution)*resolution for i in range(jobs))
+    return sorted(p for p in points if lo < p < hi)
+
+def search(evaluate, min_freq, max_freq, jobs, resolution):
+    """Highest passing frequency (None if min_freq fails), evaluate(freqs) returning {freq: passed}."""
+    results = evaluate(sorted(set([min_freq, max_freq] + search_points(min_freq, max_freq, max(jobs - 2, 0), resolution))))
+    while True:
+        lo, hi = bounds(results)
+        if lo is None or hi is None:
+            return lo
+        points = search_points(lo, hi, jobs, resolution)
+        if not points:
+            return lo
+        results.update(evaluate(points))
+
+def config_id(make_args):
+    return "_".join(re.sub("[^a-zA-Z0-9.=-]", "", a).lstrip("-") for a in make_args) or "default"
+
+def build(board, freq, build_dir, make_args):
+    """Build the board at freq, return its result (timing met, metrics)."""
+    os.makedirs(build_dir, exist_ok=True)
+    start = time.time()
+    with open(os.path.join(build_dir, "build.log"), "wb") as log:
+        status = subprocess.call([sys.executable, "make.py",
+            "--board",        board,
+            "--build",
+            "--sys-clk-freq", str(freq),
+            "--build-dir",    build_dir] + make_args,
+            stdin  = subprocess.DEVNULL,
+            stdout = log,
+            stderr = subprocess.STDOUT)
+    record = collect(board, os.path.join(build_dir, board, "gateware"), board, freq)
+    r = {"sys_clk_freq": freq, "status": status, "build_time": time.time() - start, "passed": False}
+    if record is not None:
+        r["fmax"]      = record["timing"]["fmax"]
+        r["wns"]       = record["timing"]["wns"]
+        r["resources"] = record["resources"]
+        r["passed"]    = status == 0 and r["wns"] is not None and r["wns"] >= 0
+    return r
+
+def main():
+    parser = argparse.ArgumentParser(description="Highest sys_clk_freq meeting timing per board (parallel builds).")
+    parser.add_argument("--boards",     required=True,                help="Comma-separated boards (Yosys/nextpnr targets).")
+    parser.add_argument("--min-freq",   default=40e6,    type=float,  help="Lowest searched frequency (Hz).")
+    parser.add_argument("--max-freq",   default=120e6,   type=float,  help="Highest searched frequency (Hz).")
+    parser.add_argument("--resolution", default=1e6,     type=float,  help="Search resolution (Hz).")
+    parser.add_argument("--jobs",       default=4,       type=int,    help="Builds in parallel (per search round).")
+    parser.add_argument("--fmax-dir",   default="build/fmax",         help="Output directory (builds, fmax.json).")
+    args, make_args = parser.parse_known_args()
+
+    database = os.path.join(args.fmax_dir, "fmax.json")
+    records  = {}
+    if os.path.exists(database):
+        with open(database) as f:
+            records = json.load(f)
+
+    for board in args.boards.split(","):
+        config = config_id(make_args)
+        builds = []
+        def evaluate(freqs):
+            def run(freq):
+                build_dir = os.path.join(args.fmax_dir, board, config, "{:.3f}MHz".format(freq/1e6))
+                return build(board, freq, build_dir, make_args)
+            with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+                results = list(executor.map(run, freqs))
+            for r in results:
+                print("{} {:8.3f}MHz: {} (WNS: {})".format(board, r["sys_clk_freq"]/1e6,
+                    "met" if r["passed"] else "failed" if r["status"] == 0 else "build error (status {})".format(r["status"]),
+                    "-" if r.get("wns") is None else "{:.3f}ns".format(r["wns"])))
+            builds.extend(results)
+            return {r["sys_clk_freq"]: r["passed"] for r in results}
+
+        fmax = search(evaluate, args.min_freq, args.max_freq, args.jobs, args.resolution)
+        records["{}/{}".format(board, config)] = {
+            "board"        : board,
+            "args"         : make_args,
+            "time"         : time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git"          : git_revision(),
+            "sys_clk_freq" : fmax,
+            "range"        : [args.min_freq, args.max_freq],
+            "resolution"   : args.resolution,
+            "builds"       : sorted(builds, key=lambda r: r["sys_clk_freq"]),
+        }
+        os.makedirs(args.fmax_dir, exist_ok=True)
+        with open(database, "w") as f:
+            json.dump(records, f, indent=4)
+
+        if fmax is None:
+            print("{} ({}): timing not met at {:.3f}MHz.".format(board, config, args.min_freq/1e6))
+        else:
+            print("{} ({}): highest sys_clk_freq meeting timing: {:.3f}MHz{}.".format(board, config, fmax/1e6,
+                " (search range limit)" if fmax == args.max_freq else ""))
+
+if __name__ == "__main__":
+    main()
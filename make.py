@@ -14,6 +14,9 @@ from litex.soc.integration.builder import Builder
 from litex.soc.cores.cpu.vexriscv_smp import VexRiscvSMP
 
 from soc_linux import SoCLinux
+from build_metrics import enable_reports, collect, save, summary
+from profiling import Profiler, report
+from test_core_final.packet import PacketLayout
 
 # Board Definition ---------------------------------------------------------------------------------
 
@@ -679,7 +682,10 @@ def main():
     parser.add_argument("--device",         default=None,                help="FPGA device.")
     parser.add_argument("--variant",        default=None,                help="FPGA board variant.")
     parser.add_argument("--toolchain",      default=None,                help="Toolchain use to build.")
+    parser.add_argument("--sys-clk-freq",   default=None,    type=float, help="System clock frequency (default: board's).")
+    parser.add_argument("--build-dir",      default="build",             help="Base build directory (BUILD_DIR/BOARD, also holding rv32.dtb when not build).")
     parser.add_argument("--uart-baudrate",  default=115.2e3, type=float, help="UART baudrate.")
+    parser.add_argument("--uart-dynamic-baudrate", action="store_true", help="UART baudrate programmable from software (serial_boot.py --baudrate).")
     parser.add_argument("--build",          action="store_true",         help="Build bitstream.")
     parser.add_argument("--load",           action="store_true",         help="Load bitstream (to SRAM).")
     parser.add_argument("--flash",          action="store_true",         help="Flash bitstream/images (to Flash).")
@@ -689,6 +695,17 @@ def main():
     parser.add_argument("--spi-data-width", default=8,   type=int,       help="SPI data width (max bits per xfer).")
     parser.add_argument("--spi-clk-freq",   default=1e6, type=int,       help="SPI clock frequency.")
     parser.add_argument("--fdtoverlays",    default="",                  help="Device Tree Overlays to apply.")
+    parser.add_argument("--test-core-wishbone", action="store_true",     help="Expose test core packet ports as Wishbone windows (instead of CSRs).")
+    parser.add_argument("--test-core-link-fifo", default=0, type=int,    help="Test core packet link buffering depth (0 for direct link).")
+    parser.add_argument("--test-core-layout", default=None,              help="Test core packet layout overrides of the Verilog parameters (e.g. num_axons=128,num_ticks=32).")
+    parser.add_argument("--with-etherbone", action="store_true",         help="Add Etherbone host bridge at --local-ip (replaces Linux Ethernet).")
+    parser.add_argument("--with-uartbone",  action="store_true",         help="Add UARTbone host bridge on the serial port (console moved to crossover UART).")
+    parser.add_argument("--test-core-udp",  action="store_true",         help="Bridge test core packets over UDP to --remote-ip (replaces Linux Ethernet with the hardware UDP/IP stack).")
+    parser.add_argument("--test-core-udp-port", default=2000, type=int,  help="Test core UDP port.")
+    parser.add_argument("--with-perf-counters", action="store_true",     help="Add bus/cycle performance counters (litex-perf tool in Linux).")
+    parser.add_argument("--with-bus-monitor", action="store_true",       help="Add windowed per-master bus utilization/contention monitor (busmon.py host tool).")
+    parser.add_argument("--profile",        action="store_true",         help="Profile the elaboration phases/add_* calls (BUILD_DIR/BOARD/profile.json).")
+    parser.add_argument("--profile-cprofile", action="store_true",       help="Also dump cProfile statistics per phase (BUILD_DIR/BOARD/profile/PHASE.prof).")
     VexRiscvSMP.args_fill(parser)
     args = parser.parse_args()
     
@@ -727,21 +744,32 @@ def main():
             soc_kwargs.update(variant=args.variant)
         if args.toolchain is not None:
             soc_kwargs.update(toolchain=args.toolchain)
+        if args.sys_clk_freq is not None:
+            soc_kwargs.update(sys_clk_freq=int(args.sys_clk_freq))
 
         # UART.
         soc_kwargs["uart_baudrate"] = int(args.uart_baudrate)
+        if args.uart_dynamic_baudrate:
+            soc_kwargs["uart_with_dynamic_baudrate"] = True
         if "crossover" in board.soc_capabilities:
             soc_kwargs.update(uart_name="crossover")
         if "usb_fifo" in board.soc_capabilities:
             soc_kwargs.update(uart_name="usb_fifo")
         if "usb_acm" in board.soc_capabilities:
             soc_kwargs.update(uart_name="usb_acm")
+        if args.with_uartbone:
+            soc_kwargs.update(uart_name="crossover")
 
         # Peripherals
         if "leds" in board.soc_capabilities:
             soc_kwargs.update(with_led_chaser=True)
         if "ethernet" in board.soc_capabilities:
-            soc_kwargs.update(with_ethernet=True)
+            if args.with_etherbone or args.test_core_udp:
+                soc_kwargs.update(with_etherbone=True, eth_ip=args.local_ip)
+            else:
+                soc_kwargs.update(with_ethernet=True)
+        elif args.with_etherbone or args.test_core_udp:
+            raise ValueError("{} has no Ethernet, --with-etherbone/--test-core-udp are not supported.".format(board_name))
         if "pcie" in board.soc_capabilities:
             soc_kwargs.update(with_pcie=True)
         if "spiflash" in board.soc_capabilities:
@@ -753,11 +781,21 @@ def main():
         if "framebuffer" in board.soc_capabilities:
             soc_kwargs.update(with_video_framebuffer=True)
 
+        # Profiler ---------------------------------------------------------------------------------
+        build_dir = os.path.join(args.build_dir, board_name)
+        profiler  = Profiler(
+            enabled      = args.profile or args.profile_cprofile,
+            cprofile_dir = os.path.join(build_dir, "profile") if args.profile_cprofile else None)
+        profiler.instrument(board.soc_cls)
+
         # SoC creation -----------------------------------------------------------------------------
+        profiler.start("soc")
         soc = SoCLinux(board.soc_cls, **soc_kwargs)
         board.platform = soc.platform
+        profiler.instrument(type(soc))
 
         # SoC constants ----------------------------------------------------------------------------
+        profiler.start("peripherals")
         for k, v in board.soc_constants.items():
             soc.add_constant(k, v)
 
@@ -792,32 +830,57 @@ def main():
             soc.add_xadc()
         if "icap_bitstream" in board.soc_capabilities:
             soc.add_icap_bitstream()
+        if args.with_uartbone:
+            soc.add_uartbone(uart_name="serial", baudrate=int(args.uart_baudrate))
 
         # add test_core
-        soc.add_test_core() 
+        soc.add_test_core(
+            with_wishbone   = args.test_core_wishbone,
+            link_fifo_depth = args.test_core_link_fifo,
+            layout          = None if args.test_core_layout is None else PacketLayout.from_string(args.test_core_layout),
+            udp_ip_address  = args.remote_ip if args.test_core_udp else None,
+            udp_port        = args.test_core_udp_port)
+
+        # Performance counters/bus monitor (after all the bus masters).
+        if args.with_perf_counters:
+            soc.add_perf_counters()
+        if args.with_bus_monitor:
+            soc.add_bus_monitor()
 
         # Build ------------------------------------------------------------------------------------
-        build_dir = os.path.join("build", board_name)
+        profiler.start("build")
         builder   = Builder(soc,
-            output_dir   = os.path.join("build", board_name),
+            output_dir   = build_dir,
             bios_options = ["TERM_MINI"],
             csr_json     = os.path.join(build_dir, "csr.json"),
             csr_csv      = os.path.join(build_dir, "csr.csv")
         )
+        enable_reports(soc.platform, board_name)
         builder.build(run=args.build, build_name=board_name)
 
+        # Build metrics ----------------------------------------------------------------------------
+        if args.build:
+            record = collect(board_name, builder.gateware_dir, board_name, soc.sys_clk_freq, sys.argv[1:])
+            if record is not None:
+                print("Build metrics ({}): {}".format(save(record, os.path.join(args.build_dir, "metrics")), summary(record)))
+
         # DTS --------------------------------------------------------------------------------------
-        soc.generate_dts(board_name)
-        soc.compile_dts(board_name, args.fdtoverlays)
+        profiler.start("dts")
+        soc.generate_dts(board_name, build_dir=build_dir)
+        soc.compile_dts(board_name, args.fdtoverlays, build_dir=build_dir)
 
         # DTB --------------------------------------------------------------------------------------
-        soc.combine_dtb(board_name, args.fdtoverlays)
+        # Shared images/rv32.dtb only for the default build directory (--build-dir: BUILD_DIR/BOARD).
+        dtb_out = None if args.build_dir == "build" else os.path.join(build_dir, "rv32.dtb")
+        soc.combine_dtb(board_name, args.fdtoverlays, build_dir=build_dir, dtb_out=dtb_out)
 
         # PCIe Driver ------------------------------------------------------------------------------
         if "pcie" in board.soc_capabilities:
             from litepcie.software import generate_litepcie_software
             generate_litepcie_software(soc, os.path.join(builder.output_dir, "driver"))
 
+        profiler.stop()
+
         # Load FPGA bitstream ----------------------------------------------------------------------
         if args.load:
             board.load(filename=builder.get_bitstream_filename(mode="sram"))
@@ -828,7 +891,14 @@ def main():
 
         # Generate SoC documentation ---------------------------------------------------------------
         if args.doc:
-            soc.generate_doc(board_name)
+            profiler.start("doc")
+            soc.generate_doc(board_name, build_dir=build_dir)
+
+        # Profile ----------------------------------------------------------------------------------
+        profiler.restore()
+        if profiler.enabled:
+            profiler.save(os.path.join(build_dir, "profile.json"), board=board_name, args=sys.argv[1:])
+            report(profiler.summary())
 
         
 
@@ -0,0 +1,113 @@
+#
+# This file is part of Linux-on-LiteX-VexRiscv
+#
+# Copyright (c) 2019-2022, Linux-on-LiteX-VexRiscv Developers
+# SPDX-License-Identifier: BSD-2-Clause
+
+from migen import *
+
+from litex.soc.interconnect import wishbone
+from litex.soc.interconnect.csr import *
+
+# Bus Monitor --------------------------------------------------------------------------------------
+#
+# Windowed bus utilization/contention statistics: events are accumulated over a window of N sys_clk
+# cycles, then latched in the CSRs (and the windows counter incremented) while the next window is
+# accumulated, so the host can read a complete window at its own pace (see busmon.py).
+#
+# Per master:
+# - <master>_transactions: completed accesses (cyc & stb & ack).
+# - <master>_busy:         cycles with an access pending (cyc & stb), i.e. the sum of the latencies.
+# - <master>_wait:         cycles waiting for the interconnect/slave (cyc & stb & ~ack).
+# - <master>_contention:   busy cycles while another master also has an access pending.
+# - <master>_latency_max:  longest access latency (cycles, request to ack).
+# Per master/slave pair (slave decoded from the master address):
+# - <master>_to_<slave>_transactions / <master>_to_<slave>_wait.
+
+class BusMonitor(Module, AutoCSR):
+    def __init__(self, masters, regions={}, window=int(1e6), width=32):
+        self._control = CSRStorage(fields=[
+            CSRField("enable", size=1, offset=0, reset=1, description="Monitor enable."),
+        ])
+        self._window  = CSRStorage(width, reset=window, description="Window length (sys_clk cycles).")
+        self._windows = CSRStatus(width, description="Number of completed windows (latched CSRs update).")
+
+        masters = {name: bus for name, bus in masters.items() if isinstance(bus, wishbone.Interface)}
+        self.counters = []
+
+        # Window.
+        count = Signal(width)
+        done  = Signal()
+        self.comb += done.eq(count >= (self._window.storage - 1))
+        self.sync += [
+            If(done,
+                count.eq(0),
+                self._windows.status.eq(self._windows.status + 1)
+            ).Elif(self._control.fields.enable,
+                count.eq(count + 1)
+            )
+        ]
+
+        def add_counter(name, event=None, value=None):
+            # Accumulates event (or tracks the max of value) over the window, latched on done.
+            acc = Signal(width)
+            csr = CSRStatus(width, name=name)
+            if event is not None:
+                update = If(self._control.fields.enable & event, acc.eq(acc + 1))
+            else:
+                update = If(self._control.fields.enable & (value > acc), acc.eq(value))
+            self.sync += [
+                If(done,
+                    csr.status.eq(acc),
+                    acc.eq(0)
+                ).Else(
+                    update
+                )
+            ]
+            self.counters.append(csr)
+
+        # Per master.
+        pending = {name: Signal(name="{}_pending".format(name)) for name in masters}
+        for name, bus in masters.items():
+            self.comb += pending[name].eq(bus.cyc & bus.stb)
+        for name, bus in masters.items():
+            ack     = bus.cyc & bus.stb & bus.ack
+            others  = [p for n, p in pending.items() if n != name]
+            latency = Signal(width)
+            self.sync += [
+                If(ack,
+                    latency.eq(0)
+                ).Elif(pending[name],
+                    latency.eq(latency + 1)
+                )
+            ]
+            add_counter("{}_transactions".format(name), event=ack)
+            add_counter("{}_busy".format(name),         event=pending[name])
+            add_counter("{}_wait".format(name),         event=pending[name] & ~bus.ack)
+            add_counter("{}_contention".format(name),   event=pending[name] & (Cat(*others) != 0) if others else 0)
+            add_counter("{}_latency_max".format(name),  value=Mux(ack, latency + 1, 0))
+
+            # Per master/slave pair.
+            for slave, region in regions.get(name, {}).items():
+                selected = Signal(name="{}_to_{}_selected".format(name, slave))
+                self.comb += selected.eq(pending[name] & region.decoder(bus)(bus.adr))
+                add_counter("{}_to_{}_transactions".format(name, slave), event=selected & bus.ack)
+                add_counter("{}_to_{}_wait".format(name, slave),         event=selected & ~bus.ack)
+
+    def get_csrs(self):
+        return [self._control, self._window, self._windows] + self.counters
+
+def busmon_taps(soc):
+    """Bus masters of soc (main and DMA buses) and the slave regions decoded for each master.
+
+    Returns (masters, regions) for BusMonitor: only the masters (and slaves) present when called are
+    tapped, so call it after the other bus masters are added.
+    """
+    masters = {}
+    regions = {}
+    for bus in [soc.bus] + ([soc.dma_bus] if hasattr(soc, "dma_bus") else []):
+        slaves = {name: bus.regions[name] for name in bus.slaves if name in bus.regions}
+        for name, interface in bus.masters.items():
+            masters[name] = interface
+            regions[name] = slaves
+    return masters, regions
@@ -0,0 +1,121 @@
+#
+# This file is part of Linux-on-LiteX-VexRiscv
+#
+# Copyright (c) 2019-2022, Linux-on-LiteX-VexRiscv Developers
+# SPDX-License-Identifier: BSD-2-Clause
+
+from migen import *
+
+from litex.soc.interconnect import wishbone
+from litex.soc.interconnect.csr import *
+
+from litedram.common import LiteDRAMNativePort
+
+# Performance Counters -----------------------------------------------------------------------------
+#
+# Free-running 64-bit event counters, latched together in their CSRs by a write to the snapshot CSR
+# (so all the counters of a sample are coherent). Counted events:
+# - cycles:                  sys_clk cycles.
+# - <master>_transactions:   completed Wishbone accesses (cyc & stb & ack) of each bus master.
+# - <master>_busy:           cycles with an access pending (cyc & stb).
+# - <master>_wait:           cycles with an access waiting for the slave (cyc & stb & ~ack).
+#
+# LiteDRAM native ports (VexRiscvSMP direct memory buses, without --with-wishbone-memory: the CPU
+# main memory traffic) are counted as masters too, on their command channel: transactions are the
+# accepted commands (cmd.valid & cmd.ready), busy/wait the cycles with a command pending/refused.
+#
+# Retired instructions are not exposed at the VexRiscvSMP cluster boundary: they are only available
+# from the harts' own instret counters (RISC-V counters/SBI PMU).
+#
+# The CSRs are ordered: control, reset, snapshot then the counters (2 words each, MSB first), see
+# perf_dts() for the matching Device Tree node.
+
+class PerfCounters(Module, AutoCSR):
+    def __init__(self, masters, width=64):
+        self._control  = CSRStorage(fields=[
+            CSRField("enable", size=1, offset=0, reset=1, description="Counters enable."),
+        ])
+        self._reset    = CSR()
+        self._snapshot = CSR()
+
+        # Events.
+        events = [("cycles", 1)]
+        for name, bus in masters.items():
+            if isinstance(bus, wishbone.Interface):
+                events += [
+                    ("{}_transactions".format(name), bus.cyc & bus.stb & bus.ack),
+                    ("{}_busy".format(name),         bus.cyc & bus.stb),
+                    ("{}_wait".format(name),         bus.cyc & bus.stb & ~bus.ack),
+                ]
+            elif isinstance(bus, LiteDRAMNativePort):
+                events += [
+                    ("{}_transactions".format(name), bus.cmd.valid & bus.cmd.ready),
+                    ("{}_busy".format(name),         bus.cmd.valid),
+                    ("{}_wait".format(name),         bus.cmd.valid & ~bus.cmd.ready),
+                ]
+        self.events = [name for name, _ in events]
+
+        # Counters.
+        self.counters = []
+        for name, event in events:
+            counter = Signal(width)
+            csr     = CSRStatus(width, name=name)
+            self.sync += [
+                If(self._reset.re,
+                    counter.eq(0)
+                ).Elif(self._control.fields.enable & event,
+                    counter.eq(counter + 1)
+                ),
+                If(self._snapshot.re,
+                    csr.status.eq(counter)
+                )
+            ]
+            self.counters.append(csr)
+
+    def get_csrs(self):
+        return [self._control, self._reset, self._snapshot] + self.counters
+
+def perf_taps(soc):
+    """Bus masters of soc counted by PerfCounters: main and DMA bus masters, and the CPU direct
+    LiteDRAM ports (cpu_mem0, cpu_mem1...). Call it after the other bus masters are added."""
+    masters = dict(soc.bus.masters)
+    if hasattr(soc, "dma_bus"):
+        masters.update(soc.dma_bus.masters)
+    for i, port in enumerate(getattr(soc.cpu, "memory_buses", [])):
+        masters["cpu_mem{}".format(i)] = port
+    return masters
+
+# Device Tree --------------------------------------------------------------------------------------
+
+def perf_dts(csr_json, name="perf"):
+    """Device Tree node describing the counters of a PerfCounters core from the SoC csr.json."""
+    base      = csr_json["csr_bases"][name]
+    registers = {k[len(name) + 1:]: v for k, v in csr_json["csr_registers"].items() if k.startswith(name + "_")}
+    counters  = [k for k in registers if k not in ["control", "reset", "snapshot"]]
+    counters.sort(key=lambda k: registers[k]["addr"])
+    end       = max(v["addr"] + 4*v["size"] for v in registers.values())
+    return """
+/ {{
+    soc {{
+        {name}@{base:x} {{
+            compatible = "litex,perf-counters";
+            reg = <0x{base:x} 0x{size:x}>;
+            litex,control-offset = <0x{control:x}>;
+            litex,reset-offset = <0x{reset:x}>;
+            litex,snapshot-offset = <0x{snapshot:x}>;
+            litex,counter-words = <{words}>;
+            litex,counters = {names};
+            litex,counter-offsets = <{offsets}>;
+        }};
+    }};
+}};
+""".format(
+        name     = name,
+        base     = base,
+        size     = end - base,
+        control  = registers["control"]["addr"]  - base,
+        reset    = registers["reset"]["addr"]    - base,
+        snapshot = registers["snapshot"]["addr"] - base,
+        words    = registers[counters[0]]["size"],
+        names    = ", ".join('"{}"'.format(k) for k in counters),
+        offsets  = " ".join("0x{:x}".format(registers[k]["addr"] - base) for k in counters))
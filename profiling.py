@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+
+#
+# This file is part of Linux-on-LiteX-VexRiscv
+#
+# Copyright (c) 2019-2022, Linux-on-LiteX-VexRiscv Developers
+# SPDX-License-Identifier: BSD-2-Clause
+
+import os
+import json
+import time
+import inspect
+import cProfile
+import argparse
+import resource
+import functools
+
+# Elaboration Profiler -----------------------------------------------------------------------------
+#
+# Records the wall time, CPU time (own and of the child processes: compilers, toolchains) and peak
+# RSS of the make.py/sim.py phases (SoC construction, peripherals, build, DTS...) and of each add_*
+# call of the SoC classes (inclusive times, nested calls of the same method counted once), with
+# optional cProfile dumps per phase. Summaries are saved as JSON (printed with ./profiling.py FILE).
+
+def _peak_rss():
+    """Peak RSS (KiB) of the process and of its children."""
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+
+def _children_cpu():
+    t = os.times()
+    return t.children_user + t.children_system
+
+class Profiler:
+    def __init__(self, enabled=True, cprofile_dir=None):
+        self.enabled      = enabled
+        self.cprofile_dir = cprofile_dir
+        self.phases       = {}
+        self._current     = None
+        self._active      = []
+        self._patched     = []
+        self._cprofile    = False
+
+    def _enter(self, name):
+        # cProfile only on the outermost phase (profilers can not be nested).
+        profile = None
+        if self.cprofile_dir is not None and not self._cprofile:
+            profile        = cProfile.Profile()
+            self._cprofile = True
+            profile.enable()
+        self._active.append(name)
+        return (name, time.perf_counter(), time.process_time(), _children_cpu(), profile)
+
+    def _exit(self, state):
+        name, wall, cpu, children_cpu, profile = state
+        wall         = time.perf_counter() - wall
+        cpu          = time.process_time() - cpu
+        children_cpu = _children_cpu() - children_cpu
+        self._active.pop()
+        if profile is not None:
+            profile.disable()
+            self._cprofile = False
+            os.makedirs(self.cprofile_dir, exist_ok=True)
+            count = self.phases.get(name, {}).get("count", 0)
+            profile.dump_stats(os.path.join(self.cprofile_dir, "{}{}.prof".format(name, "" if count == 0 else count)))
+        peak_rss, children_peak_rss = _peak_rss()
+        p = self.phases.setdefault(name, {"count": 0, "wall": 0.0, "cpu": 0.0, "children_cpu": 0.0})
+        p["count"]            += 1
+        p["wall"]             += wall
+        p["cpu"]              += cpu
+        p["children_cpu"]     += children_cpu
+        p["peak_rss_kib"]      = peak_rss
+        p["children_rss_kib"]  = children_peak_rss
+
+    def phase(self, name):
+        """Context manager profiling a phase (times accumulated over the phases of the same name)."""
+        profiler = self
+        class _Phase:
+            def __enter__(self):
+                self.state = profiler._enter(name) if profiler.enabled else None
+            def __exit__(self, *exc):
+                if self.state is not None:
+                    profiler._exit(self.state)
+        return _Phase()
+
+    def start(self, name):
+        """Start a sequential phase (ending the previous one)."""
+        self.stop()
+        if self.enabled:
+            self._current = self._enter(name)
+
+    def stop(self):
+        if self._current is not None:
+            self._exit(self._current)
+            self._current = None
+
+    def instrument(self, *classes, prefix="add_"):
+        """Profile the prefix* methods of the classes (and of their bases) until restore()."""
+        if not self.enabled:
+            return
+        for cls in classes:
+            for klass in cls.__mro__:
+                for name, method in list(vars(klass).items()):
+                    if not name.startswith(prefix) or not inspect.isfunction(method):
+                        continue
+                    if getattr(method, "_profiler", None) is self:
+                        continue
+                    setattr(klass, name, self._wrap(name, method))
+                    self._patched.append((klass, name, method))
+
+    def _wrap(self, name, method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            if name in self._active:
+                return method(*args, **kwargs)
+            state = self._enter(name)
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self._exit(state)
+        wrapper._profiler = self
+        return wrapper
+
+    def restore(self):
+        """Restore the instrumented methods."""
+        for klass, name, method in reversed(self._patched):
+            setattr(klass, name, method)
+        self._patched = []
+
+    def summary(self):
+        return [dict(name=name, **p) for name, p in self.phases.items()]
+
+    def save(self, filename, **info):
+        self.stop()
+        os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+        with open(filename, "w") as f:
+            json.dump(dict(info, phases=self.summary()), f, indent=4)
+
+def report(phases):
+    print("{:32s} {:>6s} {:>10s} {:>10s} {:>12s} {:>12s}".format(
+        "Phase", "Calls", "Wall(s)", "CPU(s)", "Child CPU(s)", "Peak RSS(MiB)"))
+    for p in phases:
+        print("{:32s} {:6d} {:10.3f} {:10.3f} {:12.3f} {:12.1f}".format(
+            p["name"], p["count"], p["wall"], p["cpu"], p["children_cpu"], p["peak_rss_kib"]/1024))
+
+def main():
+    parser = argparse.ArgumentParser(description="Print make.py/sim.py --profile summaries.")
+    parser.add_argument("profiles", nargs="+",               help="profile.json files.")
+    parser.add_argument("--sort",   default=None, choices=["wall", "cpu", "children_cpu", "peak_rss_kib"], help="Sort the phases.")
+    args = parser.parse_args()
+
+    for filename in args.profiles:
+        with open(filename) as f:
+            profile = json.load(f)
+        phases = profile["phases"]
+        if args.sort is not None:
+            phases = sorted(phases, key=lambda p: p[args.sort], reverse=True)
+        print("{} ({}):".format(filename, ", ".join("{}: {}".format(k, v) for k, v in profile.items() if k != "phases")))
+        report(phases)
+
+if __name__ == "__main__":
+    main()
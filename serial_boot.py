@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+
+#
+# This file is part of Linux-on-LiteX-VexRiscv
+#
+# Copyright (c) 2019-2022, Linux-on-LiteX-VexRiscv Developers
+# SPDX-License-Identifier: BSD-2-Clause
+
+import os
+import re
+import sys
+import json
+import time
+import zlib
+import argparse
+
+import serial
+
+from litex.tools.litex_term import SFLFrame, sfl_payload_length
+from litex.tools.litex_term import sfl_magic_req, sfl_magic_ack, sfl_cmd_load, sfl_cmd_jump
+from litex.tools.litex_term import sfl_ack_success, sfl_ack_crcerror
+
+# Delta Serial Boot --------------------------------------------------------------------------------
+#
+# Serial boot of the boot.json images only sending the blocks that differ from the target RAM:
+# - From the BIOS prompt, the CRC32 of each image block is computed on the target (crc command) and
+#   compared to the image one; mismatching blocks are refined down to --min-block-size. The target
+#   is queried (instead of trusting what was sent before) since the BIOS memtest and the previous
+#   Linux run overwrite parts of the RAM.
+# - The UART baudrate can be raised from the BIOS prompt (mem_write to the uart_phy_tuning_word CSR,
+#   SoC built with make.py --uart-dynamic-baudrate), the Linux console then stays at this baudrate.
+# - The changed blocks are sent with the BIOS serialboot protocol (SFL) and the last image booted.
+# The port is a serial device or a pyserial URL (socket://localhost:PORT for sim.py --serial-tcp).
+
+SFL_DATA_LENGTH = sfl_payload_length - 4
+
+# Pure helpers --------------------------------------------------------------------------------------
+
+def tuning_word(baudrate, clk_freq):
+    """RS232PHY tuning word for a baudrate."""
+    return int((baudrate/clk_freq)*2**32)
+
+def delta(data, address, crc, block_size, min_block_size, split=16):
+    """Blocks [(address, data)] of data (at address) differing from the target, crc(address, length)
+    returning the target CRC32. Mismatching blocks larger than min_block_size are split and refined."""
+    blocks = []
+    for offset in range(0, len(data), block_size):
+        chunk = data[offset:offset + block_size]
+        if crc(address + offset, len(chunk)) == zlib.crc32(chunk):
+            continue
+        if len(chunk) <= min_block_size:
+            blocks.append((address + offset, chunk))
+        else:
+            sub_block_size = max(min_block_size, block_size//split)
+            blocks += delta(chunk, address + offset, crc, sub_block_size, min_block_size, split)
+    return blocks
+
+def merge(blocks):
+    """Merge contiguous blocks."""
+    merged = []
+    for address, data in sorted(blocks):
+        if merged and merged[-1][0] + len(merged[-1][1]) == address:
+            merged[-1] = (merged[-1][0], merged[-1][1] + data)
+        else:
+            merged.append((address, data))
+    return merged
+
+def load_frames(address, data):
+    """SFL load frames of a block."""
+    for offset in range(0, len(data), SFL_DATA_LENGTH):
+        frame         = SFLFrame()
+        frame.cmd     = sfl_cmd_load
+        frame.payload = (address + offset).to_bytes(4, "big") + data[offset:offset + SFL_DATA_LENGTH]
+        yield frame
+
+# BIOS Console -------------------------------------------------------------------------------------
+
+class BIOSConsole:
+    def __init__(self, port, timeout=10.0, verbose=False):
+        self.port    = port
+        self.timeout = timeout
+        self.verbose = verbose
+
+    def read_until(self, patterns, timeout=None):
+        """Read until one of the patterns (bytes) is received, return (pattern, data)."""
+        deadline = time.time() + (self.timeout if timeout is None else timeout)
+        data     = b""
+        while time.time() < deadline:
+            c = self.port.read(self.port.in_waiting or 1)
+            if self.verbose:
+                sys.stdout.buffer.write(c)
+                sys.stdout.flush()
+            data += c
+            for pattern in patterns:
+                if data.endswith(pattern):
+                    return pattern, data
+        raise TimeoutError("Timeout waiting for {}.".format(" or ".join(repr(p) for p in patterns)))
+
+    def prompt(self, timeout=None):
+        """Get to the BIOS prompt (cancelling a pending serial boot)."""
+        self.port.write(b"\n")
+        while True:
+            pattern, data = self.read_until([b"> ", sfl_magic_req], timeout)
+            if pattern == sfl_magic_req:
+                self.port.write(b"Q")
+            elif b"litex" in data.split(b"\n")[-1]:
+                return
+
+    def command(self, command, timeout=None):
+        self.port.write(command.encode() + b"\n")
+        pattern, data = self.read_until([b"> "], timeout)
+        return data.decode(errors="replace")
+
+    def crc(self, address, length):
+        m = re.search(r"CRC32: ([0-9a-fA-F]{8})", self.command("crc 0x{:08x} 0x{:x}".format(address, length)))
+        if m is None:
+            raise RuntimeError("Invalid crc reply at 0x{:08x}.".format(address))
+        return int(m.group(1), 16)
+
+    def set_baudrate(self, address, baudrate, clk_freq):
+        self.port.write("mem_write 0x{:08x} 0x{:08x}\n".format(address, tuning_word(baudrate, clk_freq)).encode())
+        self.port.flush()
+        time.sleep(0.1)
+        self.port.baudrate = baudrate
+        self.port.reset_input_buffer()
+        self.prompt()
+
+    def send_frame(self, frame):
+        for retry in range(16):
+            self.port.write(frame.encode())
+            reply = self.port.read(1)
+            if reply == sfl_ack_success:
+                return
+            if reply != sfl_ack_crcerror:
+                raise RuntimeError("Unexpected serial boot reply {!r}.".format(reply))
+        raise RuntimeError("Too many serial boot CRC errors.")
+
+    def serialboot(self, blocks, boot_address):
+        self.port.write(b"serialboot\n")
+        self.read_until([sfl_magic_req])
+        self.port.write(sfl_magic_ack)
+        for address, data in blocks:
+            for frame in load_frames(address, data):
+                self.send_frame(frame)
+        frame         = SFLFrame()
+        frame.cmd     = sfl_cmd_jump
+        frame.payload = boot_address.to_bytes(4, "big")
+        self.send_frame(frame)
+
+# Run ----------------------------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Delta serial boot of the Linux images (changed blocks only).")
+    parser.add_argument("port",                                                  help="Serial port or pyserial URL (socket://localhost:PORT for sim.py --serial-tcp).")
+    parser.add_argument("--images",         default="images/boot.json",          help="Images boot.json.")
+    parser.add_argument("--speed",          default=115200,    type=int,         help="Current UART baudrate.")
+    parser.add_argument("--baudrate",       default=None,      type=int,         help="Switch to this baudrate before the upload (requires --csr-json).")
+    parser.add_argument("--csr-json",       default=None,                        help="SoC csr.json (uart_phy_tuning_word CSR, sys_clk frequency).")
+    parser.add_argument("--block-size",     default=1024*1024, type=int,         help="CRC block size.")
+    parser.add_argument("--min-block-size", default=4096,      type=int,         help="Smallest block size (refinement of mismatching blocks).")
+    parser.add_argument("--full",           action="store_true",                 help="Send all the images (no CRC comparison).")
+    parser.add_argument("--timeout",        default=10.0,      type=float,       help="BIOS reply timeout in seconds.")
+    parser.add_argument("--verbose",        action="store_true",                 help="Show the BIOS console output.")
+    args = parser.parse_args()
+
+    port    = serial.serial_for_url(args.port, baudrate=args.speed, timeout=args.timeout)
+    console = BIOSConsole(port, timeout=args.timeout, verbose=args.verbose)
+    console.prompt(timeout=60.0)
+
+    # Baudrate.
+    if args.baudrate is not None:
+        if args.csr_json is None:
+            parser.error("--csr-json required with --baudrate.")
+        with open(args.csr_json) as f:
+            csr_json = json.load(f)
+        if "uart_phy_tuning_word" not in csr_json["csr_registers"]:
+            parser.error("No uart_phy_tuning_word CSR (build with make.py --uart-dynamic-baudrate).")
+        console.set_baudrate(
+            address  = csr_json["csr_registers"]["uart_phy_tuning_word"]["addr"],
+            baudrate = args.baudrate,
+            clk_freq = csr_json["constants"]["config_clock_frequency"])
+        print("UART baudrate: {}.".format(args.baudrate))
+
+    # Changed blocks.
+    start  = time.time()
+    blocks = []
+    total  = 0
+    with open(args.images) as f:
+        images = json.load(f)
+    for name, base in images.items():
+        with open(os.path.join(os.path.dirname(args.images), name), "rb") as f:
+            data = f.read()
+        address = int(base, 0)
+        total  += len(data)
+        if args.full:
+            image_blocks = [(address, data)]
+        else:
+            image_blocks = delta(data, address, console.crc, args.block_size, args.min_block_size)
+        print("{:20s} {:8d}/{:8d} bytes to send.".format(name, sum(len(d) for a, d in image_blocks), len(data)))
+        blocks += image_blocks
+    blocks    = merge(blocks)
+    send_size = sum(len(d) for a, d in blocks)
+    check_time = time.time() - start
+
+    # Upload/boot.
+    start = time.time()
+    console.serialboot(blocks, int(list(images.values())[-1], 0))
+    upload_time = time.time() - start
+    print("Sent {} KiB of {} KiB ({} blocks) in {:.1f}s (+{:.1f}s CRC checks, {:.1f} KiB/s).".format(
+        send_size//1024, total//1024, len(blocks), upload_time, check_time, send_size/1024/max(upload_time, 1e-3)))
+    if args.baudrate is not None:
+        print("Console now at {} bauds (litex_term --speed={}).".format(args.baudrate, args.baudrate))
+
+if __name__ == "__main__":
+    main()
@@ -6,8 +6,13 @@
 # Copyright (c) 2019-2021, Linux-on-LiteX-VexRiscv Developers
 # SPDX-License-Identifier: BSD-2-Clause
 
+import os
+import sys
 import json
 import argparse
+import subprocess
+from functools import reduce
+from operator import or_
 
 from migen import *
 
@@ -19,6 +24,7 @@ from litex.build.sim.verilator import verilator_build_args, verilator_build_argd
 from litex.soc.interconnect.csr import *
 from litex.soc.integration.soc_core import *
 from litex.soc.integration.builder import *
+from litex.soc.integration.soc import SoCRegion
 from litex.soc.interconnect import wishbone
 from litex.soc.cores.cpu.vexriscv_smp import VexRiscvSMP
 
@@ -29,9 +35,22 @@ from litedram.core.controller import ControllerSettings
 
 from liteeth.phy.model import LiteEthPHYModel
 from liteeth.mac import LiteEthMAC
+from liteeth.core import LiteEthUDPIPCore
+from liteeth.frontend.etherbone import LiteEthEtherbone
 
 from litex.tools.litex_json2dts_linux import generate_dts
 
+from test_core_final.wb_send import RTLsend
+from test_core_final.wb_receive import RTLreceive
+from test_core_final.udp import TestCoreUDP
+from test_core_final.packet import PacketLayout
+
+from monitor.perf import PerfCounters, perf_taps, perf_dts
+from monitor.busmon import BusMonitor, busmon_taps
+
+from boot_layout import initrd_region
+from profiling import Profiler, report
+
 # IOs ----------------------------------------------------------------------------------------------
 
 _io = [
@@ -49,6 +68,63 @@ _io = [
         Subsignal("sink_ready", Pins(1)),
         Subsignal("sink_data",  Pins(8)),
     ),
+
+    # Ethernet (Stream Endpoint).
+    ("eth", 0,
+        Subsignal("source_valid", Pins(1)),
+        Subsignal("source_ready", Pins(1)),
+        Subsignal("source_data",  Pins(8)),
+
+        Subsignal("sink_valid", Pins(1)),
+        Subsignal("sink_ready", Pins(1)),
+        Subsignal("sink_data",  Pins(8)),
+    ),
+
+    # Packet link (test core <-> packetlink module).
+    ("packetlink", 0,
+        Subsignal("source_valid", Pins(1)),
+        Subsignal("source_ready", Pins(1)),
+        Subsignal("source_data",  Pins(32)),
+
+        Subsignal("sink_valid", Pins(1)),
+        Subsignal("sink_ready", Pins(1)),
+        Subsignal("sink_data",  Pins(32)),
+    ),
+
+    # Packet trace (recv_core -> packettrace module -> send_core).
+    ("packettrace", 0,
+        Subsignal("source_valid", Pins(1)),
+        Subsignal("source_ready", Pins(1)),
+        Subsignal("source_data",  Pins(32)),
+
+        Subsignal("sink_valid", Pins(1)),
+        Subsignal("sink_ready", Pins(1)),
+        Subsignal("sink_data",  Pins(32)),
+    ),
+
+    # Trace trigger (console -> tracetrigger module -> trace enable).
+    ("tracetrigger", 0,
+        Subsignal("console_valid", Pins(1)),
+        Subsignal("console_data",  Pins(8)),
+        Subsignal("trigger",       Pins(1)),
+    ),
+
+    # Host file (Wishbone window -> hostfile module).
+    ("hostfile", 0,
+        Subsignal("adr",   Pins(30)),
+        Subsignal("dat_w", Pins(32)),
+        Subsignal("dat_r", Pins(32)),
+        Subsignal("sel",   Pins(4)),
+        Subsignal("we",    Pins(1)),
+        Subsignal("stb",   Pins(1)),
+        Subsignal("ack",   Pins(1)),
+    ),
+
+    # Supervisor (headless module -> finish, exit status -> headless module).
+    ("supervisor", 0,
+        Subsignal("finish", Pins(1)),
+        Subsignal("status", Pins(8)),
+    ),
 ]
 
 # Platform -----------------------------------------------------------------------------------------
@@ -63,8 +139,51 @@ class Supervisor(Module, AutoCSR):
     def __init__(self):
         self._finish = CSR()    # Controlled from CPU.
         self.finish  = Signal() # Controlled from logic.
+        self._trace  = CSRStorage(description="Waveform trace enable (with --trace-csr).")
+        self._status = CSRStorage(8, description="Simulation exit status (with --headless).")
+        self.status  = self._status.storage
         self.sync += If(self._finish.re | self.finish, Finish())
 
+# Host File ----------------------------------------------------------------------------------------
+
+class HostFile(Module):
+    """Wishbone memory window backed by a host file (accesses served by the hostfile module)."""
+    def __init__(self, pads, size):
+        self.bus = bus = wishbone.Interface(data_width=32)
+        self.comb += [
+            pads.adr.eq(bus.adr & (size//4 - 1)),
+            pads.dat_w.eq(bus.dat_w),
+            pads.sel.eq(bus.sel),
+            pads.we.eq(bus.we),
+            pads.stb.eq(bus.cyc & bus.stb),
+            bus.dat_r.eq(pads.dat_r),
+            bus.ack.eq(pads.ack & bus.cyc & bus.stb),
+        ]
+
+# Trace Control ------------------------------------------------------------------------------------
+
+class TraceControl(Module):
+    """Drives the platform trace enable: OR of the configured sources (always on when none)."""
+    def __init__(self, trace, cycles=None, trigger=None, csr=None):
+        enables = []
+        # Cycle window: (start, end), end None for until the end of the simulation.
+        if cycles is not None:
+            start, end = cycles
+            cycle  = Signal(64)
+            window = Signal()
+            self.sync += cycle.eq(cycle + 1)
+            self.comb += window.eq(cycle >= start)
+            if end is not None:
+                self.comb += If(cycle >= end, window.eq(0))
+            enables.append(window)
+        # Trigger from the tracetrigger module (console regex).
+        if trigger is not None:
+            enables.append(trigger)
+        # Supervisor CSR (controlled from the CPU).
+        if csr is not None:
+            enables.append(csr)
+        self.comb += trace.eq(reduce(or_, enables) if enables else 1)
+
 # SoCLinux -----------------------------------------------------------------------------------------
 
 class SoCLinux(SoCCore):
@@ -72,19 +191,37 @@ class SoCLinux(SoCCore):
         init_memories    = False,
         sdram_module     = "MT48LC16M16",
         sdram_data_width = 32,
-        sdram_verbosity  = 0):
+        sdram_verbosity  = 0,
+        ram_model        = "sdram",
+        l2_size          = 0,
+        with_test_core   = False,
+        test_core_layout = None,
+        with_packetlink  = False,
+        with_udp         = False,
+        local_ip         = "192.168.1.51",
+        remote_ip        = "192.168.1.100",
+        udp_port         = 2000,
+        with_packettrace = False,
+        with_etherbone   = False,
+        trace_cycles     = None,
+        trace_trigger    = False,
+        trace_csr        = False,
+        with_headless    = False,
+        hostfile_size    = 0,
+        with_perf        = False,
+        with_busmon      = False,
+        boot_json        = "images/boot.json"):
 
         # Parameters.
         sys_clk_freq = int(100e6)
 
         # Platform.
         platform     = Platform()
-        self.comb += platform.trace.eq(1)
 
         # RAM Initialization.
         ram_init = []
         if init_memories:
-            ram_init = get_mem_data("images/boot.json", endianness="little", offset=0x40000000)
+            ram_init = get_mem_data(boot_json, endianness="little", offset=0x40000000)
 
         # CRG --------------------------------------------------------------------------------------
         self.submodules.crg = CRG(platform.request("sys_clk"))
@@ -97,11 +234,42 @@ class SoCLinux(SoCCore):
             uart_name                = "sim")
         self.add_config("DISABLE_DELAYS")
 
-        # Boot from OpenSBI.
-        self.add_constant("ROM_BOOT_ADDRESS", self.bus.regions["opensbi"].origin)
+        # Boot from OpenSBI (or the last boot.json image: boot_pack.py unpacker).
+        boot_address = self.bus.regions["opensbi"].origin
+        if init_memories:
+            with open(boot_json) as f:
+                boot_address = int(list(json.load(f).values())[-1], 0)
+        self.add_constant("ROM_BOOT_ADDRESS", boot_address)
 
         # Supervisor -------------------------------------------------------------------------------
         self.submodules.supervisor = Supervisor()
+        if with_headless:
+            supervisor_pads = platform.request("supervisor")
+            self.comb += [
+                self.supervisor.finish.eq(supervisor_pads.finish),
+                supervisor_pads.status.eq(self.supervisor.status),
+            ]
+
+        # Host File --------------------------------------------------------------------------------
+        if hostfile_size:
+            self.submodules.hostfile = HostFile(platform.request("hostfile"), hostfile_size)
+            self.bus.add_slave("hostfile", self.hostfile.bus, SoCRegion(
+                size   = hostfile_size,
+                cached = False))
+
+        # Trace Control ----------------------------------------------------------------------------
+        trigger = None
+        if trace_trigger:
+            tracetrigger_pads = platform.request("tracetrigger")
+            self.comb += [
+                tracetrigger_pads.console_valid.eq(self.uart_phy.sink.valid & self.uart_phy.sink.ready),
+                tracetrigger_pads.console_data.eq(self.uart_phy.sink.data),
+            ]
+            trigger = tracetrigger_pads.trigger
+        self.submodules.trace_control = TraceControl(platform.trace,
+            cycles  = trace_cycles,
+            trigger = trigger,
+            csr     = self.supervisor._trace.storage if trace_csr else None)
 
         # SDRAM ------------------------------------------------------------------------------------
         sdram_clk_freq   = int(100e6) # FIXME: use 100MHz timings
@@ -112,30 +280,162 @@ class SoCLinux(SoCCore):
             memtype    = sdram_module.memtype,
             data_width = sdram_data_width,
             clk_freq   = sdram_clk_freq)
-        self.submodules.sdrphy = SDRAMPHYModel(
-            module    = sdram_module,
-            settings  = phy_settings,
-            clk_freq  = sdram_clk_freq,
-            verbosity = sdram_verbosity,
-            init      = ram_init)
-        self.add_sdram("sdram",
-            phy           = self.sdrphy,
-            module        = sdram_module,
-            l2_cache_size = 0)
-        self.add_constant("SDRAM_TEST_DISABLE") # Skip SDRAM test to avoid corrupting pre-initialized contents.
-
-    def generate_dts(self, board_name):
-        json_src = os.path.join("build", board_name, "csr.json")
-        dts = os.path.join("build", board_name, "{}.dts".format(board_name))
+        # Timing-accurate SDRAM model + LiteDRAM controller.
+        if ram_model == "sdram":
+            self.submodules.sdrphy = SDRAMPHYModel(
+                module    = sdram_module,
+                settings  = phy_settings,
+                clk_freq  = sdram_clk_freq,
+                verbosity = sdram_verbosity,
+                init      = ram_init)
+            self.add_sdram("sdram",
+                phy           = self.sdrphy,
+                module        = sdram_module,
+                l2_cache_size = l2_size)
+            self.add_constant("SDRAM_TEST_DISABLE") # Skip SDRAM test to avoid corrupting pre-initialized contents.
+        # Ideal (zero-wait-state) main RAM, same region/size/contents as the SDRAM (CPU memory
+        # accesses over Wishbone).
+        elif ram_model == "ideal":
+            geom          = sdram_module.geom_settings
+            main_ram_size = 2**(geom.bankbits + geom.rowbits + geom.colbits)*phy_settings.nranks*phy_settings.databits//8
+            self.add_ram("main_ram",
+                origin   = self.mem_map["main_ram"],
+                size     = main_ram_size,
+                contents = ram_init)
+            self.add_config("MAIN_RAM_INIT") # Skip memtest to avoid corrupting pre-initialized contents.
+        else:
+            raise ValueError("Unknown RAM model: {}.".format(ram_model))
+
+        # Ethernet (Etherbone host bridge / test core UDP link) ------------------------------------
+        if with_etherbone or with_udp:
+            self.submodules.ethphy  = LiteEthPHYModel(platform.request("eth", 0))
+            self.submodules.ethcore = LiteEthUDPIPCore(self.ethphy,
+                mac_address = 0x10e2d5000001,
+                ip_address  = local_ip,
+                clk_freq    = sys_clk_freq)
+            if with_etherbone:
+                self.submodules.etherbone = LiteEthEtherbone(self.ethcore.udp, 1234, mode="master")
+                self.bus.add_master(name="etherbone", master=self.etherbone.wishbone.bus)
+
+        # Test Core --------------------------------------------------------------------------------
+        if with_test_core or with_packetlink or with_udp or with_packettrace:
+            # Packet layout: Verilog parameters, exported as constants for the host tools.
+            test_core_layout = test_core_layout or PacketLayout.from_verilog()
+            self.submodules.send_core = RTLsend(platform, layout=test_core_layout)
+            self.submodules.recv_core = RTLreceive(platform, layout=test_core_layout)
+            for name, value in test_core_layout.constants().items():
+                self.add_constant(name, value)
+            # Packet trace record (received packets) / replay (packets to send).
+            if with_packettrace:
+                packettrace_pads = platform.request("packettrace")
+                self.comb += [
+                    packettrace_pads.source_valid.eq(self.recv_core.source.valid),
+                    packettrace_pads.source_data.eq(self.recv_core.source.data),
+                    self.recv_core.source.ready.eq(packettrace_pads.source_ready),
+                    self.send_core.sink.valid.eq(packettrace_pads.sink_valid),
+                    self.send_core.sink.data.eq(packettrace_pads.sink_data),
+                    packettrace_pads.sink_ready.eq(self.send_core.sink.ready),
+                ]
+            # Packet link bridged to remote_ip:udp_port through the LiteEth UDP/IP stack and the
+            # ethernet (tap) module.
+            if with_udp:
+                self.submodules.test_core_udp = TestCoreUDP(self.ethcore.udp,
+                    ip_address = remote_ip,
+                    udp_port   = udp_port)
+                self.comb += [
+                    self.send_core.source.connect(self.test_core_udp.sink),
+                    self.test_core_udp.source.connect(self.recv_core.sink),
+                ]
+            # Packet link bridged to other simulations through the packetlink module.
+            elif with_packetlink:
+                packetlink_pads = platform.request("packetlink")
+                self.comb += [
+                    packetlink_pads.source_valid.eq(self.send_core.source.valid),
+                    packetlink_pads.source_data.eq(self.send_core.source.data),
+                    self.send_core.source.ready.eq(packetlink_pads.source_ready),
+                    self.recv_core.sink.valid.eq(packetlink_pads.sink_valid),
+                    self.recv_core.sink.data.eq(packetlink_pads.sink_data),
+                    packetlink_pads.sink_ready.eq(self.recv_core.sink.ready),
+                ]
+            # Local packet link.
+            else:
+                self.comb += self.send_core.source.connect(self.recv_core.sink)
+
+        # Performance Counters (after all the bus masters) -----------------------------------------
+        if with_perf:
+            self.submodules.perf = PerfCounters(perf_taps(self))
+
+        # Bus Monitor (after all the bus masters) --------------------------------------------------
+        if with_busmon:
+            masters, regions = busmon_taps(self)
+            self.submodules.busmon = BusMonitor(masters, regions, window=sys_clk_freq//100)
+
+    def generate_dts(self, board_name, build_dir=None, boot_json=os.path.join("images", "boot.json")):
+        build_dir = build_dir or os.path.join("build", board_name)
+        json_src = os.path.join(build_dir, "csr.json")
+        dts = os.path.join(build_dir, "{}.dts".format(board_name))
         with open(json_src) as json_file, open(dts, "w") as dts_file:
-            dts_content = generate_dts(json.load(json_file))
+            csr_json    = json.load(json_file)
+            # Initramfs location/size from the boot images layout (see boot_layout.py).
+            initrd_start, initrd_size = initrd_region(boot_json, csr_json["memories"]["main_ram"]["base"])
+            dts_content = generate_dts(csr_json, initrd_start=initrd_start, initrd_size=initrd_size)
             dts_file.write(dts_content)
-
-    def compile_dts(self, board_name):
-        dts = os.path.join("build", board_name, "{}.dts".format(board_name))
-        dtb = os.path.join("images", "rv32.dtb")
+            if hasattr(self, "perf"):
+                dts_file.write(perf_dts(csr_json))
+            # Host file window as a RAM MTD device (physmap).
+            if hasattr(self, "hostfile"):
+                region = self.bus.regions["hostfile"]
+                dts_file.write("""
+/ {{
+    soc {{
+        hostfile@{origin:x} {{
+            compatible = "mtd-ram";
+            reg = <0x{origin:x} 0x{size:x}>;
+            bank-width = <4>;
+            linux,mtd-name = "hostfile";
+        }};
+    }};
+}};
+""".format(origin=region.origin, size=region.size))
+
+    def compile_dts(self, board_name, build_dir=None):
+        build_dir = build_dir or os.path.join("build", board_name)
+        dts = os.path.join(build_dir, "{}.dts".format(board_name))
+        dtb = os.path.join(build_dir, "rv32.dtb")
         os.system("dtc -O dtb -o {} {}".format(dtb, dts))
 
+# Boot Images --------------------------------------------------------------------------------------
+
+def generate_boot_json(build_dir, images_dir="images"):
+    """Per-run boot.json: images from images_dir (absolute paths), DTB from build_dir."""
+    with open(os.path.join(images_dir, "boot.json")) as f:
+        images = json.load(f)
+    boot = {}
+    for name, base in images.items():
+        path = os.path.join(build_dir if name == "rv32.dtb" else images_dir, name)
+        boot[os.path.abspath(path)] = base
+    boot_json = os.path.join(build_dir, "boot.json")
+    with open(boot_json, "w") as f:
+        json.dump(boot, f, indent=4)
+    return boot_json
+
+# Simulation Profiles ------------------------------------------------------------------------------
+
+sim_profiles = {
+    # Fast model compilation (debug of the simulation itself).
+    "debug"    : {"opt_level": "O0", "threads": 1},
+    # Optimized single-threaded model.
+    "fast"     : {"opt_level": "O3", "threads": 1, "jobs": os.cpu_count()},
+    # Optimized multi-threaded model (Verilator --threads).
+    "parallel" : {"opt_level": "O3", "threads": max(2, min(8, (os.cpu_count() or 2)//2)), "jobs": os.cpu_count()},
+}
+
+def apply_sim_profile(parser, args):
+    # Profile values become the parser defaults: options given on the command line keep precedence
+    # (even when equal to the original defaults).
+    parser.set_defaults(**sim_profiles[args.sim_profile])
+    return parser.parse_args()
+
 # Build --------------------------------------------------------------------------------------------
 
 def main():
@@ -144,34 +444,195 @@ def main():
     parser.add_argument("--sdram-module",     default="MT48LC16M16",   help="Select SDRAM chip.")
     parser.add_argument("--sdram-data-width", default=32,              help="Set SDRAM chip data width.")
     parser.add_argument("--sdram-verbosity",  default=0,               help="Set SDRAM checker verbosity.")
+    parser.add_argument("--ram-model",        default="sdram", choices=["sdram", "ideal"], help="Main RAM model: timing-accurate SDRAM or ideal (zero-wait-state) RAM.")
+    parser.add_argument("--l2-size",          default=0,     type=int, help="L2 cache size in bytes (SDRAM model with --with-wishbone-memory).")
+    parser.add_argument("--with-test-core",   action="store_true",     help="Enable test core (send/recv).")
+    parser.add_argument("--test-core-layout", default=None,            help="Test core packet layout overrides of the Verilog parameters (e.g. num_axons=128,num_ticks=32).")
+    parser.add_argument("--packetlink",       default=None,            help="Bridge test core packet link to a co-simulation hub (host:port).")
+    parser.add_argument("--packetlink-sync",  default=0,     type=int, help="Packet link synchronization period in cycles (0 for free-running).")
+    parser.add_argument("--with-etherbone",   action="store_true",     help="Add Etherbone host bridge at --local-ip (ethernet tap module, requires root).")
+    parser.add_argument("--test-core-udp",    action="store_true",     help="Bridge test core packet link over UDP (ethernet tap module, requires root).")
+    parser.add_argument("--test-core-udp-port", default=2000, type=int, help="Test core UDP port.")
+    parser.add_argument("--local-ip",         default="192.168.1.51",  help="Simulated SoC IP address.")
+    parser.add_argument("--remote-ip",        default="192.168.1.100", help="Remote (tap) IP address.")
+    parser.add_argument("--packet-record",    default=None,            help="Record received test core packets to a trace file.")
+    parser.add_argument("--packet-replay",    default=None,            help="Replay a packet trace file into the send test core.")
+    parser.add_argument("--packet-replay-speed", default=1.0, type=float, help="Packet replay speed relative to the recorded timing (0 for back-to-back).")
+    parser.add_argument("--packet-replay-start", default=0,  type=int,  help="Packet replay start cycle.")
+    parser.add_argument("--sim-profile",      default=None, choices=sim_profiles.keys(), help="Verilator build profile (threads/optimization).")
+    parser.add_argument("--build-dir",        default="build/sim",     help="Build/output directory (one per concurrent simulation).")
+    parser.add_argument("--images-dir",       default="images",        help="Linux/OpenSBI images directory (with its boot.json).")
+    parser.add_argument("--sim-stats",        default=None,            help="Save simulation speed statistics to this file (default: BUILD_DIR/simstats.json, empty to disable).")
+    parser.add_argument("--sim-stats-interval", default=10.0, type=float, help="Live simulation speed report period in seconds (0 to disable).")
+    parser.add_argument("--trace-cycles",     default=None,            help="Trace only during this sys_clk cycle window (START[:END]).")
+    parser.add_argument("--trace-regex",      default=None,            help="Start tracing when the console output matches this regex.")
+    parser.add_argument("--trace-regex-stop", default=None,            help="Stop tracing when the console output matches this regex.")
+    parser.add_argument("--trace-regex-cycles", default=0,   type=int, help="Stop tracing N cycles after the --trace-regex match.")
+    parser.add_argument("--trace-csr",        action="store_true",     help="Trace while the supervisor_trace CSR is set (from software).")
+    parser.add_argument("--trace-vcd",        action="store_true",     help="Use VCD trace format (instead of FST).")
+    parser.add_argument("--headless",         default=None,            help="Headless run: log in, run this workload command and exit with its status.")
+    parser.add_argument("--headless-results", default=None,            help="Headless workload results file (default: BUILD_DIR/headless.json).")
+    parser.add_argument("--headless-timeout", default=0,     type=int, help="Headless run timeout in sys_clk cycles (0 for none).")
+    parser.add_argument("--hostfile",         default=None,            help="Host file exposed to Linux as an MTD device (/dev/mtdX, /dev/mtdblockX).")
+    parser.add_argument("--hostfile-size",    default=0x1000000, type=lambda x: int(x, 0), help="Host file window size in bytes (power of 2).")
+    parser.add_argument("--with-perf-counters", action="store_true",   help="Add bus/cycle performance counters (litex-perf tool in Linux).")
+    parser.add_argument("--with-bus-monitor", action="store_true",     help="Add windowed per-master bus utilization/contention monitor (busmon.py host tool).")
+    parser.add_argument("--serial-tcp",       default=None,  type=int, help="Expose the serial port on this TCP port (instead of the console, e.g. for serial_boot.py).")
+    parser.add_argument("--profile",          action="store_true",     help="Profile the elaboration phases/add_* calls (BUILD_DIR/profile.json).")
+    parser.add_argument("--profile-cprofile", action="store_true",     help="Also dump cProfile statistics per phase (BUILD_DIR/profile/PHASE.prof).")
+    parser.add_argument("--no-run",           action="store_true",     help="Build simulation without compiling/running it.")
     VexRiscvSMP.args_fill(parser)
     verilator_build_args(parser)
     args = parser.parse_args()
+    if args.sim_profile is not None:
+        args = apply_sim_profile(parser, args)
 
+    if args.ram_model == "ideal":
+        args.with_wishbone_memory = True # No LiteDRAM port: CPU memory accesses over Wishbone.
     VexRiscvSMP.args_read(args)
+    trace_cycles = None
+    if args.trace_cycles is not None:
+        start, _, end = args.trace_cycles.partition(":")
+        trace_cycles = (int(float(start)), int(float(end)) if end else None)
+    if trace_cycles is not None or args.trace_regex is not None or args.trace_csr:
+        args.trace = True
+    if args.trace and not args.trace_vcd:
+        args.trace_fst = True
     verilator_build_kwargs = verilator_build_argdict(args)
+    build_dir = args.build_dir
+    if args.sim_stats is None:
+        args.sim_stats = os.path.join(build_dir, "simstats.json")
+    if args.headless_results is None:
+        args.headless_results = os.path.join(build_dir, "headless.json")
     sim_config = SimConfig(default_clk="sys_clk")
-    sim_config.add_module("serial2console", "serial")
-
+    if args.headless is not None:
+        sim_config.add_module("headless", ["serial", "supervisor"], args={
+            "workload" : args.headless,
+            "results"  : os.path.abspath(args.headless_results),
+            "timeout"  : str(args.headless_timeout),
+        })
+    elif args.serial_tcp is not None:
+        sim_config.add_module("serial2tcp", "serial", args={"port": args.serial_tcp})
+    else:
+        sim_config.add_module("serial2console", "serial")
+    extra_mods = ["headless"] if args.headless is not None else []
+    if args.packetlink is not None:
+        sim_config.add_module("packetlink", "packetlink", args={
+            "address" : args.packetlink,
+            "sync"    : str(args.packetlink_sync),
+        })
+        extra_mods.append("packetlink")
+    with_packettrace = args.packet_record is not None or args.packet_replay is not None
+    if with_packettrace:
+        packettrace_args = {
+            "speed"    : str(args.packet_replay_speed),
+            "start"    : str(args.packet_replay_start),
+            "clk_freq" : str(int(100e6)),
+        }
+        if args.packet_record is not None:
+            packettrace_args["record"] = os.path.abspath(args.packet_record)
+        if args.packet_replay is not None:
+            packettrace_args["replay"] = os.path.abspath(args.packet_replay)
+        sim_config.add_module("packettrace", "packettrace", args=packettrace_args)
+        extra_mods.append("packettrace")
+    if args.trace_regex is not None:
+        tracetrigger_args = {
+            "start"  : args.trace_regex,
+            "cycles" : str(args.trace_regex_cycles),
+        }
+        if args.trace_regex_stop is not None:
+            tracetrigger_args["stop"] = args.trace_regex_stop
+        sim_config.add_module("tracetrigger", "tracetrigger", args=tracetrigger_args)
+        extra_mods.append("tracetrigger")
+    if args.hostfile is not None:
+        sim_config.add_module("hostfile", "hostfile", args={
+            "file" : os.path.abspath(args.hostfile),
+            "size" : str(args.hostfile_size),
+        })
+        extra_mods.append("hostfile")
+    if args.sim_stats:
+        sim_config.add_module("simstats", [], args={
+            "output"   : os.path.abspath(args.sim_stats),
+            "interval" : str(args.sim_stats_interval),
+            "label"    : "profile={} threads={} opt_level={}".format(
+                args.sim_profile, args.threads, args.opt_level),
+        })
+        extra_mods.append("simstats")
+    if args.with_etherbone or args.test_core_udp:
+        sim_config.add_module("ethernet", "eth", args={
+            "interface" : "tap0",
+            "ip"        : args.remote_ip,
+        })
+
+    # Profiler (phases accumulated over the two passes, the second build includes the simulation run).
+    profiler = Profiler(
+        enabled      = args.profile or args.profile_cprofile,
+        cprofile_dir = os.path.join(build_dir, "profile") if args.profile_cprofile else None)
+    profiler.instrument(SoCLinux)
+
+    test_core_layout = None
+    if args.test_core_layout is not None:
+        test_core_layout = PacketLayout.from_string(args.test_core_layout)
+
+    board_name = "sim"
+    boot_json  = None
     for i in range(2):
+        run = i != 0 and not args.no_run and args.headless is None
+        profiler.start("soc")
         soc = SoCLinux(
             init_memories    = i!=0,
             sdram_module     = args.sdram_module,
             sdram_data_width = int(args.sdram_data_width),
-            sdram_verbosity  = int(args.sdram_verbosity)
+            sdram_verbosity  = int(args.sdram_verbosity),
+            ram_model        = args.ram_model,
+            l2_size          = args.l2_size,
+            with_test_core   = args.with_test_core,
+            test_core_layout = test_core_layout,
+            with_packetlink  = args.packetlink is not None,
+            with_udp         = args.test_core_udp,
+            local_ip         = args.local_ip,
+            remote_ip        = args.remote_ip,
+            udp_port         = args.test_core_udp_port,
+            with_packettrace = with_packettrace,
+            with_etherbone   = args.with_etherbone,
+            trace_cycles     = trace_cycles,
+            trace_trigger    = args.trace_regex is not None,
+            trace_csr        = args.trace_csr,
+            with_headless    = args.headless is not None,
+            hostfile_size    = args.hostfile_size if args.hostfile is not None else 0,
+            with_perf        = args.with_perf_counters,
+            with_busmon      = args.with_bus_monitor,
+            boot_json        = boot_json,
         )
-        board_name = "sim"
-        build_dir  = os.path.join("build", board_name)
+        profiler.start("build_run" if run else "build")
         builder = Builder(soc, output_dir=build_dir,
             compile_gateware = i != 0 ,
             csr_json         = os.path.join(build_dir, "csr.json"))
         builder.build(sim_config=sim_config,
-            run = i != 0,
+            run             = run,
+            extra_mods      = extra_mods,
+            extra_mods_path = os.path.abspath("sim_modules"),
             **verilator_build_kwargs
         )
         if i == 0:
-            soc.generate_dts(board_name)
-            soc.compile_dts(board_name)
+            profiler.start("dts")
+            soc.generate_dts(board_name, build_dir, os.path.join(args.images_dir, "boot.json"))
+            soc.compile_dts(board_name, build_dir)
+            boot_json = generate_boot_json(build_dir, args.images_dir)
+        if profiler.enabled:
+            profiler.save(os.path.join(build_dir, "profile.json"), board=board_name, args=sys.argv[1:])
+    profiler.restore()
+    if profiler.enabled:
+        report(profiler.summary())
+
+    # Headless run: no terminal, exit with the workload status (LiteX ignores the simulation status).
+    if args.headless is not None and not args.no_run:
+        gateware_dir = os.path.join(build_dir, "gateware")
+        subprocess.check_call(["bash", "build_sim.sh"], cwd=gateware_dir)
+        sudo = ["sudo"] if sim_config.has_module("ethernet") else []
+        sys.exit(subprocess.call(sudo + [os.path.join("obj_dir", "Vsim")],
+            cwd   = gateware_dir,
+            stdin = subprocess.DEVNULL))
 
 if __name__ == "__main__":
     main()
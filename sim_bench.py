@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+#
+# This file is part of Linux-on-LiteX-VexRiscv
+#
+# Copyright (c) 2019-2022, Linux-on-LiteX-VexRiscv Developers
+# SPDX-License-Identifier: BSD-2-Clause
+
+import os
+import re
+import sys
+import json
+import time
+import select
+import argparse
+import subprocess
+
+# Simulation Benchmark -----------------------------------------------------------------------------
+#
+# Builds and runs the simulation once per main RAM model (sim.py --ram-model) and measures the wall
+# time until a console milestone (Linux shell prompt by default), plus the simulated cycles and
+# speed reported by the simstats module.
+
+def run_model(ram_model, milestone, timeout, bench_dir, sim_args):
+    build_dir  = os.path.join(bench_dir, ram_model)
+    stats_file = os.path.abspath(os.path.join(bench_dir, "{}.json".format(ram_model)))
+    log_file   = os.path.join(bench_dir, "{}.log".format(ram_model))
+    subprocess.check_call([sys.executable, "sim.py", "--no-run",
+        "--build-dir", build_dir,
+        "--ram-model", ram_model,
+        "--sim-stats", stats_file] + sim_args)
+    gateware_dir = os.path.join(build_dir, "gateware")
+    subprocess.check_call(["bash", "build_sim.sh"], cwd=gateware_dir)
+
+    # Run until the milestone is seen on the console (or timeout).
+    r = {"ram_model": ram_model, "milestone": None}
+    start   = time.time()
+    process = subprocess.Popen([os.path.join("obj_dir", "Vsim")],
+        cwd    = gateware_dir,
+        stdin  = subprocess.DEVNULL,
+        stdout = subprocess.PIPE,
+        stderr = subprocess.STDOUT)
+    console = b""
+    with open(log_file, "wb") as log:
+        while process.poll() is None and time.time() - start < timeout:
+            ready, _, _ = select.select([process.stdout], [], [], 1.0)
+            if not ready:
+                continue
+            datas = os.read(process.stdout.fileno(), 4096)
+            if not datas:
+                break
+            log.write(datas)
+            console = (console + datas)[-4096:]
+            if re.search(milestone, console.decode(errors="replace")):
+                r["milestone"] = time.time() - start
+                break
+    if process.poll() is None:
+        process.terminate() # simstats writes its statistics on SIGTERM.
+    process.wait()
+    r["wall_time"] = time.time() - start
+
+    if os.path.exists(stats_file):
+        with open(stats_file) as f:
+            stats = json.load(f)
+        r["cycles"] = stats["cycles"]
+        r["mhz"]    = stats["mhz"]
+    return r
+
+def main():
+    parser = argparse.ArgumentParser(description="Linux on LiteX-VexRiscv Simulation Benchmark (SDRAM vs ideal RAM).")
+    parser.add_argument("--ram-models", default="sdram,ideal",              help="Comma-separated main RAM models to compare.")
+    parser.add_argument("--milestone",  default=r"login:|# $",              help="Console regex ending a run.")
+    parser.add_argument("--timeout",    default=3600,      type=float,      help="Run timeout in seconds.")
+    parser.add_argument("--bench-dir",  default="build/sim_bench",          help="Benchmark directory (one simulation build directory per RAM model).")
+    args, sim_args = parser.parse_known_args()
+
+    os.makedirs(args.bench_dir, exist_ok=True)
+
+    results = []
+    for ram_model in args.ram_models.split(","):
+        results.append(run_model(ram_model, args.milestone, args.timeout, args.bench_dir, sim_args))
+
+    # Report.
+    with open(os.path.join(args.bench_dir, "sim_bench.json"), "w") as f:
+        json.dump(results, f, indent=4)
+    print("{:8s} {:>12s} {:>14s} {:>8s}".format("RAM", "Milestone(s)", "Cycles", "MHz"))
+    for r in results:
+        milestone = "{:.1f}".format(r["milestone"]) if r["milestone"] is not None else "timeout"
+        print("{:8s} {:>12s} {:>14d} {:>8.3f}".format(
+            r["ram_model"], milestone, r.get("cycles", 0), r.get("mhz", 0)))
+    reference = results[0]["milestone"]
+    for r in results[1:]:
+        if reference and r["milestone"]:
+            print("{}: {:.2f}x vs {}".format(r["ram_model"], reference/r["milestone"], results[0]["ram_model"]))
+
+if __name__ == "__main__":
+    main()
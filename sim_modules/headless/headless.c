@@ -0,0 +1,479 @@
+/*
+ * This file is part of Linux-on-LiteX-VexRiscv
+ *
+ * Copyright (c) 2019-2022, Linux-on-LiteX-VexRiscv Developers
+ * SPDX-License-Identifier: BSD-2-Clause
+ *
+ * Headless console: replaces serial2console for batch runs. Logs in on the SoC console, runs a
+ * workload command, collects its output and results, then drives the Supervisor finish input so
+ * the simulation ends; the simulation exit status is the workload exit status.
+ *
+ * The workload is typed as:
+ *   echo @@workload-begin@@; ( set -e; <workload> ); echo @@workload-end $?@@
+ * and its output lines of the form "@@result <key>=<value>" are collected as results.
+ *
+ * Module args:
+ * - "workload":    shell command to run.
+ * - "results":     JSON results file (optional).
+ * - "login":       login prompt regex (default: "login: *$").
+ * - "user":        login user (default: "root").
+ * - "prompt":      shell prompt regex (default: "^# *$").
+ * - "timeout":     sys_clk cycles before ending the simulation (optional, 0: none, status 124).
+ * - "char_period": sys_clk cycles between typed characters (default: 10000).
+ */
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <stdint.h>
+#include <unistd.h>
+#include <ctype.h>
+#include <regex.h>
+#include "error.h"
+
+#include <json-c/json.h>
+#include "modules.h"
+#include "../sim_exit.h"
+
+#define LINE_SIZE   1024
+#define INPUT_SIZE  4096
+
+#define MARKER_BEGIN  "@@workload-begin@@"
+#define MARKER_END    "@@workload-end "
+#define MARKER_RESULT "@@result "
+
+#define STATUS_TIMEOUT 124
+
+enum {
+  STATE_LOGIN,
+  STATE_SHELL,
+  STATE_WORKLOAD,
+  STATE_DONE,
+};
+
+struct session_s {
+  char *sys_clk;
+  char *tx;
+  char *tx_valid;
+  char *tx_ready;
+  char *rx;
+  char *rx_valid;
+  char *rx_ready;
+  char *finish;
+  uint8_t *status_csr;
+  char last_clk;
+  uint64_t cycle;
+  int state;
+  /* Console. */
+  char line[LINE_SIZE];
+  int len;
+  char input[INPUT_SIZE];
+  int input_len;
+  int input_pos;
+  uint64_t char_period;
+  uint64_t next_char;
+  /* Workload. */
+  char *workload;
+  char *results_file;
+  char *user;
+  regex_t login;
+  regex_t prompt;
+  uint64_t timeout;
+  int running;
+  int status;
+  int status_valid;
+  uint64_t shell_cycle;
+  uint64_t start_cycle;
+  uint64_t end_cycle;
+  json_object *output;
+  json_object *results;
+  int written;
+  struct session_s *next;
+};
+
+static int litex_sim_module_get_args(char *args, char *arg, char **val)
+{
+  int ret = RC_OK;
+  json_object *jsobj = NULL;
+  json_object *obj = NULL;
+  char *value = NULL;
+  int r;
+
+  jsobj = json_tokener_parse(args);
+  if(NULL == jsobj) {
+    fprintf(stderr, "[headless] error parsing json arg: %s\n", args);
+    ret = RC_JSERROR;
+    goto out;
+  }
+  if(!json_object_is_type(jsobj, json_type_object)) {
+    fprintf(stderr, "[headless] arg must be type object!: %s\n", args);
+    ret = RC_JSERROR;
+    goto out;
+  }
+  obj = NULL;
+  r = json_object_object_get_ex(jsobj, arg, &obj);
+  if(!r) {
+    ret = RC_JSERROR;
+    goto out;
+  }
+  value = strdup(json_object_get_string(obj));
+
+out:
+  *val = value;
+  return ret;
+}
+
+static int litex_sim_module_pads_get(struct pad_s *pads, char *name, void **signal)
+{
+  int ret = RC_OK;
+  void *sig = NULL;
+  int i;
+
+  if(!pads || !name || !signal) {
+    ret = RC_INVARG;
+    goto out;
+  }
+
+  i = 0;
+  while(pads[i].name) {
+    if(!strcmp(pads[i].name, name)) {
+      sig = (void*)pads[i].signal;
+      break;
+    }
+    i++;
+  }
+
+out:
+  *signal = sig;
+  return ret;
+}
+
+static int headless_compile(regex_t *re, char *pattern)
+{
+  if(regcomp(re, pattern, REG_EXTENDED | REG_NOSUB)) {
+    fprintf(stderr, "[headless] invalid regex: %s\n", pattern);
+    return RC_ERROR;
+  }
+  return RC_OK;
+}
+
+static void headless_write_results(struct session_s *s)
+{
+  json_object *r;
+  FILE *f;
+
+  if(s->written)
+    return;
+  s->written = 1;
+
+  fprintf(stderr, "\n[headless] workload %s, status %d, %llu cycles\n",
+    s->state == STATE_DONE ? "done" : "interrupted",
+    s->status,
+    (unsigned long long) (s->end_cycle - s->start_cycle));
+  if(!s->results_file)
+    return;
+
+  r = json_object_new_object();
+  json_object_object_add(r, "workload",    json_object_new_string(s->workload));
+  json_object_object_add(r, "status",      json_object_new_int(s->status));
+  json_object_object_add(r, "completed",   json_object_new_boolean(s->state == STATE_DONE && s->status != STATUS_TIMEOUT));
+  json_object_object_add(r, "boot_cycles", json_object_new_int64(s->shell_cycle));
+  json_object_object_add(r, "start_cycle", json_object_new_int64(s->start_cycle));
+  json_object_object_add(r, "end_cycle",   json_object_new_int64(s->end_cycle));
+  json_object_object_add(r, "cycles",      json_object_new_int64(s->end_cycle - s->start_cycle));
+  json_object_object_add(r, "results",     json_object_get(s->results));
+  json_object_object_add(r, "output",      json_object_get(s->output));
+
+  f = fopen(s->results_file, "w");
+  if(!f) {
+    fprintf(stderr, "[headless] unable to create %s\n", s->results_file);
+  } else {
+    fprintf(f, "%s\n", json_object_to_json_string_ext(r, JSON_C_TO_STRING_PRETTY));
+    fclose(f);
+  }
+  json_object_put(r);
+}
+
+/* The simulation returns 0 when the Supervisor finishes it and does not call the modules close():
+ * results are written and the workload status returned from an atexit handler, registered when the
+ * module is loaded so that it runs after the handlers of the other modules. */
+static struct session_s *sessions = NULL;
+
+static void headless_exit(void)
+{
+  struct session_s *s;
+  int status = 0;
+
+  for(s = sessions; s; s = s->next) {
+    if(!s->status_valid && s->status_csr)
+      s->status = *s->status_csr;
+    if(!s->end_cycle)
+      s->end_cycle = s->cycle;
+    headless_write_results(s);
+    if(s->status)
+      status = s->status;
+  }
+  if(status && !sim_exit_interrupted()) {
+    fflush(NULL);
+    _exit(status);
+  }
+}
+
+static int headless_start(void *b)
+{
+  atexit(headless_exit);
+  sim_exit_install();
+  printf("[headless] loaded\n");
+  return RC_OK;
+}
+
+static int headless_new(void **sess, char *args)
+{
+  int ret = RC_OK;
+  struct session_s *s = NULL;
+  char *value = NULL;
+
+  if(!sess) {
+    ret = RC_INVARG;
+    goto out;
+  }
+
+  s = (struct session_s*) malloc(sizeof(struct session_s));
+  if(!s) {
+    ret = RC_NOENMEM;
+    goto out;
+  }
+  memset(s, 0, sizeof(struct session_s));
+  s->char_period = 10000;
+  s->output      = json_object_new_array();
+  s->results     = json_object_new_object();
+
+  ret = litex_sim_module_get_args(args, "workload", &s->workload);
+  if(ret != RC_OK) {
+    fprintf(stderr, "[headless] missing \"workload\" argument\n");
+    goto out;
+  }
+  if(litex_sim_module_get_args(args, "results", &value) == RC_OK)
+    s->results_file = value;
+  if(litex_sim_module_get_args(args, "user", &value) == RC_OK)
+    s->user = value;
+  else
+    s->user = strdup("root");
+  if(litex_sim_module_get_args(args, "timeout", &value) == RC_OK) {
+    s->timeout = strtoull(value, NULL, 0);
+    free(value);
+  }
+  if(litex_sim_module_get_args(args, "char_period", &value) == RC_OK) {
+    s->char_period = strtoull(value, NULL, 0);
+    free(value);
+  }
+  if(litex_sim_module_get_args(args, "login", &value) != RC_OK)
+    value = strdup("login: *$");
+  ret = headless_compile(&s->login, value);
+  free(value);
+  if(ret != RC_OK)
+    goto out;
+  if(litex_sim_module_get_args(args, "prompt", &value) != RC_OK)
+    value = strdup("^# *$");
+  ret = headless_compile(&s->prompt, value);
+  free(value);
+  if(ret != RC_OK)
+    goto out;
+
+  s->next  = sessions;
+  sessions = s;
+
+out:
+  *sess = (void*) s;
+  return ret;
+}
+
+static int headless_add_pads(void *sess, struct pad_list_s *plist)
+{
+  int ret = RC_OK;
+  struct session_s *s = (struct session_s*) sess;
+  struct pad_s *pads;
+
+  if(!sess || !plist) {
+    ret = RC_INVARG;
+    goto out;
+  }
+  pads = plist->pads;
+  if(!strcmp(plist->name, "serial")) {
+    litex_sim_module_pads_get(pads, "sink_data",    (void**)&s->rx);
+    litex_sim_module_pads_get(pads, "sink_valid",   (void**)&s->rx_valid);
+    litex_sim_module_pads_get(pads, "sink_ready",   (void**)&s->rx_ready);
+    litex_sim_module_pads_get(pads, "source_data",  (void**)&s->tx);
+    litex_sim_module_pads_get(pads, "source_valid", (void**)&s->tx_valid);
+    litex_sim_module_pads_get(pads, "source_ready", (void**)&s->tx_ready);
+  }
+  if(!strcmp(plist->name, "supervisor")) {
+    litex_sim_module_pads_get(pads, "finish", (void**)&s->finish);
+    litex_sim_module_pads_get(pads, "status", (void**)&s->status_csr);
+  }
+
+  if(!strcmp(plist->name, "sys_clk"))
+    litex_sim_module_pads_get(pads, "sys_clk", (void**) &s->sys_clk);
+
+out:
+  return ret;
+}
+
+static void headless_type(struct session_s *s, const char *str)
+{
+  int len = strlen(str);
+
+  if(s->input_len + len > INPUT_SIZE)
+    len = INPUT_SIZE - s->input_len;
+  memcpy(s->input + s->input_len, str, len);
+  s->input_len += len;
+}
+
+static void headless_done(struct session_s *s, int status)
+{
+  s->state        = STATE_DONE;
+  s->status       = status;
+  s->status_valid = 1;
+  s->end_cycle    = s->cycle;
+  if(s->finish)
+    *s->finish = 1;
+}
+
+/* Complete output line of the workload. */
+static void headless_line(struct session_s *s)
+{
+  char *value;
+  char *end;
+  double number;
+
+  if(!s->running) {
+    if(!strcmp(s->line, MARKER_BEGIN)) {
+      s->running     = 1;
+      s->start_cycle = s->cycle;
+    }
+    return;
+  }
+  if(!strncmp(s->line, MARKER_END, strlen(MARKER_END)) && isdigit((unsigned char) s->line[strlen(MARKER_END)])) {
+    headless_done(s, atoi(s->line + strlen(MARKER_END)));
+    return;
+  }
+  json_object_array_add(s->output, json_object_new_string(s->line));
+  if(!strncmp(s->line, MARKER_RESULT, strlen(MARKER_RESULT))) {
+    value = strchr(s->line, '=');
+    if(!value)
+      return;
+    *value++ = '\0';
+    number = strtod(value, &end);
+    json_object_object_add(s->results, s->line + strlen(MARKER_RESULT),
+      (*value && !*end) ? json_object_new_double(number) : json_object_new_string(value));
+  }
+}
+
+static void headless_console(struct session_s *s, char c)
+{
+  if(c == '\n' || c == '\r') {
+    if(s->len && s->state == STATE_WORKLOAD)
+      headless_line(s);
+    s->len = 0;
+    return;
+  }
+  if(s->len < LINE_SIZE - 1)
+    s->line[s->len++] = c;
+  s->line[s->len] = '\0';
+
+  /* Prompts are matched on the current (unterminated) line. */
+  if(s->state == STATE_LOGIN && !regexec(&s->login, s->line, 0, NULL, 0)) {
+    headless_type(s, s->user);
+    headless_type(s, "\n");
+    s->state = STATE_SHELL;
+    s->len   = 0;
+  } else if(s->state <= STATE_SHELL && !regexec(&s->prompt, s->line, 0, NULL, 0)) {
+    s->shell_cycle = s->cycle;
+    /* Workload in a set -e subshell: the status is the first failing command's. */
+    headless_type(s, "echo " MARKER_BEGIN "; ( set -e; ");
+    headless_type(s, s->workload);
+    headless_type(s, " ); echo " MARKER_END "$?@@\n");
+    s->state = STATE_WORKLOAD;
+    s->len   = 0;
+  }
+}
+
+static int headless_tick(void *sess, uint64_t time_ps)
+{
+  struct session_s *s = (struct session_s*) sess;
+  char clk = *s->sys_clk;
+
+  sim_exit_check();
+
+  if(!(clk && !s->last_clk)) {
+    s->last_clk = clk;
+    return RC_OK;
+  }
+  s->last_clk = clk;
+  s->cycle++;
+
+  /* SoC -> console (also echoed to stdout). */
+  *s->tx_ready = 1;
+  if(*s->tx_valid) {
+    printf("%c", *s->tx);
+    fflush(stdout);
+    if(s->state != STATE_DONE)
+      headless_console(s, *s->tx);
+  }
+
+  /* Console -> SoC: typed input, paced to avoid overflowing the UART RX FIFO. */
+  *s->rx_valid = 0;
+  if(*s->rx_ready && s->input_pos < s->input_len && s->cycle >= s->next_char) {
+    *s->rx = s->input[s->input_pos++];
+    *s->rx_valid = 1;
+    s->next_char = s->cycle + s->char_period;
+    if(s->input_pos == s->input_len)
+      s->input_pos = s->input_len = 0;
+  }
+
+  if(s->timeout && s->cycle >= s->timeout && s->state != STATE_DONE) {
+    fprintf(stderr, "\n[headless] timeout at cycle %llu\n", (unsigned long long) s->cycle);
+    headless_done(s, STATUS_TIMEOUT);
+  }
+
+  return RC_OK;
+}
+
+static int headless_close(void *sess)
+{
+  struct session_s *s = (struct session_s*) sess;
+  struct session_s **p;
+
+  for(p = &sessions; *p; p = &(*p)->next) {
+    if(*p == s) {
+      *p = s->next;
+      break;
+    }
+  }
+  headless_write_results(s);
+  regfree(&s->login);
+  regfree(&s->prompt);
+  json_object_put(s->output);
+  json_object_put(s->results);
+  free(s->workload);
+  free(s->results_file);
+  free(s->user);
+  free(s);
+  return RC_OK;
+}
+
+static struct ext_module_s ext_mod = {
+  "headless",
+  headless_start,
+  headless_new,
+  headless_add_pads,
+  headless_close,
+  headless_tick
+};
+
+int litex_sim_ext_module_init(int (*register_module)(struct ext_module_s *))
+{
+  int ret = RC_OK;
+  ret = register_module(&ext_mod);
+  return ret;
+}
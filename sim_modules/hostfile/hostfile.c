@@ -0,0 +1,282 @@
+/*
+ * This file is part of Linux-on-LiteX-VexRiscv
+ *
+ * Copyright (c) 2019-2022, Linux-on-LiteX-VexRiscv Developers
+ * SPDX-License-Identifier: BSD-2-Clause
+ *
+ * Host file: backs a Wishbone memory window of the SoC with a memory-mapped host file (shared
+ * mapping, so guest writes are visible to the host while the simulation runs). Linux exposes the
+ * window as an MTD device (mtd-ram): /dev/mtdX (character) and /dev/mtdblockX (block).
+ *
+ * Module args:
+ * - "file": host file (created/extended to "size" if needed, /dev/shm for shared memory).
+ * - "size": window size in bytes.
+ */
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <stdint.h>
+#include <unistd.h>
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include "error.h"
+
+#include <json-c/json.h>
+#include "modules.h"
+#include "../sim_exit.h"
+
+struct session_s {
+  char *sys_clk;
+  uint32_t *adr;
+  uint32_t *dat_w;
+  uint32_t *dat_r;
+  char *sel;
+  char *we;
+  char *stb;
+  char *ack;
+  char last_clk;
+  uint8_t *mem;
+  size_t size;
+  uint64_t reads;
+  uint64_t writes;
+};
+
+static int litex_sim_module_get_args(char *args, char *arg, char **val)
+{
+  int ret = RC_OK;
+  json_object *jsobj = NULL;
+  json_object *obj = NULL;
+  char *value = NULL;
+  int r;
+
+  jsobj = json_tokener_parse(args);
+  if(NULL == jsobj) {
+    fprintf(stderr, "[hostfile] error parsing json arg: %s\n", args);
+    ret = RC_JSERROR;
+    goto out;
+  }
+  if(!json_object_is_type(jsobj, json_type_object)) {
+    fprintf(stderr, "[hostfile] arg must be type object!: %s\n", args);
+    ret = RC_JSERROR;
+    goto out;
+  }
+  obj = NULL;
+  r = json_object_object_get_ex(jsobj, arg, &obj);
+  if(!r) {
+    ret = RC_JSERROR;
+    goto out;
+  }
+  value = strdup(json_object_get_string(obj));
+
+out:
+  *val = value;
+  return ret;
+}
+
+static int litex_sim_module_pads_get(struct pad_s *pads, char *name, void **signal)
+{
+  int ret = RC_OK;
+  void *sig = NULL;
+  int i;
+
+  if(!pads || !name || !signal) {
+    ret = RC_INVARG;
+    goto out;
+  }
+
+  i = 0;
+  while(pads[i].name) {
+    if(!strcmp(pads[i].name, name)) {
+      sig = (void*)pads[i].signal;
+      break;
+    }
+    i++;
+  }
+
+out:
+  *signal = sig;
+  return ret;
+}
+
+static int hostfile_open(struct session_s *s, char *filename)
+{
+  struct stat st;
+  int fd;
+
+  fd = open(filename, O_RDWR | O_CREAT, 0644);
+  if(fd < 0 || fstat(fd, &st) < 0) {
+    fprintf(stderr, "[hostfile] unable to open %s\n", filename);
+    return RC_ERROR;
+  }
+  if((size_t) st.st_size < s->size && ftruncate(fd, s->size) < 0) {
+    fprintf(stderr, "[hostfile] unable to extend %s to %zu bytes\n", filename, s->size);
+    close(fd);
+    return RC_ERROR;
+  }
+  s->mem = mmap(NULL, s->size, PROT_READ | PROT_WRITE, MAP_SHARED, fd, 0);
+  close(fd);
+  if(s->mem == MAP_FAILED) {
+    fprintf(stderr, "[hostfile] unable to map %s\n", filename);
+    s->mem = NULL;
+    return RC_ERROR;
+  }
+  printf("[hostfile] %s mapped (%zu bytes)\n", filename, s->size);
+  return RC_OK;
+}
+
+static int hostfile_close(void *sess);
+
+static int hostfile_start(void *b)
+{
+  printf("[hostfile] loaded\n");
+  return RC_OK;
+}
+
+static int hostfile_new(void **sess, char *args)
+{
+  int ret = RC_OK;
+  struct session_s *s = NULL;
+  char *file = NULL;
+  char *value = NULL;
+
+  if(!sess) {
+    ret = RC_INVARG;
+    goto out;
+  }
+
+  s = (struct session_s*) malloc(sizeof(struct session_s));
+  if(!s) {
+    ret = RC_NOENMEM;
+    goto out;
+  }
+  memset(s, 0, sizeof(struct session_s));
+
+  ret = litex_sim_module_get_args(args, "size", &value);
+  if(ret != RC_OK) {
+    fprintf(stderr, "[hostfile] missing \"size\" argument\n");
+    goto out;
+  }
+  s->size = strtoull(value, NULL, 0);
+  free(value);
+  if(!s->size || (s->size & (s->size - 1))) {
+    fprintf(stderr, "[hostfile] size must be a power of 2\n");
+    ret = RC_INVARG;
+    goto out;
+  }
+  ret = litex_sim_module_get_args(args, "file", &file);
+  if(ret != RC_OK) {
+    fprintf(stderr, "[hostfile] missing \"file\" argument\n");
+    goto out;
+  }
+  ret = hostfile_open(s, file);
+  free(file);
+  if(ret != RC_OK)
+    goto out;
+
+  sim_exit_register(s, hostfile_close);
+
+out:
+  *sess = (void*) s;
+  return ret;
+}
+
+static int hostfile_add_pads(void *sess, struct pad_list_s *plist)
+{
+  int ret = RC_OK;
+  struct session_s *s = (struct session_s*) sess;
+  struct pad_s *pads;
+
+  if(!sess || !plist) {
+    ret = RC_INVARG;
+    goto out;
+  }
+  pads = plist->pads;
+  if(!strcmp(plist->name, "hostfile")) {
+    litex_sim_module_pads_get(pads, "adr",   (void**)&s->adr);
+    litex_sim_module_pads_get(pads, "dat_w", (void**)&s->dat_w);
+    litex_sim_module_pads_get(pads, "dat_r", (void**)&s->dat_r);
+    litex_sim_module_pads_get(pads, "sel",   (void**)&s->sel);
+    litex_sim_module_pads_get(pads, "we",    (void**)&s->we);
+    litex_sim_module_pads_get(pads, "stb",   (void**)&s->stb);
+    litex_sim_module_pads_get(pads, "ack",   (void**)&s->ack);
+  }
+
+  if(!strcmp(plist->name, "sys_clk"))
+    litex_sim_module_pads_get(pads, "sys_clk", (void**) &s->sys_clk);
+
+out:
+  return ret;
+}
+
+static int hostfile_tick(void *sess, uint64_t time_ps)
+{
+  struct session_s *s = (struct session_s*) sess;
+  uint8_t *word;
+  uint32_t data;
+  char clk = *s->sys_clk;
+  int i;
+
+  sim_exit_check();
+
+  if(!(clk && !s->last_clk)) {
+    s->last_clk = clk;
+    return RC_OK;
+  }
+  s->last_clk = clk;
+
+  /* One access per request (ack pulse), byte lanes selected by sel (little-endian). */
+  if(!*s->stb || *s->ack) {
+    *s->ack = 0;
+    return RC_OK;
+  }
+  word = s->mem + (((size_t) *s->adr*4) & (s->size - 1));
+  if(*s->we) {
+    data = *s->dat_w;
+    for(i = 0; i < 4; i++)
+      if(*s->sel & (1 << i))
+        word[i] = data >> (8*i);
+    s->writes++;
+  } else {
+    memcpy(&data, word, 4);
+    *s->dat_r = data;
+    s->reads++;
+  }
+  *s->ack = 1;
+
+  return RC_OK;
+}
+
+static int hostfile_close(void *sess)
+{
+  struct session_s *s = (struct session_s*) sess;
+
+  sim_exit_unregister(s);
+
+  if(s->mem) {
+    msync(s->mem, s->size, MS_SYNC);
+    munmap(s->mem, s->size);
+    fprintf(stderr, "[hostfile] %llu reads, %llu writes\n",
+      (unsigned long long) s->reads,
+      (unsigned long long) s->writes);
+  }
+  free(s);
+  return RC_OK;
+}
+
+static struct ext_module_s ext_mod = {
+  "hostfile",
+  hostfile_start,
+  hostfile_new,
+  hostfile_add_pads,
+  hostfile_close,
+  hostfile_tick
+};
+
+int litex_sim_ext_module_init(int (*register_module)(struct ext_module_s *))
+{
+  int ret = RC_OK;
+  ret = register_module(&ext_mod);
+  return ret;
+}
@@ -0,0 +1,455 @@
+/*
+ * This file is part of Linux-on-LiteX-VexRiscv
+ *
+ * Copyright (c) 2019-2022, Linux-on-LiteX-VexRiscv Developers
+ * SPDX-License-Identifier: BSD-2-Clause
+ *
+ * Packet link: bridges the test core packet streams of a simulated SoC to a co-simulation hub
+ * (cosim.py) over TCP.
+ *
+ * Frames exchanged with the hub (little-endian):
+ * - 'P' + data (u32):  packet (both directions).
+ * - 'S' + cycle (u64): node reached a synchronization point (node -> hub).
+ * - 'G' + cycle (u64): all nodes reached the synchronization point (hub -> node).
+ *
+ * Module args:
+ * - "address": hub address ("host:port").
+ * - "sync":    number of sys_clk cycles between synchronization points (0: free-running).
+ */
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <stdint.h>
+#include <errno.h>
+#include <unistd.h>
+#include <fcntl.h>
+#include <poll.h>
+#include <netdb.h>
+#include <sys/socket.h>
+#include <netinet/in.h>
+#include <netinet/tcp.h>
+#include "error.h"
+
+#include <json-c/json.h>
+#include "modules.h"
+#include "../sim_exit.h"
+
+#define FRAME_PACKET 'P'
+#define FRAME_SYNC   'S'
+#define FRAME_GO     'G'
+
+#define TXBUF_SIZE   4096
+#define RXBUF_SIZE   65536
+#define QUEUE_SIZE   4096
+#define POLL_CYCLES  256
+
+struct session_s {
+  char *sys_clk;
+  char *source_valid;
+  char *source_ready;
+  uint32_t *source_data;
+  char *sink_valid;
+  char *sink_ready;
+  uint32_t *sink_data;
+  char last_clk;
+  int fd;
+  uint64_t cycle;
+  uint64_t sync;
+  int go;
+  uint8_t txbuf[TXBUF_SIZE];
+  size_t txlen;
+  uint8_t rxbuf[RXBUF_SIZE];
+  size_t rxlen;
+  uint32_t *queue;
+  size_t qsize;
+  size_t qhead;
+  size_t qcount;
+  uint64_t tx_packets;
+  uint64_t rx_packets;
+};
+
+static int litex_sim_module_get_args(char *args, char *arg, char **val)
+{
+  int ret = RC_OK;
+  json_object *jsobj = NULL;
+  json_object *obj = NULL;
+  char *value = NULL;
+  int r;
+
+  jsobj = json_tokener_parse(args);
+  if(NULL == jsobj) {
+    fprintf(stderr, "[packetlink] error parsing json arg: %s\n", args);
+    ret = RC_JSERROR;
+    goto out;
+  }
+  if(!json_object_is_type(jsobj, json_type_object)) {
+    fprintf(stderr, "[packetlink] arg must be type object!: %s\n", args);
+    ret = RC_JSERROR;
+    goto out;
+  }
+  obj = NULL;
+  r = json_object_object_get_ex(jsobj, arg, &obj);
+  if(!r) {
+    ret = RC_JSERROR;
+    goto out;
+  }
+  value = strdup(json_object_get_string(obj));
+
+out:
+  *val = value;
+  return ret;
+}
+
+static int litex_sim_module_pads_get(struct pad_s *pads, char *name, void **signal)
+{
+  int ret = RC_OK;
+  void *sig = NULL;
+  int i;
+
+  if(!pads || !name || !signal) {
+    ret = RC_INVARG;
+    goto out;
+  }
+
+  i = 0;
+  while(pads[i].name) {
+    if(!strcmp(pads[i].name, name)) {
+      sig = (void*)pads[i].signal;
+      break;
+    }
+    i++;
+  }
+
+out:
+  *signal = sig;
+  return ret;
+}
+
+static int packetlink_connect(char *address)
+{
+  struct addrinfo hints, *res, *rp;
+  char *port;
+  int fd = -1;
+  int one = 1;
+
+  port = strrchr(address, ':');
+  if(!port) {
+    fprintf(stderr, "[packetlink] invalid address: %s (expected host:port)\n", address);
+    return -1;
+  }
+  *port++ = '\0';
+
+  memset(&hints, 0, sizeof(hints));
+  hints.ai_family   = AF_UNSPEC;
+  hints.ai_socktype = SOCK_STREAM;
+  if(getaddrinfo(address, port, &hints, &res) != 0) {
+    fprintf(stderr, "[packetlink] unable to resolve %s:%s\n", address, port);
+    return -1;
+  }
+  for(rp = res; rp != NULL; rp = rp->ai_next) {
+    fd = socket(rp->ai_family, rp->ai_socktype, rp->ai_protocol);
+    if(fd < 0)
+      continue;
+    if(connect(fd, rp->ai_addr, rp->ai_addrlen) == 0)
+      break;
+    close(fd);
+    fd = -1;
+  }
+  freeaddrinfo(res);
+  if(fd < 0) {
+    fprintf(stderr, "[packetlink] unable to connect to %s:%s\n", address, port);
+    return -1;
+  }
+  setsockopt(fd, IPPROTO_TCP, TCP_NODELAY, &one, sizeof(one));
+  fcntl(fd, F_SETFL, fcntl(fd, F_GETFL) | O_NONBLOCK);
+  return fd;
+}
+
+static void packetlink_disconnect(struct session_s *s)
+{
+  close(s->fd);
+  s->fd    = -1;
+  s->txlen = 0;
+}
+
+/* Returns RC_ERROR when the connection to the hub is lost (the pending frames are dropped). */
+static int packetlink_flush(struct session_s *s)
+{
+  size_t sent = 0;
+  ssize_t n;
+  struct pollfd pfd = {s->fd, POLLOUT, 0};
+
+  if(s->fd < 0)
+    return RC_ERROR;
+  while(sent < s->txlen) {
+    n = send(s->fd, s->txbuf + sent, s->txlen - sent, MSG_NOSIGNAL);
+    if(n > 0) {
+      sent += n;
+    } else if(n < 0 && (errno == EAGAIN || errno == EWOULDBLOCK || errno == EINTR)) {
+      poll(&pfd, 1, -1);
+    } else {
+      fprintf(stderr, "[packetlink] connection to hub lost\n");
+      packetlink_disconnect(s);
+      return RC_ERROR;
+    }
+  }
+  s->txlen = 0;
+  return RC_OK;
+}
+
+static int packetlink_put(struct session_s *s, uint8_t type, uint64_t value, int size)
+{
+  int i;
+
+  if(s->txlen + 1 + size > TXBUF_SIZE && packetlink_flush(s) != RC_OK)
+    return RC_ERROR;
+  s->txbuf[s->txlen++] = type;
+  for(i = 0; i < size; i++)
+    s->txbuf[s->txlen++] = (value >> (8*i)) & 0xff;
+  return RC_OK;
+}
+
+static uint64_t packetlink_get(uint8_t *buf, int size)
+{
+  uint64_t value = 0;
+  int i;
+
+  for(i = 0; i < size; i++)
+    value |= ((uint64_t) buf[i]) << (8*i);
+  return value;
+}
+
+static void packetlink_push(struct session_s *s, uint32_t data)
+{
+  uint32_t *queue;
+  size_t i;
+
+  /* Grow the queue when full (packets are never dropped). */
+  if(s->qcount == s->qsize) {
+    queue = malloc(2*s->qsize*sizeof(uint32_t));
+    if(!queue) {
+      fprintf(stderr, "[packetlink] unable to grow packet queue\n");
+      exit(1);
+    }
+    for(i = 0; i < s->qcount; i++)
+      queue[i] = s->queue[(s->qhead + i) % s->qsize];
+    free(s->queue);
+    s->queue = queue;
+    s->qsize = 2*s->qsize;
+    s->qhead = 0;
+  }
+  s->queue[(s->qhead + s->qcount) % s->qsize] = data;
+  s->qcount++;
+}
+
+static void packetlink_receive(struct session_s *s, int timeout)
+{
+  struct pollfd pfd = {s->fd, POLLIN, 0};
+  size_t pos = 0;
+  ssize_t n;
+
+  /* Receive. */
+  if(poll(&pfd, 1, timeout) > 0) {
+    n = recv(s->fd, s->rxbuf + s->rxlen, RXBUF_SIZE - s->rxlen, 0);
+    if(n == 0) {
+      fprintf(stderr, "[packetlink] connection closed by hub\n");
+      packetlink_disconnect(s);
+      exit(1);
+    }
+    if(n > 0)
+      s->rxlen += n;
+  }
+
+  /* Decode frames. */
+  while(pos < s->rxlen) {
+    if(s->rxbuf[pos] == FRAME_PACKET) {
+      if(s->rxlen - pos < 5)
+        break;
+      packetlink_push(s, packetlink_get(s->rxbuf + pos + 1, 4));
+      pos += 5;
+    } else if(s->rxbuf[pos] == FRAME_GO) {
+      if(s->rxlen - pos < 9)
+        break;
+      s->go = 1;
+      pos += 9;
+    } else {
+      fprintf(stderr, "[packetlink] invalid frame type 0x%02x\n", s->rxbuf[pos]);
+      exit(1);
+    }
+  }
+  memmove(s->rxbuf, s->rxbuf + pos, s->rxlen - pos);
+  s->rxlen -= pos;
+}
+
+static int packetlink_close(void *sess);
+
+static int packetlink_start(void *b)
+{
+  printf("[packetlink] loaded\n");
+  return RC_OK;
+}
+
+static int packetlink_new(void **sess, char *args)
+{
+  int ret = RC_OK;
+  struct session_s *s = NULL;
+  char *address = NULL;
+  char *sync = NULL;
+
+  if(!sess) {
+    ret = RC_INVARG;
+    goto out;
+  }
+
+  s = (struct session_s*) malloc(sizeof(struct session_s));
+  if(!s) {
+    ret = RC_NOENMEM;
+    goto out;
+  }
+  memset(s, 0, sizeof(struct session_s));
+  s->qsize = QUEUE_SIZE;
+  s->queue = (uint32_t*) malloc(s->qsize*sizeof(uint32_t));
+  if(!s->queue) {
+    ret = RC_NOENMEM;
+    goto out;
+  }
+
+  ret = litex_sim_module_get_args(args, "address", &address);
+  if(ret != RC_OK) {
+    fprintf(stderr, "[packetlink] missing \"address\" argument\n");
+    goto out;
+  }
+  if(litex_sim_module_get_args(args, "sync", &sync) == RC_OK) {
+    s->sync = strtoull(sync, NULL, 0);
+    free(sync);
+  }
+
+  s->fd = packetlink_connect(address);
+  free(address);
+  if(s->fd < 0) {
+    ret = RC_ERROR;
+    goto out;
+  }
+
+  sim_exit_register(s, packetlink_close);
+
+out:
+  *sess = (void*) s;
+  return ret;
+}
+
+static int packetlink_add_pads(void *sess, struct pad_list_s *plist)
+{
+  int ret = RC_OK;
+  struct session_s *s = (struct session_s*) sess;
+  struct pad_s *pads;
+
+  if(!sess || !plist) {
+    ret = RC_INVARG;
+    goto out;
+  }
+  pads = plist->pads;
+  if(!strcmp(plist->name, "packetlink")) {
+    litex_sim_module_pads_get(pads, "source_valid", (void**)&s->source_valid);
+    litex_sim_module_pads_get(pads, "source_ready", (void**)&s->source_ready);
+    litex_sim_module_pads_get(pads, "source_data",  (void**)&s->source_data);
+    litex_sim_module_pads_get(pads, "sink_valid",   (void**)&s->sink_valid);
+    litex_sim_module_pads_get(pads, "sink_ready",   (void**)&s->sink_ready);
+    litex_sim_module_pads_get(pads, "sink_data",    (void**)&s->sink_data);
+  }
+
+  if(!strcmp(plist->name, "sys_clk"))
+    litex_sim_module_pads_get(pads, "sys_clk", (void**) &s->sys_clk);
+
+out:
+  return ret;
+}
+
+static int packetlink_tick(void *sess, uint64_t time_ps)
+{
+  struct session_s *s = (struct session_s*) sess;
+  char clk = *s->sys_clk;
+
+  sim_exit_check();
+
+  if(!(clk && !s->last_clk)) {
+    s->last_clk = clk;
+    return RC_OK;
+  }
+  s->last_clk = clk;
+  s->cycle++;
+
+  /* SoC -> Hub (no backpressure, packets are buffered by the hub). */
+  if(*s->source_valid && *s->source_ready) {
+    if(packetlink_put(s, FRAME_PACKET, *s->source_data, 4) != RC_OK)
+      exit(1);
+    s->tx_packets++;
+  }
+  *s->source_ready = 1;
+
+  /* Hub -> SoC. */
+  if(*s->sink_valid && *s->sink_ready) {
+    s->qhead = (s->qhead + 1) % s->qsize;
+    s->qcount--;
+    s->rx_packets++;
+  }
+  if((s->cycle % POLL_CYCLES) == 0) {
+    if(packetlink_flush(s) != RC_OK)
+      exit(1);
+    packetlink_receive(s, 0);
+  }
+
+  /* Synchronization point: wait for all the nodes to reach the same cycle. */
+  if(s->sync && (s->cycle % s->sync) == 0) {
+    if(packetlink_put(s, FRAME_SYNC, s->cycle, 8) != RC_OK || packetlink_flush(s) != RC_OK)
+      exit(1);
+    while(!s->go) {
+      packetlink_receive(s, -1);
+      sim_exit_check(); /* Interrupted wait. */
+    }
+    s->go = 0;
+  }
+
+  *s->sink_valid = s->qcount > 0;
+  if(s->qcount)
+    *s->sink_data = s->queue[s->qhead];
+
+  return RC_OK;
+}
+
+static int packetlink_close(void *sess)
+{
+  struct session_s *s = (struct session_s*) sess;
+
+  sim_exit_unregister(s);
+
+  /* Best effort: the hub may already be gone (close() also runs from the exit handler). */
+  if(s->txlen)
+    packetlink_flush(s);
+  if(s->fd >= 0)
+    close(s->fd);
+  free(s->queue);
+  fprintf(stderr, "[packetlink] cycles: %llu, tx packets: %llu, rx packets: %llu\n",
+    (unsigned long long) s->cycle,
+    (unsigned long long) s->tx_packets,
+    (unsigned long long) s->rx_packets);
+  free(s);
+  return RC_OK;
+}
+
+static struct ext_module_s ext_mod = {
+  "packetlink",
+  packetlink_start,
+  packetlink_new,
+  packetlink_add_pads,
+  packetlink_close,
+  packetlink_tick
+};
+
+int litex_sim_ext_module_init(int (*register_module)(struct ext_module_s *))
+{
+  int ret = RC_OK;
+  ret = register_module(&ext_mod);
+  return ret;
+}
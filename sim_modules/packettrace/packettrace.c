@@ -0,0 +1,377 @@
+/*
+ * This file is part of Linux-on-LiteX-VexRiscv
+ *
+ * Copyright (c) 2019-2022, Linux-on-LiteX-VexRiscv Developers
+ * SPDX-License-Identifier: BSD-2-Clause
+ *
+ * Packet trace: records the packets output by the SoC (recv_core) to a trace file and/or replays
+ * a trace file into the SoC (send_core). See test_core_final/trace.py for the file format.
+ *
+ * Module args:
+ * - "record":   trace file to record to (optional).
+ * - "replay":   trace file to replay (optional, memory-mapped).
+ * - "speed":    replay speed relative to the recorded timing (0: back-to-back, default: 1).
+ * - "start":    sys_clk cycle at which the replay starts (default: 0).
+ * - "clk_freq": sys_clk frequency stored in the recorded trace header.
+ */
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <stdint.h>
+#include <unistd.h>
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include "error.h"
+
+#include <json-c/json.h>
+#include "modules.h"
+#include "../sim_exit.h"
+
+#define TRACE_MAGIC       "LXPKTTRC"
+#define TRACE_VERSION     1
+#define TRACE_HEADER_SIZE 64
+#define TRACE_RECORD_SIZE 16
+
+struct trace_header_s {
+  char magic[8];
+  uint32_t version;
+  uint32_t header_size;
+  uint32_t record_size;
+  uint32_t packet_width;
+  uint64_t clk_freq;
+  uint64_t count;
+  uint8_t reserved[24];
+} __attribute__((packed));
+
+struct trace_record_s {
+  uint64_t cycle;
+  uint32_t data;
+  uint32_t flags;
+} __attribute__((packed));
+
+struct session_s {
+  char *sys_clk;
+  char *source_valid;
+  char *source_ready;
+  uint32_t *source_data;
+  char *sink_valid;
+  char *sink_ready;
+  uint32_t *sink_data;
+  char last_clk;
+  uint64_t cycle;
+  /* Record. */
+  FILE *record;
+  uint64_t clk_freq;
+  uint64_t recorded;
+  /* Replay. */
+  void *replay;
+  size_t replay_size;
+  struct trace_record_s *records;
+  uint64_t count;
+  uint64_t index;
+  double speed;
+  uint64_t start;
+  uint64_t late_cycles;
+};
+
+static int litex_sim_module_get_args(char *args, char *arg, char **val)
+{
+  int ret = RC_OK;
+  json_object *jsobj = NULL;
+  json_object *obj = NULL;
+  char *value = NULL;
+  int r;
+
+  jsobj = json_tokener_parse(args);
+  if(NULL == jsobj) {
+    fprintf(stderr, "[packettrace] error parsing json arg: %s\n", args);
+    ret = RC_JSERROR;
+    goto out;
+  }
+  if(!json_object_is_type(jsobj, json_type_object)) {
+    fprintf(stderr, "[packettrace] arg must be type object!: %s\n", args);
+    ret = RC_JSERROR;
+    goto out;
+  }
+  obj = NULL;
+  r = json_object_object_get_ex(jsobj, arg, &obj);
+  if(!r) {
+    ret = RC_JSERROR;
+    goto out;
+  }
+  value = strdup(json_object_get_string(obj));
+
+out:
+  *val = value;
+  return ret;
+}
+
+static int litex_sim_module_pads_get(struct pad_s *pads, char *name, void **signal)
+{
+  int ret = RC_OK;
+  void *sig = NULL;
+  int i;
+
+  if(!pads || !name || !signal) {
+    ret = RC_INVARG;
+    goto out;
+  }
+
+  i = 0;
+  while(pads[i].name) {
+    if(!strcmp(pads[i].name, name)) {
+      sig = (void*)pads[i].signal;
+      break;
+    }
+    i++;
+  }
+
+out:
+  *signal = sig;
+  return ret;
+}
+
+static void packettrace_write_header(struct session_s *s)
+{
+  struct trace_header_s header;
+
+  memset(&header, 0, sizeof(header));
+  memcpy(header.magic, TRACE_MAGIC, 8);
+  header.version      = TRACE_VERSION;
+  header.header_size  = TRACE_HEADER_SIZE;
+  header.record_size  = TRACE_RECORD_SIZE;
+  header.packet_width = 32;
+  header.clk_freq     = s->clk_freq;
+  header.count        = s->recorded;
+  fseek(s->record, 0, SEEK_SET);
+  fwrite(&header, sizeof(header), 1, s->record);
+  fseek(s->record, 0, SEEK_END);
+}
+
+static int packettrace_open_replay(struct session_s *s, char *filename)
+{
+  struct trace_header_s *header;
+  struct stat st;
+  uint64_t count;
+  int fd;
+
+  fd = open(filename, O_RDONLY);
+  if(fd < 0 || fstat(fd, &st) < 0) {
+    fprintf(stderr, "[packettrace] unable to open %s\n", filename);
+    return RC_ERROR;
+  }
+  if(st.st_size < TRACE_HEADER_SIZE) {
+    fprintf(stderr, "[packettrace] %s is not a packet trace\n", filename);
+    close(fd);
+    return RC_ERROR;
+  }
+  s->replay_size = st.st_size;
+  s->replay = mmap(NULL, s->replay_size, PROT_READ, MAP_PRIVATE, fd, 0);
+  close(fd);
+  if(s->replay == MAP_FAILED) {
+    fprintf(stderr, "[packettrace] unable to map %s\n", filename);
+    s->replay = NULL;
+    return RC_ERROR;
+  }
+  header = (struct trace_header_s*) s->replay;
+  if(memcmp(header->magic, TRACE_MAGIC, 8) ||
+     header->version != TRACE_VERSION ||
+     header->record_size != TRACE_RECORD_SIZE ||
+     header->header_size > s->replay_size) {
+    fprintf(stderr, "[packettrace] %s: unsupported packet trace\n", filename);
+    return RC_ERROR;
+  }
+  /* Count from the file size when the header was not finalized (interrupted recording). */
+  count = (s->replay_size - header->header_size)/TRACE_RECORD_SIZE;
+  if(header->count && header->count < count)
+    count = header->count;
+  s->records = (struct trace_record_s*) ((uint8_t*) s->replay + header->header_size);
+  s->count = count;
+  printf("[packettrace] replaying %llu packets from %s\n", (unsigned long long) count, filename);
+  return RC_OK;
+}
+
+static int packettrace_close(void *sess);
+
+static int packettrace_start(void *b)
+{
+  printf("[packettrace] loaded\n");
+  return RC_OK;
+}
+
+static int packettrace_new(void **sess, char *args)
+{
+  int ret = RC_OK;
+  struct session_s *s = NULL;
+  char *record = NULL;
+  char *replay = NULL;
+  char *value = NULL;
+
+  if(!sess) {
+    ret = RC_INVARG;
+    goto out;
+  }
+
+  s = (struct session_s*) malloc(sizeof(struct session_s));
+  if(!s) {
+    ret = RC_NOENMEM;
+    goto out;
+  }
+  memset(s, 0, sizeof(struct session_s));
+  s->speed    = 1.0;
+  s->clk_freq = 0;
+
+  if(litex_sim_module_get_args(args, "speed", &value) == RC_OK) {
+    s->speed = strtod(value, NULL);
+    free(value);
+  }
+  if(litex_sim_module_get_args(args, "start", &value) == RC_OK) {
+    s->start = strtoull(value, NULL, 0);
+    free(value);
+  }
+  if(litex_sim_module_get_args(args, "clk_freq", &value) == RC_OK) {
+    s->clk_freq = strtoull(value, NULL, 0);
+    free(value);
+  }
+
+  if(litex_sim_module_get_args(args, "record", &record) == RC_OK) {
+    s->record = fopen(record, "wb");
+    if(!s->record) {
+      fprintf(stderr, "[packettrace] unable to create %s\n", record);
+      free(record);
+      ret = RC_ERROR;
+      goto out;
+    }
+    packettrace_write_header(s);
+    free(record);
+  }
+
+  if(litex_sim_module_get_args(args, "replay", &replay) == RC_OK) {
+    ret = packettrace_open_replay(s, replay);
+    free(replay);
+  }
+
+  sim_exit_register(s, packettrace_close);
+
+out:
+  *sess = (void*) s;
+  return ret;
+}
+
+static int packettrace_add_pads(void *sess, struct pad_list_s *plist)
+{
+  int ret = RC_OK;
+  struct session_s *s = (struct session_s*) sess;
+  struct pad_s *pads;
+
+  if(!sess || !plist) {
+    ret = RC_INVARG;
+    goto out;
+  }
+  pads = plist->pads;
+  if(!strcmp(plist->name, "packettrace")) {
+    litex_sim_module_pads_get(pads, "source_valid", (void**)&s->source_valid);
+    litex_sim_module_pads_get(pads, "source_ready", (void**)&s->source_ready);
+    litex_sim_module_pads_get(pads, "source_data",  (void**)&s->source_data);
+    litex_sim_module_pads_get(pads, "sink_valid",   (void**)&s->sink_valid);
+    litex_sim_module_pads_get(pads, "sink_ready",   (void**)&s->sink_ready);
+    litex_sim_module_pads_get(pads, "sink_data",    (void**)&s->sink_data);
+  }
+
+  if(!strcmp(plist->name, "sys_clk"))
+    litex_sim_module_pads_get(pads, "sys_clk", (void**) &s->sys_clk);
+
+out:
+  return ret;
+}
+
+static int packettrace_tick(void *sess, uint64_t time_ps)
+{
+  struct session_s *s = (struct session_s*) sess;
+  struct trace_record_s record;
+  uint64_t due;
+  char clk = *s->sys_clk;
+
+  sim_exit_check();
+
+  if(!(clk && !s->last_clk)) {
+    s->last_clk = clk;
+    return RC_OK;
+  }
+  s->last_clk = clk;
+
+  /* Record (SoC -> trace). */
+  if(s->record) {
+    if(*s->source_valid && *s->source_ready) {
+      record.cycle = s->cycle;
+      record.data  = *s->source_data;
+      record.flags = 0;
+      fwrite(&record, sizeof(record), 1, s->record);
+      s->recorded++;
+    }
+    *s->source_ready = 1;
+  }
+
+  /* Replay (trace -> SoC): packets are presented at their (scaled) recorded cycle relative to
+   * the first packet, or back-to-back when speed is 0. Backpressure delays later packets. */
+  if(s->count) {
+    if(*s->sink_valid && *s->sink_ready)
+      s->index++;
+    *s->sink_valid = 0;
+    if(s->index < s->count) {
+      due = s->start;
+      if(s->speed > 0)
+        due += (uint64_t) ((s->records[s->index].cycle - s->records[0].cycle)/s->speed);
+      if(s->cycle >= due) {
+        if(s->cycle > due)
+          s->late_cycles++;
+        *s->sink_valid = 1;
+        *s->sink_data  = s->records[s->index].data;
+      }
+    }
+  }
+
+  s->cycle++;
+  return RC_OK;
+}
+
+static int packettrace_close(void *sess)
+{
+  struct session_s *s = (struct session_s*) sess;
+
+  sim_exit_unregister(s);
+
+  if(s->record) {
+    packettrace_write_header(s);
+    fclose(s->record);
+    fprintf(stderr, "[packettrace] recorded %llu packets\n", (unsigned long long) s->recorded);
+  }
+  if(s->replay) {
+    fprintf(stderr, "[packettrace] replayed %llu/%llu packets in %llu cycles (%llu late packet-cycles)\n",
+      (unsigned long long) s->index,
+      (unsigned long long) s->count,
+      (unsigned long long) s->cycle,
+      (unsigned long long) s->late_cycles);
+    munmap(s->replay, s->replay_size);
+  }
+  free(s);
+  return RC_OK;
+}
+
+static struct ext_module_s ext_mod = {
+  "packettrace",
+  packettrace_start,
+  packettrace_new,
+  packettrace_add_pads,
+  packettrace_close,
+  packettrace_tick
+};
+
+int litex_sim_ext_module_init(int (*register_module)(struct ext_module_s *))
+{
+  int ret = RC_OK;
+  ret = register_module(&ext_mod);
+  return ret;
+}
@@ -0,0 +1,122 @@
+/*
+ * This file is part of Linux-on-LiteX-VexRiscv
+ *
+ * Copyright (c) 2019-2022, Linux-on-LiteX-VexRiscv Developers
+ * SPDX-License-Identifier: BSD-2-Clause
+ *
+ * Simulation modules exit helper.
+ *
+ * The simulation does not call the modules close() on exit: the sessions registered with
+ * sim_exit_register() are closed from an atexit handler. SIGINT/SIGTERM only record the signal
+ * (the handler chains to the one installed before it, so every module sees it) and the modules
+ * exit from their tick with sim_exit_check(), the close() handlers then running outside of the
+ * signal context. A second signal exits immediately (_exit).
+ *
+ * Header-only (each module is a separate shared library with its own copy of this state), include
+ * it as "../sim_exit.h".
+ */
+
+#ifndef __SIM_EXIT_H_
+#define __SIM_EXIT_H_
+
+#include <stdlib.h>
+#include <string.h>
+#include <signal.h>
+#include <unistd.h>
+
+struct sim_exit_session_s {
+  void *sess;
+  int (*close)(void *sess);
+  struct sim_exit_session_s *next;
+};
+
+static struct sim_exit_session_s *sim_exit_sessions = NULL;
+static volatile sig_atomic_t sim_exit_signal = 0;
+static struct sigaction sim_exit_previous[2];
+static int sim_exit_installed = 0;
+
+static inline void sim_exit_close_all(void)
+{
+  struct sim_exit_session_s *e;
+
+  while((e = sim_exit_sessions) != NULL) {
+    sim_exit_sessions = e->next;
+    e->close(e->sess);
+    free(e);
+  }
+}
+
+static inline void sim_exit_handler(int sig, siginfo_t *info, void *ctx)
+{
+  struct sigaction *previous = &sim_exit_previous[sig == SIGTERM];
+
+  if(sim_exit_signal)
+    _exit(128 + sig);
+  sim_exit_signal = sig;
+  if(previous->sa_flags & SA_SIGINFO)
+    previous->sa_sigaction(sig, info, ctx);
+  else if(previous->sa_handler != SIG_DFL && previous->sa_handler != SIG_IGN)
+    previous->sa_handler(sig);
+}
+
+/* Install the exit handlers (once per module). */
+static inline void sim_exit_install(void)
+{
+  struct sigaction sa;
+
+  if(sim_exit_installed)
+    return;
+  sim_exit_installed = 1;
+  atexit(sim_exit_close_all);
+  memset(&sa, 0, sizeof(sa));
+  sa.sa_sigaction = sim_exit_handler;
+  sa.sa_flags     = SA_SIGINFO;
+  sigemptyset(&sa.sa_mask);
+  sigaction(SIGINT,  &sa, &sim_exit_previous[0]);
+  sigaction(SIGTERM, &sa, &sim_exit_previous[1]);
+}
+
+/* Close sess with close(sess) on exit (close() must call sim_exit_unregister()). */
+static inline int sim_exit_register(void *sess, int (*close)(void *sess))
+{
+  struct sim_exit_session_s *e;
+
+  sim_exit_install();
+  e = (struct sim_exit_session_s *) malloc(sizeof(struct sim_exit_session_s));
+  if(!e)
+    return -1;
+  e->sess  = sess;
+  e->close = close;
+  e->next  = sim_exit_sessions;
+  sim_exit_sessions = e;
+  return 0;
+}
+
+static inline void sim_exit_unregister(void *sess)
+{
+  struct sim_exit_session_s **p, *e;
+
+  for(p = &sim_exit_sessions; *p; p = &(*p)->next) {
+    if((*p)->sess == sess) {
+      e  = *p;
+      *p = e->next;
+      free(e);
+      break;
+    }
+  }
+}
+
+/* Signal received (0 if none). */
+static inline int sim_exit_interrupted(void)
+{
+  return sim_exit_signal;
+}
+
+/* Exit (from the module tick) when a signal was received. */
+static inline void sim_exit_check(void)
+{
+  if(sim_exit_signal)
+    exit(128 + sim_exit_signal);
+}
+
+#endif
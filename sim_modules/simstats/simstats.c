@@ -0,0 +1,284 @@
+/*
+ * This file is part of Linux-on-LiteX-VexRiscv
+ *
+ * Copyright (c) 2019-2022, Linux-on-LiteX-VexRiscv Developers
+ * SPDX-License-Identifier: BSD-2-Clause
+ *
+ * Simulation statistics: measures the simulation speed (simulated sys_clk cycles per wall-clock
+ * second, reported in MHz), prints it periodically and saves it to a JSON file at the end of the
+ * simulation.
+ *
+ * Module args:
+ * - "output":   JSON file to write (optional).
+ * - "interval": live report period in wall-clock seconds (0: disabled, default: 10).
+ * - "label":    configuration label stored in the JSON file (optional).
+ *
+ * The SIMSTATS_OUTPUT environment variable overrides "output" (empty: no file), so several
+ * processes of the same simulation (co-simulation nodes) each save their own statistics.
+ */
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <stdint.h>
+#include <time.h>
+#include "error.h"
+
+#include <json-c/json.h>
+#include "modules.h"
+#include "../sim_exit.h"
+
+#define CHECK_CYCLES 65536
+#define MAX_SAMPLES  4096
+
+struct sample_s {
+  double time;
+  uint64_t cycles;
+};
+
+struct session_s {
+  char *sys_clk;
+  char last_clk;
+  uint64_t cycles;
+  double start;
+  double last;
+  uint64_t last_cycles;
+  double interval;
+  char *output;
+  char *label;
+  struct sample_s samples[MAX_SAMPLES];
+  int nsamples;
+};
+
+static int litex_sim_module_get_args(char *args, char *arg, char **val)
+{
+  int ret = RC_OK;
+  json_object *jsobj = NULL;
+  json_object *obj = NULL;
+  char *value = NULL;
+  int r;
+
+  jsobj = json_tokener_parse(args);
+  if(NULL == jsobj) {
+    fprintf(stderr, "[simstats] error parsing json arg: %s\n", args);
+    ret = RC_JSERROR;
+    goto out;
+  }
+  if(!json_object_is_type(jsobj, json_type_object)) {
+    fprintf(stderr, "[simstats] arg must be type object!: %s\n", args);
+    ret = RC_JSERROR;
+    goto out;
+  }
+  obj = NULL;
+  r = json_object_object_get_ex(jsobj, arg, &obj);
+  if(!r) {
+    ret = RC_JSERROR;
+    goto out;
+  }
+  value = strdup(json_object_get_string(obj));
+
+out:
+  *val = value;
+  return ret;
+}
+
+static int litex_sim_module_pads_get(struct pad_s *pads, char *name, void **signal)
+{
+  int ret = RC_OK;
+  void *sig = NULL;
+  int i;
+
+  if(!pads || !name || !signal) {
+    ret = RC_INVARG;
+    goto out;
+  }
+
+  i = 0;
+  while(pads[i].name) {
+    if(!strcmp(pads[i].name, name)) {
+      sig = (void*)pads[i].signal;
+      break;
+    }
+    i++;
+  }
+
+out:
+  *signal = sig;
+  return ret;
+}
+
+static double simstats_now(void)
+{
+  struct timespec ts;
+
+  clock_gettime(CLOCK_MONOTONIC, &ts);
+  return ts.tv_sec + ts.tv_nsec*1e-9;
+}
+
+static int simstats_close(void *sess);
+
+static int simstats_start(void *b)
+{
+  printf("[simstats] loaded\n");
+  return RC_OK;
+}
+
+static int simstats_new(void **sess, char *args)
+{
+  int ret = RC_OK;
+  struct session_s *s = NULL;
+  char *interval = NULL;
+  char *output;
+
+  if(!sess) {
+    ret = RC_INVARG;
+    goto out;
+  }
+
+  s = (struct session_s*) malloc(sizeof(struct session_s));
+  if(!s) {
+    ret = RC_NOENMEM;
+    goto out;
+  }
+  memset(s, 0, sizeof(struct session_s));
+  s->interval = 10.0;
+
+  if(litex_sim_module_get_args(args, "interval", &interval) == RC_OK) {
+    s->interval = strtod(interval, NULL);
+    free(interval);
+  }
+  litex_sim_module_get_args(args, "output", &s->output);
+  litex_sim_module_get_args(args, "label",  &s->label);
+  if((output = getenv("SIMSTATS_OUTPUT")) != NULL) {
+    free(s->output);
+    s->output = *output ? strdup(output) : NULL;
+  }
+
+  s->start = simstats_now();
+  s->last  = s->start;
+
+  sim_exit_register(s, simstats_close);
+
+out:
+  *sess = (void*) s;
+  return ret;
+}
+
+static int simstats_add_pads(void *sess, struct pad_list_s *plist)
+{
+  int ret = RC_OK;
+  struct session_s *s = (struct session_s*) sess;
+  struct pad_s *pads;
+
+  if(!sess || !plist) {
+    ret = RC_INVARG;
+    goto out;
+  }
+  pads = plist->pads;
+  if(!strcmp(plist->name, "sys_clk"))
+    litex_sim_module_pads_get(pads, "sys_clk", (void**) &s->sys_clk);
+
+out:
+  return ret;
+}
+
+static void simstats_sample(struct session_s *s, double now)
+{
+  if(s->nsamples < MAX_SAMPLES) {
+    s->samples[s->nsamples].time   = now - s->start;
+    s->samples[s->nsamples].cycles = s->cycles;
+    s->nsamples++;
+  }
+}
+
+static int simstats_tick(void *sess, uint64_t time_ps)
+{
+  struct session_s *s = (struct session_s*) sess;
+  char clk = *s->sys_clk;
+  double now;
+
+  sim_exit_check();
+
+  if(!(clk && !s->last_clk)) {
+    s->last_clk = clk;
+    return RC_OK;
+  }
+  s->last_clk = clk;
+  s->cycles++;
+
+  /* Only read the wall-clock time every CHECK_CYCLES cycles. */
+  if((s->cycles % CHECK_CYCLES) || s->interval <= 0)
+    return RC_OK;
+  now = simstats_now();
+  if(now - s->last >= s->interval) {
+    fprintf(stderr, "\n[simstats] %.1fs: %llu cycles, %.3f MHz (average: %.3f MHz)\n",
+      now - s->start,
+      (unsigned long long) s->cycles,
+      (s->cycles - s->last_cycles)/(now - s->last)/1e6,
+      s->cycles/(now - s->start)/1e6);
+    simstats_sample(s, now);
+    s->last        = now;
+    s->last_cycles = s->cycles;
+  }
+
+  return RC_OK;
+}
+
+static void simstats_write(struct session_s *s, double duration)
+{
+  FILE *f;
+  int i;
+
+  f = fopen(s->output, "w");
+  if(!f) {
+    fprintf(stderr, "[simstats] unable to create %s\n", s->output);
+    return;
+  }
+  fprintf(f, "{\n");
+  fprintf(f, "    \"label\": \"%s\",\n", s->label ? s->label : "");
+  fprintf(f, "    \"cycles\": %llu,\n", (unsigned long long) s->cycles);
+  fprintf(f, "    \"wall_time\": %.3f,\n", duration);
+  fprintf(f, "    \"mhz\": %.6f,\n", duration > 0 ? s->cycles/duration/1e6 : 0.0);
+  fprintf(f, "    \"samples\": [");
+  for(i = 0; i < s->nsamples; i++)
+    fprintf(f, "%s\n        {\"time\": %.3f, \"cycles\": %llu}", i ? "," : "",
+      s->samples[i].time, (unsigned long long) s->samples[i].cycles);
+  fprintf(f, "%s]\n}\n", s->nsamples ? "\n    " : "");
+  fclose(f);
+}
+
+static int simstats_close(void *sess)
+{
+  struct session_s *s = (struct session_s*) sess;
+  double duration = simstats_now() - s->start;
+
+  sim_exit_unregister(s);
+
+  fprintf(stderr, "[simstats] %llu cycles in %.1fs: %.3f MHz\n",
+    (unsigned long long) s->cycles,
+    duration,
+    duration > 0 ? s->cycles/duration/1e6 : 0.0);
+  if(s->output) {
+    simstats_write(s, duration);
+    free(s->output);
+  }
+  free(s->label);
+  free(s);
+  return RC_OK;
+}
+
+static struct ext_module_s ext_mod = {
+  "simstats",
+  simstats_start,
+  simstats_new,
+  simstats_add_pads,
+  simstats_close,
+  simstats_tick
+};
+
+int litex_sim_ext_module_init(int (*register_module)(struct ext_module_s *))
+{
+  int ret = RC_OK;
+  ret = register_module(&ext_mod);
+  return ret;
+}
@@ -0,0 +1,267 @@
+/*
+ * This file is part of Linux-on-LiteX-VexRiscv
+ *
+ * Copyright (c) 2019-2022, Linux-on-LiteX-VexRiscv Developers
+ * SPDX-License-Identifier: BSD-2-Clause
+ *
+ * Trace trigger: watches the SoC console output and drives the trace trigger input of the SoC
+ * when a line matches a regular expression (POSIX extended), so waveform tracing can be limited
+ * to the interesting part of a simulation.
+ *
+ * Module args:
+ * - "start":  regex starting the trace.
+ * - "stop":   regex stopping the trace (optional).
+ * - "cycles": number of sys_clk cycles to trace after the start (optional, 0: until stop/end).
+ */
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <stdint.h>
+#include <regex.h>
+#include "error.h"
+
+#include <json-c/json.h>
+#include "modules.h"
+
+#define LINE_SIZE 1024
+
+enum {
+  STATE_WAIT,
+  STATE_TRACE,
+  STATE_DONE,
+};
+
+struct session_s {
+  char *sys_clk;
+  char *console_valid;
+  char *console_data;
+  char *trigger;
+  char last_clk;
+  uint64_t cycle;
+  int state;
+  regex_t start;
+  regex_t stop;
+  int has_stop;
+  uint64_t cycles;
+  uint64_t start_cycle;
+  char line[LINE_SIZE];
+  int len;
+};
+
+static int litex_sim_module_get_args(char *args, char *arg, char **val)
+{
+  int ret = RC_OK;
+  json_object *jsobj = NULL;
+  json_object *obj = NULL;
+  char *value = NULL;
+  int r;
+
+  jsobj = json_tokener_parse(args);
+  if(NULL == jsobj) {
+    fprintf(stderr, "[tracetrigger] error parsing json arg: %s\n", args);
+    ret = RC_JSERROR;
+    goto out;
+  }
+  if(!json_object_is_type(jsobj, json_type_object)) {
+    fprintf(stderr, "[tracetrigger] arg must be type object!: %s\n", args);
+    ret = RC_JSERROR;
+    goto out;
+  }
+  obj = NULL;
+  r = json_object_object_get_ex(jsobj, arg, &obj);
+  if(!r) {
+    ret = RC_JSERROR;
+    goto out;
+  }
+  value = strdup(json_object_get_string(obj));
+
+out:
+  *val = value;
+  return ret;
+}
+
+static int litex_sim_module_pads_get(struct pad_s *pads, char *name, void **signal)
+{
+  int ret = RC_OK;
+  void *sig = NULL;
+  int i;
+
+  if(!pads || !name || !signal) {
+    ret = RC_INVARG;
+    goto out;
+  }
+
+  i = 0;
+  while(pads[i].name) {
+    if(!strcmp(pads[i].name, name)) {
+      sig = (void*)pads[i].signal;
+      break;
+    }
+    i++;
+  }
+
+out:
+  *signal = sig;
+  return ret;
+}
+
+static int tracetrigger_compile(regex_t *re, char *pattern)
+{
+  if(regcomp(re, pattern, REG_EXTENDED | REG_NOSUB)) {
+    fprintf(stderr, "[tracetrigger] invalid regex: %s\n", pattern);
+    return RC_ERROR;
+  }
+  return RC_OK;
+}
+
+static int tracetrigger_start(void *b)
+{
+  printf("[tracetrigger] loaded\n");
+  return RC_OK;
+}
+
+static int tracetrigger_new(void **sess, char *args)
+{
+  int ret = RC_OK;
+  struct session_s *s = NULL;
+  char *value = NULL;
+
+  if(!sess) {
+    ret = RC_INVARG;
+    goto out;
+  }
+
+  s = (struct session_s*) malloc(sizeof(struct session_s));
+  if(!s) {
+    ret = RC_NOENMEM;
+    goto out;
+  }
+  memset(s, 0, sizeof(struct session_s));
+
+  ret = litex_sim_module_get_args(args, "start", &value);
+  if(ret != RC_OK) {
+    fprintf(stderr, "[tracetrigger] missing \"start\" argument\n");
+    goto out;
+  }
+  ret = tracetrigger_compile(&s->start, value);
+  free(value);
+  if(ret != RC_OK)
+    goto out;
+  if(litex_sim_module_get_args(args, "stop", &value) == RC_OK) {
+    ret = tracetrigger_compile(&s->stop, value);
+    free(value);
+    if(ret != RC_OK)
+      goto out;
+    s->has_stop = 1;
+  }
+  if(litex_sim_module_get_args(args, "cycles", &value) == RC_OK) {
+    s->cycles = strtoull(value, NULL, 0);
+    free(value);
+  }
+
+out:
+  *sess = (void*) s;
+  return ret;
+}
+
+static int tracetrigger_add_pads(void *sess, struct pad_list_s *plist)
+{
+  int ret = RC_OK;
+  struct session_s *s = (struct session_s*) sess;
+  struct pad_s *pads;
+
+  if(!sess || !plist) {
+    ret = RC_INVARG;
+    goto out;
+  }
+  pads = plist->pads;
+  if(!strcmp(plist->name, "tracetrigger")) {
+    litex_sim_module_pads_get(pads, "console_valid", (void**)&s->console_valid);
+    litex_sim_module_pads_get(pads, "console_data",  (void**)&s->console_data);
+    litex_sim_module_pads_get(pads, "trigger",       (void**)&s->trigger);
+  }
+
+  if(!strcmp(plist->name, "sys_clk"))
+    litex_sim_module_pads_get(pads, "sys_clk", (void**) &s->sys_clk);
+
+out:
+  return ret;
+}
+
+static void tracetrigger_set(struct session_s *s, int state)
+{
+  s->state = state;
+  *s->trigger = (state == STATE_TRACE);
+  fprintf(stderr, "\n[tracetrigger] trace %s at cycle %llu\n",
+    state == STATE_TRACE ? "started" : "stopped", (unsigned long long) s->cycle);
+}
+
+static int tracetrigger_tick(void *sess, uint64_t time_ps)
+{
+  struct session_s *s = (struct session_s*) sess;
+  char clk = *s->sys_clk;
+  char c;
+
+  if(!(clk && !s->last_clk)) {
+    s->last_clk = clk;
+    return RC_OK;
+  }
+  s->last_clk = clk;
+  s->cycle++;
+
+  if(s->state == STATE_TRACE && s->cycles && (s->cycle - s->start_cycle) >= s->cycles)
+    tracetrigger_set(s, STATE_DONE);
+
+  if(!*s->console_valid || s->state == STATE_DONE)
+    return RC_OK;
+
+  /* Accumulate the current console line and match it on each new character (so prompts without
+   * a newline can also trigger). */
+  c = *s->console_data;
+  if(c == '\n' || c == '\r') {
+    s->len = 0;
+  } else if(s->len < LINE_SIZE - 1) {
+    s->line[s->len++] = c;
+  }
+  s->line[s->len] = '\0';
+  if(s->len == 0)
+    return RC_OK;
+
+  if(s->state == STATE_WAIT && !regexec(&s->start, s->line, 0, NULL, 0)) {
+    s->start_cycle = s->cycle;
+    s->len = 0;
+    tracetrigger_set(s, STATE_TRACE);
+  } else if(s->state == STATE_TRACE && s->has_stop && !regexec(&s->stop, s->line, 0, NULL, 0)) {
+    tracetrigger_set(s, STATE_DONE);
+  }
+
+  return RC_OK;
+}
+
+static int tracetrigger_close(void *sess)
+{
+  struct session_s *s = (struct session_s*) sess;
+
+  regfree(&s->start);
+  if(s->has_stop)
+    regfree(&s->stop);
+  free(s);
+  return RC_OK;
+}
+
+static struct ext_module_s ext_mod = {
+  "tracetrigger",
+  tracetrigger_start,
+  tracetrigger_new,
+  tracetrigger_add_pads,
+  tracetrigger_close,
+  tracetrigger_tick
+};
+
+int litex_sim_ext_module_init(int (*register_module)(struct ext_module_s *))
+{
+  int ret = RC_OK;
+  ret = register_module(&ext_mod);
+  return ret;
+}
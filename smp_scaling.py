@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+#
+# This file is part of Linux-on-LiteX-VexRiscv
+#
+# Copyright (c) 2019-2022, Linux-on-LiteX-VexRiscv Developers
+# SPDX-License-Identifier: BSD-2-Clause
+
+import os
+import json
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_parse import parse
+from sweep import run_headless
+
+# SMP Scaling Benchmark ----------------------------------------------------------------------------
+#
+# Boots the simulation for each --cpu-count, runs parallel workloads with one instance/thread pinned
+# per hart and reports the aggregate performance, speedup and efficiency per core count:
+# - dhrystone: one dhrystone-opt per hart (taskset), aggregate Dhrystones/s (CPU bound).
+# - stream:    one membench-stream per hart (taskset), aggregate Copy/Triad bandwidth (memory bound).
+# - packet:    packet-bench with one thread per hart exchanging packets (coherency bound).
+# Requires the dhrystone-opt, membench and packet-bench packages in the image.
+
+def workload(cpu_count, dhrystone_runs, stream_words, packets):
+    def per_hart(command, output):
+        return ("for i in $(seq 0 {n}); do taskset -c $i {command} > /tmp/{output}.$i & done; "
+                "wait; cat /tmp/{output}.*").format(n=cpu_count - 1, command=command, output=output)
+    return "; ".join([
+        per_hart("dhrystone-opt {}".format(dhrystone_runs),         "dhrystone"),
+        per_hart("membench-stream -n {} -t 4".format(stream_words), "stream"),
+        "packet-bench -t {} -n {}".format(cpu_count, packets),
+    ])
+
+def aggregate(results, cpu_count):
+    """Aggregate metrics of a run: sums of the per-hart instances (None if an instance is missing)."""
+    def total(benchmark, metric, instances):
+        values = [r["value"] for r in results if r["benchmark"] == benchmark and r["metric"] == metric]
+        return sum(values) if len(values) == instances else None
+    return {
+        "dhrystone_per_second" : total("dhrystone", "dhrystones_per_second", cpu_count),
+        "stream_copy_mbps"     : total("stream",    "copy",                  cpu_count),
+        "stream_triad_mbps"    : total("stream",    "triad",                 cpu_count),
+        "packets_per_second"   : total("packet",    "packets_per_second",    1),
+    }
+
+def run_cpu_count(cpu_count, args, sim_args):
+    build_dir = os.path.join(args.scaling_dir, "cpu{}".format(cpu_count))
+    status, wall_time, headless = run_headless(build_dir,
+        workload(cpu_count, args.dhrystone_runs, args.stream_words, args.packets),
+        args.timeout, ["--cpu-count", str(cpu_count)] + sim_args)
+    r = {"cpu_count": cpu_count, "status": status, "wall_time": wall_time}
+    results = parse("\n".join(headless["output"])) if headless is not None else []
+    r.update(aggregate(results, cpu_count))
+    return r
+
+def main():
+    parser = argparse.ArgumentParser(description="Linux on LiteX-VexRiscv SMP scaling benchmark (simulation).")
+    parser.add_argument("--cpu-counts",     default="1,2,4,8",           help="Comma-separated core counts.")
+    parser.add_argument("--jobs",           default=1,         type=int, help="Core counts built/simulated in parallel.")
+    parser.add_argument("--timeout",        default=int(100e9), type=int, help="Headless timeout per core count (sys_clk cycles).")
+    parser.add_argument("--dhrystone-runs", default=20000,     type=int, help="Dhrystone runs per hart.")
+    parser.add_argument("--stream-words",   default=65536,     type=int, help="STREAM array size per hart (32-bit words).")
+    parser.add_argument("--packets",        default=20000,     type=int, help="packet-bench packets per thread.")
+    parser.add_argument("--scaling-dir",    default="build/smp_scaling",  help="Output directory (one build directory per core count).")
+    args, sim_args = parser.parse_known_args()
+
+    cpu_counts = [int(n) for n in args.cpu_counts.split(",")]
+    os.makedirs(args.scaling_dir, exist_ok=True)
+    with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+        runs = list(executor.map(lambda n: run_cpu_count(n, args, sim_args), cpu_counts))
+
+    # Speedup/efficiency vs the first core count.
+    metrics   = ["dhrystone_per_second", "stream_copy_mbps", "stream_triad_mbps", "packets_per_second"]
+    reference = runs[0]
+    for r in runs:
+        r["speedup"]    = {}
+        r["efficiency"] = {}
+        for m in metrics:
+            if r[m] is None or not reference[m]:
+                continue
+            r["speedup"][m]    = r[m]/reference[m]
+            r["efficiency"][m] = r["speedup"][m]*reference["cpu_count"]/r["cpu_count"]
+
+    # Report.
+    with open(os.path.join(args.scaling_dir, "smp_scaling.json"), "w") as f:
+        json.dump(runs, f, indent=4)
+    print("{:22s} {:>5s} {:>14s} {:>8s} {:>10s}".format("Metric", "CPUs", "Value", "Speedup", "Efficiency"))
+    for m in metrics:
+        for r in runs:
+            if r[m] is None:
+                print("{:22s} {:5d} {:>14s}   (status {})".format(m, r["cpu_count"], "-", r["status"]))
+                continue
+            print("{:22s} {:5d} {:14.1f} {:8.2f} {:9.1f}%".format(m, r["cpu_count"], r[m],
+                r["speedup"].get(m, 0), 100*r["efficiency"].get(m, 0)))
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,8 @@ from this import s
 from migen import *
 
 from litex.soc.interconnect.csr import *
+from litex.soc.interconnect import stream
+from litex.soc.integration.soc import SoCRegion
 
 from litex.soc.cores.cpu.vexriscv_smp import VexRiscvSMP
 from litex.soc.cores.gpio import GPIOOut, GPIOIn
@@ -27,6 +29,13 @@ from litex.tools.litex_json2dts_linux import generate_dts
 
 from test_core_final.wb_send import RTLsend
 from test_core_final.wb_receive import RTLreceive
+from test_core_final.udp import TestCoreUDP
+from test_core_final.packet import PacketLayout
+
+from monitor.perf import PerfCounters, perf_taps, perf_dts
+from monitor.busmon import BusMonitor, busmon_taps
+
+from boot_layout import initrd_region
 
 
 # SoCLinux -----------------------------------------------------------------------------------------
@@ -130,25 +139,33 @@ def SoCLinux(soc_cls, **kwargs):
             self.add_constant("REMOTEIP4", int(remote_ip[3]))
 
         # DTS generation ---------------------------------------------------------------------------
-        def generate_dts(self, board_name):
-            json_src = os.path.join("build", board_name, "csr.json")
-            dts = os.path.join("build", board_name, "{}.dts".format(board_name))
+        def generate_dts(self, board_name, build_dir=None, boot_json=os.path.join("images", "boot.json")):
+            build_dir = build_dir or os.path.join("build", board_name)
+            json_src = os.path.join(build_dir, "csr.json")
+            dts = os.path.join(build_dir, "{}.dts".format(board_name))
 
             with open(json_src) as json_file, open(dts, "w") as dts_file:
-                dts_content = generate_dts(json.load(json_file), polling=False)
+                csr_json    = json.load(json_file)
+                # Initramfs location/size from the boot images layout (see boot_layout.py).
+                initrd_start, initrd_size = initrd_region(boot_json, csr_json["memories"]["main_ram"]["base"])
+                dts_content = generate_dts(csr_json, initrd_start=initrd_start, initrd_size=initrd_size, polling=False)
                 dts_file.write(dts_content)
+                if hasattr(self, "perf"):
+                    dts_file.write(perf_dts(csr_json))
 
         # DTS compilation --------------------------------------------------------------------------
-        def compile_dts(self, board_name, symbols=False):
-            dts = os.path.join("build", board_name, "{}.dts".format(board_name))
-            dtb = os.path.join("build", board_name, "{}.dtb".format(board_name))
+        def compile_dts(self, board_name, symbols=False, build_dir=None):
+            build_dir = build_dir or os.path.join("build", board_name)
+            dts = os.path.join(build_dir, "{}.dts".format(board_name))
+            dtb = os.path.join(build_dir, "{}.dtb".format(board_name))
             subprocess.check_call(
                 "dtc {} -O dtb -o {} {}".format("-@" if symbols else "", dtb, dts), shell=True)
 
         # DTB combination --------------------------------------------------------------------------
-        def combine_dtb(self, board_name, overlays=""):
-            dtb_in = os.path.join("build", board_name, "{}.dtb".format(board_name))
-            dtb_out = os.path.join("images", "rv32.dtb")
+        def combine_dtb(self, board_name, overlays="", build_dir=None, dtb_out=None):
+            build_dir = build_dir or os.path.join("build", board_name)
+            dtb_in = os.path.join(build_dir, "{}.dtb".format(board_name))
+            dtb_out = dtb_out or os.path.join("images", "rv32.dtb")
             if overlays == "":
                 shutil.copyfile(dtb_in, dtb_out)
             else:
@@ -156,22 +173,74 @@ def SoCLinux(soc_cls, **kwargs):
                     "fdtoverlay -i {} -o {} {}".format(dtb_in, dtb_out, overlays), shell=True)
 
         # Documentation generation -----------------------------------------------------------------
-        def generate_doc(self, board_name):
+        def generate_doc(self, board_name, build_dir=None):
             from litex.soc.doc import generate_docs
-            doc_dir = os.path.join("build", board_name, "doc")
+            build_dir = build_dir or os.path.join("build", board_name)
+            doc_dir = os.path.join(build_dir, "doc")
             generate_docs(self, doc_dir)
             os.system("sphinx-build -M html {}/ {}/_build".format(doc_dir, doc_dir))
 
 
-        def add_test_core(self):
-            self.submodules.send_core = RTLsend(self.platform)
-            self.submodules.recv_core = RTLreceive(self.platform)
+        # Performance Counters ---------------------------------------------------------------------
+        def add_perf_counters(self):
+            # Taps the masters present when called: add after the other bus masters.
+            self.submodules.perf = PerfCounters(perf_taps(self))
+            self.add_csr("perf")
+
+        # Bus Monitor ------------------------------------------------------------------------------
+        def add_bus_monitor(self, window=int(1e6)):
+            # Taps the masters (and their slaves) present when called: add after the other bus masters.
+            masters, regions = busmon_taps(self)
+            self.submodules.busmon = BusMonitor(masters, regions, window=window)
+            self.add_csr("busmon")
+
+        # Test Core --------------------------------------------------------------------------------
+        def add_test_core(self, with_wishbone=False, fifo_depth=16, link_fifo_depth=0, layout=None,
+            udp_ip_address=None, udp_port=2000, udp_packets_per_datagram=64, udp_idle_timeout=1024):
+            # Packet layout: Verilog parameters, exported as constants for the host tools.
+            layout = layout or PacketLayout.from_verilog()
+            self.submodules.send_core = RTLsend(self.platform, with_wishbone=with_wishbone, fifo_depth=fifo_depth, layout=layout)
+            self.submodules.recv_core = RTLreceive(self.platform, with_wishbone=with_wishbone, fifo_depth=fifo_depth, layout=layout)
             self.add_csr("send_core")
             self.add_csr("recv_core")
-            self.comb += self.recv_core.packet_out.eq(self.send_core.packet_out)
-            self.comb += self.recv_core.packet_out_valid.eq(self.send_core.packet_out_valid)
-            #self.recv_core.RTLreceive.packet_out.eq(self.send_core.RLTsend.packet_out)
-            #self.recv_core.RTLreceive.packet_out_valid.eq(self.send_core.RLTsend.packet_out_valid)
+            for name, value in layout.constants().items():
+                self.add_constant(name, value)
+
+            # Packet link over UDP: packets are sent to/received from udp_ip_address:udp_port by
+            # the LiteEth hardware UDP/IP stack (requires the Etherbone Ethernet core).
+            if udp_ip_address is not None:
+                ethcore = None
+                for name in ["ethcore", "etherbone_ethcore", "ethcore_etherbone"]:
+                    ethcore = getattr(self, name, None)
+                    if ethcore is not None:
+                        break
+                if ethcore is None:
+                    raise ValueError("Test core UDP link requires an Ethernet UDP/IP core (Etherbone).")
+                self.submodules.test_core_udp = TestCoreUDP(ethcore.udp,
+                    ip_address           = udp_ip_address,
+                    udp_port             = udp_port,
+                    packets_per_datagram = udp_packets_per_datagram,
+                    idle_timeout         = udp_idle_timeout)
+                self.comb += [
+                    self.send_core.source.connect(self.test_core_udp.sink),
+                    self.test_core_udp.source.connect(self.recv_core.sink),
+                ]
+
+            # Local packet link (valid/ready stream), optionally buffered.
+            else:
+                self.submodules.test_core_link = stream.SyncFIFO([("data", 32)], link_fifo_depth)
+                self.comb += [
+                    self.send_core.source.connect(self.test_core_link.sink),
+                    self.test_core_link.source.connect(self.recv_core.sink),
+                ]
+
+            # Expose packet data ports as uncached Wishbone windows (control/status stay in CSRs).
+            if with_wishbone:
+                for name in ["send_core", "recv_core"]:
+                    self.bus.add_slave(name, getattr(self, name).bus, SoCRegion(
+                        origin = self.mem_map.get(name, None),
+                        size   = 0x1000,
+                        cached = False))
 
 
     return _SoCLinux(**kwargs)
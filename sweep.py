@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+
+#
+# This file is part of Linux-on-LiteX-VexRiscv
+#
+# Copyright (c) 2019-2022, Linux-on-LiteX-VexRiscv Developers
+# SPDX-License-Identifier: BSD-2-Clause
+
+import os
+import re
+import sys
+import csv
+import json
+import time
+import argparse
+import itertools
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_parse import parse
+
+# Design-Space Sweep -------------------------------------------------------------------------------
+#
+# Builds the simulation for each combination of the swept sim.py options (CPU count, L1 cache
+# sizes/ways, Wishbone memory/L2, RAM model...), in parallel (one build directory per variant),
+# boots each variant in headless mode, runs the benchmark set and reports a results table.
+#
+# Swept options are given as --sweep option=value1,value2 (sim.py option without the leading
+# dashes, 0/1 values for flags), e.g.:
+#   ./sweep.py --sweep cpu-count=1,2 --sweep dcache-size=4096,8192 --sweep with-wishbone-memory=0,1
+
+# Benchmarks: name -> command (outputs parsed with bench_parse.py, packages to enable in the image).
+benchmarks = {
+    "dhrystone" : "dhrystone-opt 20000",
+    "stream"    : "membench-stream -n 65536 -t 4",
+    "memcpy"    : "membench-memcpy -s 262144 -t 0.05",
+    "openssl"   : "openssl-bench 1 aes-128-cbc",
+}
+
+flags = ["with-wishbone-memory", "with-coherent-dma", "without-out-of-order-decoder", "with-fpu", "with-rvc",
+    "with-perf-counters", "with-bus-monitor"]
+
+def variants(sweeps):
+    names  = [name for name, _ in sweeps]
+    values = [values for _, values in sweeps]
+    for combination in itertools.product(*values):
+        yield dict(zip(names, combination))
+
+def variant_args(variant):
+    args = []
+    for name, value in variant.items():
+        if name in flags:
+            if int(value):
+                args.append("--" + name)
+        else:
+            args += ["--" + name, value]
+    return args
+
+def variant_id(variant):
+    return "_".join("{}{}".format(re.sub("[^a-z0-9]", "", name), value) for name, value in variant.items()) or "default"
+
+def run_headless(build_dir, workload, timeout, sim_args):
+    """Build/run a headless simulation in build_dir, return (status, wall time, headless results)."""
+    results = os.path.join(build_dir, "headless.json")
+    os.makedirs(build_dir, exist_ok=True)
+    if os.path.exists(results):
+        os.remove(results)
+    start = time.time()
+    with open(os.path.join(build_dir, "headless.log"), "wb") as log:
+        status = subprocess.call([sys.executable, "sim.py",
+            "--build-dir",        build_dir,
+            "--headless",         workload,
+            "--headless-results", results,
+            "--headless-timeout", str(timeout)] + sim_args,
+            stdin  = subprocess.DEVNULL,
+            stdout = log,
+            stderr = subprocess.STDOUT)
+    headless = None
+    if os.path.exists(results):
+        with open(results) as f:
+            headless = json.load(f)
+    return status, time.time() - start, headless
+
+def run_variant(variant, selected, sweep_dir, timeout, sim_args):
+    build_dir = os.path.join(sweep_dir, variant_id(variant))
+    workload  = "; ".join(benchmarks[name] for name in selected)
+    status, wall_time, headless = run_headless(build_dir, workload, timeout, variant_args(variant) + sim_args)
+    r = dict(variant)
+    r["status"]    = status
+    r["wall_time"] = wall_time
+    if headless is not None:
+        r["boot_cycles"]     = headless["boot_cycles"]
+        r["workload_cycles"] = headless["cycles"]
+        for b in parse("\n".join(headless["output"])):
+            key = "_".join([b["benchmark"], b["metric"]] + [str(v) for k, v in b["params"].items()
+                if k in ["block_size", "size"]])
+            r[key] = b["value"]
+    return r
+
+def main():
+    parser = argparse.ArgumentParser(description="Linux on LiteX-VexRiscv design-space sweep (simulation).")
+    parser.add_argument("--sweep",      action="append", default=[],  help="Swept sim.py option: option=value1,value2,...")
+    parser.add_argument("--benchmarks", default="dhrystone",          help="Benchmarks to run: {}.".format(", ".join(benchmarks)))
+    parser.add_argument("--jobs",       default=max(1, (os.cpu_count() or 1)//4), type=int, help="Variants built/simulated in parallel.")
+    parser.add_argument("--timeout",    default=int(50e9), type=int,  help="Headless timeout per variant (sys_clk cycles).")
+    parser.add_argument("--sweep-dir",  default="build/sweep",        help="Sweep directory (one build directory per variant).")
+    args, sim_args = parser.parse_known_args()
+
+    sweeps = []
+    for sweep in args.sweep:
+        name, _, values = sweep.partition("=")
+        sweeps.append((name.lstrip("-"), values.split(",")))
+    selected = args.benchmarks.split(",")
+    for name in selected:
+        if name not in benchmarks:
+            parser.error("Unknown benchmark: {}.".format(name))
+
+    # Run the variants.
+    os.makedirs(args.sweep_dir, exist_ok=True)
+    with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+        futures = [executor.submit(run_variant, v, selected, args.sweep_dir, args.timeout, sim_args)
+            for v in variants(sweeps)]
+        results = []
+        for future in futures:
+            results.append(future.result())
+            r = results[-1]
+            print("[{}] status={} ({:.0f}s)".format(variant_id({k: r[k] for k, _ in sweeps}), r["status"], r["wall_time"]))
+
+    # Report.
+    with open(os.path.join(args.sweep_dir, "results.json"), "w") as f:
+        json.dump(results, f, indent=4)
+    columns = []
+    for r in results:
+        columns += [k for k in r if k not in columns]
+    with open(os.path.join(args.sweep_dir, "results.csv"), "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(results)
+    widths = [max(len(c), *(len("{}".format(r.get(c, ""))) for r in results)) for c in columns]
+    print(" ".join(c.rjust(w) for c, w in zip(columns, widths)))
+    for r in results:
+        print(" ".join("{}".format(r.get(c, "")).rjust(w) for c, w in zip(columns, widths)))
+
+if __name__ == "__main__":
+    main()
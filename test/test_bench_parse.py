@@ -0,0 +1,112 @@
+#
+# This file is part of Linux-on-LiteX-VexRiscv
+#
+# Copyright (c) 2019-2022, Linux-on-LiteX-VexRiscv Developers
+# SPDX-License-Identifier: BSD-2-Clause
+
+import unittest
+
+from bench_parse import parse
+
+DHRYSTONE = """
+Execution starts, 100000 runs through Dhrystone
+Execution ends
+Microseconds for one run through Dhrystone:    10.0 \r
+Dhrystones per Second:                     100000.0 \r
+"""
+
+COREMARK = """
+2K performance run parameters for coremark.
+CoreMark Size    : 666
+Total ticks      : 12000
+Total time (secs): 12.000000
+Iterations/Sec   : 25.000000
+Iterations       : 300
+Compiler version : GCC10.3.0
+Correct operation validated. See README.md for run and reporting rules.
+CoreMark 1.0 : 25.000000 / GCC10.3.0 -O3 / Heap
+CoreMark Size    : 666
+Total time (secs): 2.000000
+Iterations/Sec   : 25.000000
+Iterations       : 50
+ERROR! Must execute for at least 10 secs for a valid result!
+"""
+
+STREAM = """
+STREAM-style memory bandwidth (32-bit words)
+Array size = 1048576 words (4096 KiB per array), Ntimes = 10
+Function    Best Rate MB/s  Avg time     Min time     Max time
+Copy:             80.5     0.104000     0.104200     0.105000
+Scale:            60.0     0.140000     0.139810     0.141000
+Add:              70.2     0.180000     0.179200     0.181000
+Triad:            65.1     0.194000     0.193300     0.195000
+Solution Validates
+"""
+
+MEMCPY = """
+Function    Size (B)    Rate MB/s
+memcpy            64        120.5
+memcpy          4096        150.0
+memset            64        200.0
+"""
+
+OPENSSL = """
+openssl-bench: vexriscv_aes=1
+OpenSSL 1.1.1q  5 Jul 2022
+Doing aes-128 cbc for 3s on 16 size blocks: 12345 aes-128 cbc's in 3.00s
+The 'numbers' are in 1000s of bytes per second processed.
+type             16 bytes     64 bytes    256 bytes   1024 bytes   8192 bytes  16384 bytes
+aes-128 cbc       1000.00k     2000.50k     3000.00k     3100.00k     3200.00k     3300.00k
+sha256             500.00k      900.00k     1200.00k     1300.00k     1350.00k     1360.00k
+#
+"""
+
+PACKET = """
+packet-bench: threads=4 packets=400000 time=2.000000 rate=200000.0 packets/s
+Solution Validates
+"""
+
+class TestBenchParse(unittest.TestCase):
+    def test_dhrystone(self):
+        results = parse(DHRYSTONE)
+        self.assertEqual([r["metric"] for r in results], ["dhrystones_per_second", "dmips"])
+        self.assertEqual(results[0]["value"], 100000.0)
+        self.assertAlmostEqual(results[1]["value"], 100000/1757)
+        self.assertEqual(results[0]["params"], {"runs": 100000})
+
+    def test_coremark(self):
+        results = parse(COREMARK)
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0]["value"], 25.0)
+        self.assertEqual(results[0]["params"], {"iterations": 300, "time": 12.0, "valid": True})
+        self.assertFalse(results[1]["params"]["valid"])
+
+    def test_stream(self):
+        results = parse(STREAM)
+        self.assertEqual([r["metric"] for r in results], ["copy", "scale", "add", "triad"])
+        self.assertEqual(results[3]["value"], 65.1)
+        self.assertEqual(results[3]["params"], {"words": 1048576})
+
+    def test_memcpy(self):
+        results = parse(MEMCPY)
+        self.assertEqual([(r["metric"], r["params"]["size"], r["value"]) for r in results],
+            [("memcpy", 64, 120.5), ("memcpy", 4096, 150.0), ("memset", 64, 200.0)])
+
+    def test_openssl(self):
+        results = parse(OPENSSL)
+        self.assertEqual(len(results), 12)
+        self.assertEqual(results[1]["metric"], "aes-128-cbc")
+        self.assertEqual(results[1]["value"],  2000.5)
+        self.assertEqual(results[1]["params"], {"block_size": 64, "vexriscv_aes": True})
+        self.assertEqual(results[6]["metric"], "sha256")
+
+    def test_packet(self):
+        results = parse(PACKET)
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]["value"],  200000.0)
+        self.assertEqual(results[0]["params"], {"threads": 4, "packets": 400000})
+
+    def test_schema(self):
+        for r in parse(DHRYSTONE + COREMARK + STREAM + MEMCPY + OPENSSL + PACKET):
+            self.assertEqual(sorted(r.keys()), ["benchmark", "metric", "params", "unit", "value"])
+            self.assertIsInstance(r["value"], float)
@@ -0,0 +1,86 @@
+#
+# This file is part of Linux-on-LiteX-VexRiscv
+#
+# Copyright (c) 2019-2022, Linux-on-LiteX-VexRiscv Developers
+# SPDX-License-Identifier: BSD-2-Clause
+
+import os
+import json
+import struct
+import tempfile
+import unittest
+
+from boot_layout import image_footprint, napot_size, compute_layout, free_memory, initrd_region, PREBUILT_FIXED, KiB, MiB
+
+class TestBootLayout(unittest.TestCase):
+    def test_image_footprint(self):
+        with tempfile.TemporaryDirectory() as d:
+            # RISC-V Image header: image_size at offset 16, magic at offset 48.
+            kernel = os.path.join(d, "Image")
+            header = bytearray(64)
+            struct.pack_into("<Q", header, 16, 8*MiB)
+            header[48:56] = b"RISCV\x00\x00\x00"
+            with open(kernel, "wb") as f:
+                f.write(header + bytes(1000))
+            self.assertEqual(image_footprint(kernel), 8*MiB)
+            # Other files: file size.
+            rootfs = os.path.join(d, "rootfs.cpio")
+            with open(rootfs, "wb") as f:
+                f.write(bytes(1000))
+            self.assertEqual(image_footprint(rootfs), 1000)
+
+    def test_prebuilt_layout(self):
+        sizes  = {"Image": 7*MiB, "rv32.dtb": 4*KiB, "rootfs.cpio": 5*MiB, "opensbi.bin": 512*KiB}
+        layout = compute_layout(sizes, 128*MiB, fixed=PREBUILT_FIXED, alignments={"Image": 4*MiB})
+        self.assertEqual(list(layout), list(sizes))
+        self.assertEqual(layout["Image"],       (0,        7*MiB))
+        self.assertEqual(layout["rv32.dtb"],    (0xef0000, 4*KiB))
+        self.assertEqual(layout["opensbi.bin"], (0xf00000, 512*KiB))
+        self.assertEqual(layout["rootfs.cpio"], (7*MiB,    5*MiB))
+
+    def test_kernel_overlap(self):
+        sizes = {"Image": 16*MiB, "rv32.dtb": 4*KiB, "opensbi.bin": 512*KiB}
+        with self.assertRaises(ValueError):
+            compute_layout(sizes, 128*MiB, fixed=PREBUILT_FIXED)
+
+    def test_tight_layout(self):
+        sizes  = {"Image": 7*MiB + 100, "rv32.dtb": 3000, "rootfs.cpio": 5*MiB, "opensbi.bin": 512*KiB}
+        layout = compute_layout(sizes, 32*MiB)
+        self.assertEqual(layout["rv32.dtb"][0],    7*MiB + 4*KiB)
+        self.assertEqual(layout["rootfs.cpio"][0], 7*MiB + 8*KiB)
+        # OpenSBI aligned on its PMP region.
+        self.assertEqual(layout["opensbi.bin"][0], 12*MiB + 512*KiB)
+        free, largest = free_memory(layout, 32*MiB)
+        self.assertEqual(free, 32*MiB - sum(sizes.values()))
+        self.assertEqual(largest, (13*MiB, 19*MiB))
+
+    def test_opensbi_pmp_region(self):
+        self.assertEqual(napot_size(512*KiB),     512*KiB)
+        self.assertEqual(napot_size(512*KiB + 1), 1*MiB)
+        for opensbi in [100*KiB, 512*KiB, 600*KiB]:
+            # Packed right after the rootfs, OpenSBI would share its PMP region with the rootfs tail.
+            sizes  = {"Image": 12*MiB, "rv32.dtb": 3000, "rootfs.cpio": 0x104d, "opensbi.bin": opensbi}
+            layout = compute_layout(sizes, 32*MiB, alignments={"Image": 4*MiB})
+            offset, size = layout["opensbi.bin"]
+            self.assertGreaterEqual(size, max(opensbi, 512*KiB))
+            self.assertEqual(size, napot_size(size))
+            self.assertEqual(offset % size, 0)
+            for name, (o, s) in layout.items():
+                if name != "opensbi.bin":
+                    self.assertFalse(o < offset + size and offset < o + s, name)
+        # Fixed OpenSBI address not aligned on its region.
+        with self.assertRaises(ValueError):
+            compute_layout({"Image": 7*MiB, "opensbi.bin": 512*KiB}, 32*MiB, fixed={"opensbi.bin": 0xc03000})
+
+    def test_too_large(self):
+        with self.assertRaises(ValueError):
+            compute_layout({"Image": 7*MiB, "rootfs.cpio": 30*MiB}, 32*MiB)
+
+    def test_initrd_region(self):
+        with tempfile.TemporaryDirectory() as d:
+            with open(os.path.join(d, "rootfs.cpio.lz4"), "wb") as f:
+                f.write(bytes(1234))
+            with open(os.path.join(d, "boot.json"), "w") as f:
+                json.dump({"Image": "0x40000000", "rootfs.cpio.lz4": "0x41000000"}, f)
+            self.assertEqual(initrd_region(os.path.join(d, "boot.json"), 0x40000000), (0x1000000, 1234))
+            self.assertEqual(initrd_region(os.path.join(d, "missing.json"), 0x40000000), (None, None))
@@ -0,0 +1,74 @@
+#
+# This file is part of Linux-on-LiteX-VexRiscv
+#
+# Copyright (c) 2019-2022, Linux-on-LiteX-VexRiscv Developers
+# SPDX-License-Identifier: BSD-2-Clause
+
+import os
+import json
+import zlib
+import struct
+import tempfile
+import unittest
+
+from boot_pack import pack_table, patch_stub, pack_images
+from boot_pack import PACK_MAGIC, PACK_TABLE_OFFSET, PACK_TABLE_SIZE, PACK_STORE
+
+def stub_binary():
+    return b"\x6f\x00\x00\x00" + bytes(12) + PACK_MAGIC + bytes(PACK_TABLE_SIZE - 4) + b"code"
+
+class TestBootPack(unittest.TestCase):
+    def test_pack_table(self):
+        entries = [{"name": "Image", "method": PACK_STORE, "src": 0x40000000, "src_size": 100,
+            "dst": 0x40000000, "dst_size": 100, "crc32": 0x12345678}]
+        table = pack_table(entries, 0x40f00000, 0x40ef0000, 0xf0001000, 0xf0001004)
+        self.assertEqual(len(table), PACK_TABLE_SIZE)
+        self.assertEqual(struct.unpack_from("<4s7I", table),
+            (PACK_MAGIC, 1, 1, 0x40f00000, 0x40ef0000, 0xf0001000, 0xf0001004, 0))
+        self.assertEqual(struct.unpack_from("<16s6I", table, 32),
+            (b"Image" + bytes(11), PACK_STORE, 0x40000000, 100, 0x40000000, 100, 0x12345678))
+
+    def test_patch_stub(self):
+        stub  = stub_binary()
+        table = pack_table([], 0x40f00000)
+        patched = patch_stub(stub, table)
+        self.assertEqual(len(patched), len(stub))
+        self.assertEqual(patched[PACK_TABLE_OFFSET:PACK_TABLE_OFFSET + PACK_TABLE_SIZE], table)
+        self.assertEqual(patched[-4:], b"code")
+        with self.assertRaises(ValueError):
+            patch_stub(bytes(len(stub)), table)
+
+    def test_pack_images(self):
+        with tempfile.TemporaryDirectory() as d:
+            images_dir = os.path.join(d, "images")
+            output_dir = os.path.join(d, "packed")
+            os.makedirs(images_dir)
+            for name, size in [("Image", 4096), ("rootfs.cpio.lz4", 2048), ("opensbi.bin", 1024)]:
+                with open(os.path.join(images_dir, name), "wb") as f:
+                    f.write(bytes(range(256))*(size//256))
+            with open(os.path.join(d, "unpack.bin"), "wb") as f:
+                f.write(stub_binary())
+            images = {
+                "Image":           "0x40000000",
+                "rv32.dtb":        "0x40ef0000",
+                "rootfs.cpio.lz4": "0x41000000",
+                "opensbi.bin":     "0x40f00000",
+            }
+            boot = pack_images(images, images_dir, output_dir, 0x40000000, 32*1024*1024,
+                os.path.join(d, "unpack.bin"), kernel_compression="none")
+
+            # Images kept at their boot addresses, stub booted (after the kernel).
+            self.assertEqual(list(boot), list(images) + ["unpack.bin"])
+            self.assertEqual(boot["unpack.bin"], "0x40001000")
+            with open(os.path.join(output_dir, "boot.json")) as f:
+                self.assertEqual(json.load(f), boot)
+
+            # Pack table: entry/DTB, checked images (not the DTB).
+            with open(os.path.join(output_dir, "unpack.bin"), "rb") as f:
+                table = f.read()[PACK_TABLE_OFFSET:]
+            magic, version, count, entry, fdt = struct.unpack_from("<4s4I", table)
+            self.assertEqual((count, entry, fdt), (3, 0x40f00000, 0x40ef0000))
+            name, method, src, src_size, dst, dst_size, crc = struct.unpack_from("<16s6I", table, 32 + 40)
+            self.assertEqual(name.rstrip(b"\x00"), b"rootfs.cpio.lz4")
+            self.assertEqual((method, src, src_size, dst, dst_size), (PACK_STORE, 0x41000000, 2048, 0x41000000, 2048))
+            self.assertEqual(crc, zlib.crc32(bytes(range(256))*8))
@@ -0,0 +1,161 @@
+#
+# This file is part of Linux-on-LiteX-VexRiscv
+#
+# Copyright (c) 2019-2022, Linux-on-LiteX-VexRiscv Developers
+# SPDX-License-Identifier: BSD-2-Clause
+
+import os
+import json
+import tempfile
+import unittest
+
+from build_metrics import collect, compare, save, load_records
+
+NEXTPNR_REPORT = {
+    "utilization": {
+        "TRELLIS_COMB": {"used": 20000, "available": 83640},
+        "TRELLIS_FF":   {"used": 12000, "available": 83640},
+        "DP16KD":       {"used": 50,    "available": 208},
+        "MULT18X18D":   {"used": 4,     "available": 156},
+    },
+    "fmax": {
+        "$glbnet$crg_clkout": {"achieved": 62.5, "constraint": 50.0},
+    },
+}
+
+VIVADO_UTILIZATION = """
++----------------------------+-------+-------+------------+-----------+-------+
+|          Site Type         |  Used | Fixed | Prohibited | Available | Util% |
++----------------------------+-------+-------+------------+-----------+-------+
+| Slice LUTs                 | 12345 |     0 |          0 |     63400 | 19.47 |
+|   LUT as Logic             | 11000 |     0 |          0 |     63400 | 17.35 |
+| Slice Registers            |  9000 |     0 |          0 |    126800 |  7.10 |
+| Block RAM Tile             |  20.5 |     0 |          0 |       135 | 15.19 |
+| DSPs                       |     4 |     0 |          0 |       240 |  1.67 |
++----------------------------+-------+-------+------------+-----------+-------+
+"""
+
+VIVADO_TIMING = """
+------------------------------------------------------------------------------------------------
+| Design Timing Summary
+| ---------------------
+------------------------------------------------------------------------------------------------
+
+    WNS(ns)      TNS(ns)  TNS Failing Endpoints  TNS Total Endpoints      WHS(ns)
+    -------      -------  ---------------------  -------------------      -------
+      0.500        0.000                      0                12345        0.050
+
+
+------------------------------------------------------------------------------------------------
+| Clock Summary
+| -------------
+------------------------------------------------------------------------------------------------
+
+Clock             Waveform(ns)         Period(ns)      Frequency(MHz)
+-----             ------------         ----------      --------------
+clk100            {0.000 5.000}        10.000          100.000
+  main_clkout0    {0.000 5.000}        10.000          100.000
+
+
+------------------------------------------------------------------------------------------------
+| Intra Clock Table
+| -----------------
+------------------------------------------------------------------------------------------------
+
+Clock             WNS(ns)      TNS(ns)  TNS Failing Endpoints  TNS Total Endpoints
+-----             -------      -------  ---------------------  -------------------
+clk100              6.000        0.000                      0                   10
+  main_clkout0      0.500        0.000                      0                12335
+"""
+
+QUARTUS_FIT = """
+Fitter Status : Successful - Mon Jan  1 00:00:00 2022
+Total logic elements : 5,430 / 22,320 ( 24 % )
+Total registers : 3210
+Total memory bits : 100,000 / 608,256 ( 16 % )
+Embedded Multiplier 9-bit elements : 4 / 132 ( 3 % )
+"""
+
+QUARTUS_STA = """
++-------------------------------------------------+
+; Slow 1200mV 85C Model Fmax Summary              ;
++------------+-----------------+------------+------+
+; Fmax       ; Restricted Fmax ; Clock Name ; Note ;
++------------+-----------------+------------+------+
+; 85.03 MHz  ; 85.03 MHz       ; clk50      ;      ;
++------------+-----------------+------------+------+
+; Slow 1200mV 0C Model Fmax Summary               ;
+; 90.10 MHz  ; 90.10 MHz       ; clk50      ;      ;
+"""
+
+QUARTUS_STA_SUMMARY = """
+Type  : Slow 1200mV 85C Model Setup 'clk50'
+Slack : 3.239
+TNS   : 0.000
+
+Type  : Slow 1200mV 85C Model Hold 'clk50'
+Slack : -0.100
+TNS   : 0.000
+"""
+
+class TestBuildMetrics(unittest.TestCase):
+    def write(self, d, files):
+        for name, content in files.items():
+            with open(os.path.join(d, name), "w") as f:
+                f.write(content if isinstance(content, str) else json.dumps(content))
+
+    def test_nextpnr(self):
+        with tempfile.TemporaryDirectory() as d:
+            self.write(d, {"board_report.json": NEXTPNR_REPORT})
+            r = collect("board", d, "board", 50e6)
+            self.assertEqual(r["toolchain"], "nextpnr")
+            self.assertEqual(r["resources"]["lut"], {"used": 20000, "available": 83640})
+            self.assertEqual(r["resources"]["dsp"]["used"], 4)
+            self.assertEqual(r["timing"]["fmax"], {"$glbnet$crg_clkout": 62.5})
+            self.assertAlmostEqual(r["timing"]["wns"], 20.0 - 16.0)
+
+    def test_vivado(self):
+        with tempfile.TemporaryDirectory() as d:
+            self.write(d, {"board_utilization_place.rpt": VIVADO_UTILIZATION, "board_timing.rpt": VIVADO_TIMING})
+            r = collect("board", d, "board")
+            self.assertEqual(r["toolchain"], "vivado")
+            self.assertEqual({k: v["used"] for k, v in r["resources"].items()},
+                {"lut": 12345, "ff": 9000, "bram": 20.5, "dsp": 4})
+            self.assertEqual(r["resources"]["lut"]["available"], 63400)
+            self.assertAlmostEqual(r["timing"]["fmax"]["main_clkout0"], 1e3/9.5)
+            self.assertAlmostEqual(r["timing"]["fmax"]["clk100"], 250.0)
+            self.assertEqual(r["timing"]["wns"], 0.5)
+
+    def test_quartus(self):
+        with tempfile.TemporaryDirectory() as d:
+            self.write(d, {"board.fit.summary": QUARTUS_FIT, "board.sta.rpt": QUARTUS_STA,
+                "board.sta.summary": QUARTUS_STA_SUMMARY})
+            r = collect("board", d, "board")
+            self.assertEqual(r["toolchain"], "quartus")
+            self.assertEqual(r["resources"]["lut"], {"used": 5430, "available": 22320})
+            self.assertEqual(r["resources"]["ff"],  {"used": 3210, "available": None})
+            self.assertEqual(r["resources"]["dsp"]["used"], 4)
+            self.assertEqual(r["timing"]["fmax"], {"clk50": 85.03})
+            self.assertEqual(r["timing"]["wns"], 3.239)
+
+    def test_no_report(self):
+        with tempfile.TemporaryDirectory() as d:
+            self.assertIsNone(collect("board", d, "board"))
+
+    def test_compare(self):
+        with tempfile.TemporaryDirectory() as d:
+            self.write(d, {"board_report.json": NEXTPNR_REPORT})
+            a = collect("board", d, "board")
+            b = json.loads(json.dumps(a))
+            b["time"] = "9999"
+            b["resources"]["lut"]["used"] = 22000
+            b["timing"]["fmax"]["$glbnet$crg_clkout"] = 50.0
+            rows = {m: (va, vb, delta) for m, va, vb, delta in compare(a, b)}
+            self.assertEqual(rows["lut"], (20000, 22000, 10.0))
+            self.assertEqual(rows["fmax:$glbnet$crg_clkout"], (62.5, 50.0, -20.0))
+            self.assertEqual(rows["ff"][2], 0.0)
+
+            metrics_dir = os.path.join(d, "metrics")
+            save(b, metrics_dir)
+            save(a, metrics_dir)
+            self.assertEqual([r["time"] for r in load_records(metrics_dir)], [a["time"], "9999"])
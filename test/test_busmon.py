@@ -0,0 +1,148 @@
+#
+# This file is part of Linux-on-LiteX-VexRiscv
+#
+# Copyright (c) 2019-2022, Linux-on-LiteX-VexRiscv Developers
+# SPDX-License-Identifier: BSD-2-Clause
+
+import os
+import json
+import tempfile
+import unittest
+
+from migen import *
+
+from litex.soc.interconnect import wishbone
+from litex.soc.integration.soc import SoCRegion
+
+from monitor.busmon import BusMonitor
+from busmon import busmon_layout
+from csr_client import CSRClient
+
+def bus_monitor(window=64):
+    masters = {"cpu_bus0": wishbone.Interface(), "dma": wishbone.Interface()}
+    slaves  = {
+        "rom":      SoCRegion(origin=0x00000000, size=0x10000),
+        "main_ram": SoCRegion(origin=0x40000000, size=0x10000000),
+    }
+    return masters, BusMonitor(masters, {name: slaves for name in masters}, window=window)
+
+# Bus Monitor --------------------------------------------------------------------------------------
+
+class TestBusMonitor(unittest.TestCase):
+    def master(self, bus, accesses):
+        # accesses: (start cycle, byte address, latency), ack on the latency-th cycle.
+        cycle = 0
+        for start, adr, latency in accesses:
+            for i in range(start - cycle):
+                yield
+            yield bus.adr.eq(adr//4)
+            yield bus.cyc.eq(1)
+            yield bus.stb.eq(1)
+            for i in range(latency - 1):
+                yield
+            yield bus.ack.eq(1)
+            yield
+            yield bus.cyc.eq(0)
+            yield bus.stb.eq(0)
+            yield bus.ack.eq(0)
+            cycle = start + latency
+
+    def counters(self, dut):
+        counters = {}
+        for csr in dut.counters:
+            counters[csr.name] = (yield csr.status)
+        return counters
+
+    def test_window(self):
+        masters, dut = bus_monitor()
+        windows = []
+        def checker():
+            # Nothing latched during the first window.
+            for i in range(60):
+                yield
+            self.assertEqual((yield dut._windows.status), 0)
+            self.assertEqual(set((yield from self.counters(dut)).values()), {0})
+            while (yield dut._windows.status) == 0:
+                yield
+            windows.append((yield from self.counters(dut)))
+            # Latched values kept while the next window is accumulated.
+            for i in range(32):
+                yield
+            self.assertEqual((yield from self.counters(dut)), windows[0])
+            while (yield dut._windows.status) == 1:
+                yield
+            windows.append((yield from self.counters(dut)))
+        top = Module()
+        top.clock_domains.cd_sys = ClockDomain()
+        top.submodules.dut = dut
+        run_simulation(top, [
+            # cpu_bus0: rom access (3 cycles), then main_ram access (2 cycles) concurrent with dma.
+            self.master(masters["cpu_bus0"], [(4, 0x00000100, 3), (20, 0x40000000, 2)]),
+            # dma: main_ram access (4 cycles), then one in the second window.
+            self.master(masters["dma"],      [(20, 0x40001000, 4), (70, 0x00000000, 1)]),
+            checker(),
+        ])
+        first, second = windows
+        self.assertEqual(first["cpu_bus0_transactions"], 2)
+        self.assertEqual(first["cpu_bus0_busy"],         5)
+        self.assertEqual(first["cpu_bus0_wait"],         3)
+        self.assertEqual(first["cpu_bus0_contention"],   2)
+        self.assertEqual(first["cpu_bus0_latency_max"],  3)
+        self.assertEqual(first["dma_transactions"],      1)
+        self.assertEqual(first["dma_busy"],              4)
+        self.assertEqual(first["dma_wait"],              3)
+        self.assertEqual(first["dma_contention"],        2)
+        self.assertEqual(first["dma_latency_max"],       4)
+        # Master/slave pairs (slave decoded from the master address).
+        self.assertEqual(first["cpu_bus0_to_rom_transactions"],      1)
+        self.assertEqual(first["cpu_bus0_to_rom_wait"],              2)
+        self.assertEqual(first["cpu_bus0_to_main_ram_transactions"], 1)
+        self.assertEqual(first["cpu_bus0_to_main_ram_wait"],         1)
+        self.assertEqual(first["dma_to_main_ram_transactions"],      1)
+        self.assertEqual(first["dma_to_main_ram_wait"],              3)
+        self.assertEqual(first["dma_to_rom_transactions"],           0)
+        # Second window: counters restarted.
+        self.assertEqual(second["cpu_bus0_transactions"], 0)
+        self.assertEqual(second["dma_transactions"],      1)
+        self.assertEqual(second["dma_latency_max"],       1)
+        self.assertEqual(second["dma_contention"],        0)
+        self.assertEqual(second["dma_to_rom_transactions"], 1)
+
+    def test_disable(self):
+        masters, dut = bus_monitor(window=16)
+        def generator():
+            yield from dut._control.write(0)
+            for i in range(32):
+                yield
+            # Window stopped: no window completed.
+            self.assertEqual((yield dut._windows.status), 0)
+        top = Module()
+        top.clock_domains.cd_sys = ClockDomain()
+        top.submodules.dut = dut
+        run_simulation(top, generator())
+
+# Host Tool ----------------------------------------------------------------------------------------
+
+class TestBusmonLayout(unittest.TestCase):
+    def client(self, registers):
+        with tempfile.TemporaryDirectory() as d:
+            csr_json = os.path.join(d, "csr.json")
+            with open(csr_json, "w") as f:
+                json.dump({"csr_registers": {name: {"addr": 0xf0000000 + 4*i, "size": 1, "type": "ro"}
+                    for i, name in enumerate(registers)}}, f)
+            return CSRClient(None, csr_json)
+
+    def test_layout(self):
+        # Register names of the gateware CSRs.
+        _, dut = bus_monitor()
+        registers = ["busmon_" + csr.name for csr in dut.get_csrs()] + ["other_dma_latency_max"]
+        masters, pairs = busmon_layout(self.client(registers))
+        self.assertEqual(masters, ["cpu_bus0", "dma"])
+        self.assertEqual(sorted(pairs), [
+            ("cpu_bus0", "main_ram"),
+            ("cpu_bus0", "rom"),
+            ("dma", "main_ram"),
+            ("dma", "rom")])
+
+    def test_no_monitor(self):
+        self.assertEqual(busmon_layout(self.client(["ctrl_reset", "perf_cycles"])), ([], []))
@@ -0,0 +1,44 @@
+#
+# This file is part of Linux-on-LiteX-VexRiscv
+#
+# Copyright (c) 2019-2022, Linux-on-LiteX-VexRiscv Developers
+# SPDX-License-Identifier: BSD-2-Clause
+
+import unittest
+
+from fmax_search import bounds, search_points, search, config_id
+
+class TestFmaxSearch(unittest.TestCase):
+    def test_bounds(self):
+        self.assertEqual(bounds({40e6: True, 60e6: True, 80e6: False, 120e6: False}), (60e6, 80e6))
+        self.assertEqual(bounds({40e6: False, 120e6: False}), (None, 40e6))
+        self.assertEqual(bounds({40e6: True, 120e6: True}), (120e6, None))
+        # Non-monotonic results: highest pass.
+        self.assertEqual(bounds({40e6: True, 50e6: False, 60e6: True, 80e6: False}), (60e6, 80e6))
+
+    def test_search_points(self):
+        self.assertEqual(search_points(40e6, 120e6, 3, 1e6), [60e6, 80e6, 100e6])
+        self.assertEqual(search_points(40e6, 41e6, 3, 1e6), [])
+        self.assertEqual(search_points(40e6, 43e6, 4, 1e6), [41e6, 42e6])
+
+    def search(self, fmax, jobs):
+        rounds = []
+        def evaluate(freqs):
+            rounds.append(freqs)
+            return {f: f <= fmax for f in freqs}
+        return search(evaluate, 40e6, 120e6, jobs, 1e6), rounds
+
+    def test_search(self):
+        for jobs in [1, 2, 4, 8]:
+            result, rounds = self.search(73.4e6, jobs)
+            self.assertEqual(result, 73e6)
+        # More jobs, less rounds.
+        self.assertLess(len(self.search(73.4e6, 8)[1]), len(self.search(73.4e6, 1)[1]))
+
+    def test_search_limits(self):
+        self.assertEqual(self.search(200e6, 4), (120e6, [[40e6, 67e6, 93e6, 120e6]]))
+        self.assertEqual(self.search(10e6, 4)[0], None)
+
+    def test_config_id(self):
+        self.assertEqual(config_id([]), "default")
+        self.assertEqual(config_id(["--cpu-count=2", "--with-fpu"]), "cpu-count=2_with-fpu")
@@ -0,0 +1,72 @@
+#
+# This file is part of Linux-on-LiteX-VexRiscv
+#
+# Copyright (c) 2019-2022, Linux-on-LiteX-VexRiscv Developers
+# SPDX-License-Identifier: BSD-2-Clause
+
+import unittest
+
+import numpy as np
+
+from test_core_final.packet import PacketLayout
+
+class TestPacket(unittest.TestCase):
+    def test_layout_from_verilog(self):
+        layout = PacketLayout.from_verilog()
+        self.assertEqual(layout.slices, {
+            "dx"   : (21, 9),
+            "dy"   : (12, 9),
+            "axon" : (4,  8),
+            "tick" : (0,  4),
+        })
+        self.assertEqual(layout.mask, 0x3fffffff)
+
+    def test_encode(self):
+        layout  = PacketLayout()
+        packets = layout.encode(dx=-1, dy=1, axon=0xab, tick=[0, 15])
+        self.assertEqual(packets.dtype, np.uint32)
+        self.assertEqual(list(packets), [0x3fe01ab0, 0x3fe01abf])
+
+    def test_roundtrip(self):
+        layout  = PacketLayout()
+        packets = layout.random(10000, rng=0)
+        fields  = layout.decode(packets)
+        self.assertEqual(fields["dx"].min(), layout.field_range("dx")[0])
+        self.assertEqual(fields["dx"].max(), layout.field_range("dx")[1])
+        np.testing.assert_array_equal(layout.encode_array(fields), packets)
+        np.testing.assert_array_equal(layout.from_bytes(layout.to_bytes(packets)), packets)
+
+    def test_invalid_layout(self):
+        with self.assertRaises(ValueError):
+            PacketLayout(dy_msb=21)
+        # Packets are 32-bit words (RTL, CSRs, UDP).
+        with self.assertRaises(ValueError):
+            PacketLayout.from_string("packet_width=24")
+
+    def test_wide_fields(self):
+        # 18-bit axon field: not truncated by the decoded dtype.
+        layout = PacketLayout(dx_msb=31, dx_lsb=27, dy_msb=26, dy_lsb=22, num_axons=1 << 18)
+        self.assertEqual(layout.dtype["axon"], np.uint32)
+        self.assertEqual(layout.dtype["dx"],   np.int16)
+        fields = layout.decode(layout.encode(dx=-16, dy=15, axon=(1 << 18) - 1, tick=3))
+        self.assertEqual(int(fields["axon"]), (1 << 18) - 1)
+        self.assertEqual(int(fields["dx"]),   -16)
+        packets = layout.random(1000, rng=0)
+        np.testing.assert_array_equal(layout.encode_array(layout.decode(packets)), packets)
+
+    def test_layout_from_string(self):
+        layout = PacketLayout.from_string("num_axons=128,num_ticks=0x20")
+        self.assertEqual(layout.slices["axon"], (5, 7))
+        self.assertEqual(layout.slices["tick"], (0, 5))
+        self.assertEqual(layout.dx_msb, 29)
+        with self.assertRaises(ValueError):
+            PacketLayout.from_string("axons=512")
+
+    def test_layout_csr_json(self):
+        # SoC constants -> csr.json (lowercase names) -> host layout.
+        layout    = PacketLayout.from_string("num_ticks=32,dy_lsb=13")
+        constants = {k.lower(): v for k, v in layout.constants().items()}
+        self.assertEqual(constants["test_core_num_ticks"], 32)
+        self.assertEqual(PacketLayout.from_csr_json({"constants": constants}).slices, layout.slices)
+        # SoCs built without the constants: Verilog parameters.
+        self.assertEqual(PacketLayout.from_csr_json({"constants": {}}).slices, PacketLayout.from_verilog().slices)
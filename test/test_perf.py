@@ -0,0 +1,179 @@
+#
+# This file is part of Linux-on-LiteX-VexRiscv
+#
+# Copyright (c) 2019-2022, Linux-on-LiteX-VexRiscv Developers
+# SPDX-License-Identifier: BSD-2-Clause
+
+import re
+import unittest
+
+from migen import *
+
+from litex.soc.interconnect import wishbone
+
+from litedram.common import LiteDRAMNativePort
+
+from monitor.perf import PerfCounters, perf_dts
+
+# Performance Counters -----------------------------------------------------------------------------
+
+class TestPerfCounters(unittest.TestCase):
+    def run_dut(self, generator):
+        self.bus = wishbone.Interface()
+        self.dut = dut = PerfCounters({"cpu": self.bus, "dma": wishbone.Interface()})
+        top = Module()
+        top.clock_domains.cd_sys = ClockDomain()
+        top.submodules.dut = dut
+        run_simulation(top, generator(dut))
+
+    def counters(self, dut):
+        counters = {}
+        for name, csr in zip(dut.events, dut.counters):
+            counters[name] = (yield csr.status)
+        return counters
+
+    def access(self, latency):
+        # One access acked after latency cycles.
+        yield self.bus.cyc.eq(1)
+        yield self.bus.stb.eq(1)
+        for i in range(latency - 1):
+            yield
+        yield self.bus.ack.eq(1)
+        yield
+        yield self.bus.cyc.eq(0)
+        yield self.bus.stb.eq(0)
+        yield self.bus.ack.eq(0)
+
+    def test_events(self):
+        def generator(dut):
+            self.assertEqual(dut.events, [
+                "cycles",
+                "cpu_transactions", "cpu_busy", "cpu_wait",
+                "dma_transactions", "dma_busy", "dma_wait"])
+            yield from dut._reset.write(1)
+            yield from self.access(3)
+            yield from self.access(1)
+            yield from dut._snapshot.write(1)
+            yield
+            counters = yield from self.counters(dut)
+            self.assertEqual(counters["cpu_transactions"], 2)
+            self.assertEqual(counters["cpu_busy"],         4)
+            self.assertEqual(counters["cpu_wait"],         2)
+            self.assertEqual(counters["dma_transactions"], 0)
+            self.assertEqual(counters["dma_busy"],         0)
+        self.run_dut(generator)
+
+    def test_snapshot(self):
+        def generator(dut):
+            yield from dut._snapshot.write(1)
+            yield
+            first = yield from self.counters(dut)
+            # Latched values do not change until the next snapshot.
+            yield from self.access(2)
+            for i in range(10):
+                yield
+            self.assertEqual((yield from self.counters(dut)), first)
+            yield from dut._snapshot.write(1)
+            yield
+            second = yield from self.counters(dut)
+            # Snapshots 14 cycles apart (yield, access: 2 cycles, 10 cycles, snapshot write).
+            self.assertEqual(second["cycles"] - first["cycles"], 14)
+            self.assertEqual(second["cpu_transactions"] - first["cpu_transactions"], 1)
+        self.run_dut(generator)
+
+    def test_reset(self):
+        def generator(dut):
+            yield from self.access(4)
+            yield from dut._reset.write(1)
+            yield from dut._snapshot.write(1)
+            yield
+            counters = yield from self.counters(dut)
+            self.assertEqual(counters["cpu_transactions"], 0)
+            self.assertEqual(counters["cpu_busy"],         0)
+            # Snapshot the cycle following the reset: counting restarts from 0.
+            self.assertEqual(counters["cycles"], 0)
+            for i in range(9):
+                yield
+            yield from dut._snapshot.write(1)
+            yield
+            # Next snapshot 11 cycles later.
+            self.assertEqual((yield dut.counters[0].status), 11)
+        self.run_dut(generator)
+
+    def test_enable(self):
+        def generator(dut):
+            yield from dut._control.write(0)
+            yield from dut._reset.write(1)
+            yield from self.access(3)
+            for i in range(10):
+                yield
+            yield from dut._snapshot.write(1)
+            yield
+            self.assertEqual(set((yield from self.counters(dut)).values()), {0})
+            yield from dut._control.write(1)
+            yield from self.access(3)
+            yield from dut._snapshot.write(1)
+            yield
+            counters = yield from self.counters(dut)
+            self.assertEqual(counters["cpu_transactions"], 1)
+            self.assertEqual(counters["cpu_busy"],         3)
+        self.run_dut(generator)
+
+    def test_litedram_port(self):
+        # CPU direct memory bus: accepted commands.
+        port = LiteDRAMNativePort(mode="both", address_width=32, data_width=128)
+        dut  = PerfCounters({"cpu_mem0": port})
+        self.assertEqual(dut.events, ["cycles", "cpu_mem0_transactions", "cpu_mem0_busy", "cpu_mem0_wait"])
+        def generator():
+            yield port.cmd.valid.eq(1)
+            for ready in [0, 0, 1, 1]:
+                yield port.cmd.ready.eq(ready)
+                yield
+            yield port.cmd.valid.eq(0)
+            yield from dut._snapshot.write(1)
+            yield
+            counters = yield from self.counters(dut)
+            self.assertEqual(counters["cpu_mem0_transactions"], 2)
+            self.assertEqual(counters["cpu_mem0_busy"],         4)
+            self.assertEqual(counters["cpu_mem0_wait"],         2)
+        top = Module()
+        top.clock_domains.cd_sys = ClockDomain()
+        top.submodules.dut = dut
+        run_simulation(top, generator())
+
+# Device Tree --------------------------------------------------------------------------------------
+
+class TestPerfDTS(unittest.TestCase):
+    def csr_json(self, base=0xf0003000):
+        registers = {}
+        def add(name, offset, size):
+            registers["perf_" + name] = {"addr": base + offset, "size": size, "type": "rw"}
+        add("control",  0x00, 1)
+        add("reset",    0x04, 1)
+        add("snapshot", 0x08, 1)
+        # Counters listed out of address order.
+        add("cpu_busy",         0x14, 2)
+        add("cycles",           0x0c, 2)
+        add("cpu_transactions", 0x1c, 2)
+        registers["other_control"] = {"addr": base + 0x800, "size": 1, "type": "rw"}
+        return {
+            "csr_bases":     {"perf": base, "other": base + 0x800},
+            "csr_registers": registers,
+        }
+
+    def property(self, dts, name):
+        return re.search(r"\s{} = (.*);".format(re.escape(name)), dts).group(1)
+
+    def test_node(self):
+        dts = perf_dts(self.csr_json())
+        self.assertIn("perf@f0003000 {", dts)
+        self.assertEqual(self.property(dts, "compatible"), '"litex,perf-counters"')
+        # Registers span: up to the end of the last counter.
+        self.assertEqual(self.property(dts, "reg"), "<0xf0003000 0x24>")
+        self.assertEqual(self.property(dts, "litex,control-offset"),  "<0x0>")
+        self.assertEqual(self.property(dts, "litex,reset-offset"),    "<0x4>")
+        self.assertEqual(self.property(dts, "litex,snapshot-offset"), "<0x8>")
+        self.assertEqual(self.property(dts, "litex,counter-words"),   "<2>")
+        self.assertEqual(self.property(dts, "litex,counters"),
+            '"cycles", "cpu_busy", "cpu_transactions"')
+        self.assertEqual(self.property(dts, "litex,counter-offsets"), "<0xc 0x14 0x1c>")
@@ -0,0 +1,82 @@
+#
+# This file is part of Linux-on-LiteX-VexRiscv
+#
+# Copyright (c) 2019-2022, Linux-on-LiteX-VexRiscv Developers
+# SPDX-License-Identifier: BSD-2-Clause
+
+import os
+import json
+import tempfile
+import unittest
+
+from profiling import Profiler
+
+class Base:
+    def add_a(self):
+        return "a"
+
+    def add_b(self):
+        return self.add_a()
+
+class Derived(Base):
+    def add_a(self):
+        # Calls the base add_a: nested call of the same name, counted once.
+        return super().add_a() + "!"
+
+    def other(self):
+        return "other"
+
+class TestProfiling(unittest.TestCase):
+    def test_phases(self):
+        profiler = Profiler()
+        for i in range(2):
+            with profiler.phase("soc"):
+                pass
+        profiler.start("build")
+        profiler.start("dts")
+        profiler.stop()
+        phases = {p["name"]: p for p in profiler.summary()}
+        self.assertEqual(list(phases), ["soc", "build", "dts"])
+        self.assertEqual(phases["soc"]["count"], 2)
+        self.assertEqual(phases["build"]["count"], 1)
+        for p in phases.values():
+            self.assertGreaterEqual(p["wall"], 0)
+            self.assertGreater(p["peak_rss_kib"], 0)
+
+    def test_disabled(self):
+        profiler = Profiler(enabled=False)
+        profiler.instrument(Derived)
+        with profiler.phase("soc"):
+            profiler.start("build")
+        profiler.stop()
+        self.assertEqual(profiler.summary(), [])
+        self.assertFalse(hasattr(Derived.add_a, "_profiler"))
+
+    def test_instrument(self):
+        profiler = Profiler()
+        profiler.instrument(Derived)
+        try:
+            profiler.start("peripherals")
+            d = Derived()
+            self.assertEqual(d.add_a(), "a!")
+            self.assertEqual(d.add_b(), "a!")
+            self.assertEqual(d.other(), "other")
+            profiler.stop()
+        finally:
+            profiler.restore()
+        phases = {p["name"]: p["count"] for p in profiler.summary()}
+        self.assertEqual(phases, {"add_a": 2, "add_b": 1, "peripherals": 1})
+        self.assertFalse(hasattr(Derived.add_a, "_profiler"))
+        self.assertFalse(hasattr(Base.add_b, "_profiler"))
+
+    def test_save(self):
+        with tempfile.TemporaryDirectory() as d:
+            profiler = Profiler(cprofile_dir=os.path.join(d, "profile"))
+            profiler.start("soc")
+            profiler.start("soc")
+            profiler.save(os.path.join(d, "board", "profile.json"), board="board")
+            with open(os.path.join(d, "board", "profile.json")) as f:
+                profile = json.load(f)
+            self.assertEqual(profile["board"], "board")
+            self.assertEqual(profile["phases"][0]["count"], 2)
+            self.assertEqual(sorted(os.listdir(os.path.join(d, "profile"))), ["soc.prof", "soc1.prof"])
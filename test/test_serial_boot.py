@@ -0,0 +1,47 @@
+#
+# This file is part of Linux-on-LiteX-VexRiscv
+#
+# Copyright (c) 2019-2022, Linux-on-LiteX-VexRiscv Developers
+# SPDX-License-Identifier: BSD-2-Clause
+
+import zlib
+import unittest
+
+from serial_boot import tuning_word, delta, merge, load_frames, SFL_DATA_LENGTH
+
+class TestSerialBoot(unittest.TestCase):
+    def test_tuning_word(self):
+        self.assertEqual(tuning_word(115200, 100e6), int(115200/100e6*2**32))
+        self.assertEqual(tuning_word(50e6, 100e6), 2**31)
+
+    def test_delta(self):
+        base   = 0x40000000
+        image  = bytes(i & 0xff for i in range(64*1024))
+        target = bytearray(image)
+        target[5000]  ^= 0xff # Block 1 (4KiB).
+        target[40000] ^= 0xff # Block 9 (4KiB).
+        queries = []
+        def crc(address, length):
+            queries.append((address, length))
+            return zlib.crc32(bytes(target[address - base:address - base + length]))
+
+        blocks = delta(image, base, crc, block_size=64*1024, min_block_size=4096)
+        self.assertEqual([(a, len(d)) for a, d in blocks], [(base + 4096, 4096), (base + 9*4096, 4096)])
+        self.assertEqual(blocks[0][1], image[4096:8192])
+        self.assertEqual(len(queries), 1 + 16)
+
+        # Identical: one query, nothing to send.
+        queries.clear()
+        self.assertEqual(delta(image, base, lambda a, l: zlib.crc32(image[a - base:a - base + l]), 64*1024, 4096), [])
+
+    def test_merge(self):
+        blocks = [(0x2000, b"b"*0x1000), (0x1000, b"a"*0x1000), (0x4000, b"c"*16)]
+        self.assertEqual(merge(blocks), [(0x1000, b"a"*0x1000 + b"b"*0x1000), (0x4000, b"c"*16)])
+
+    def test_load_frames(self):
+        data   = bytes(range(256))*3
+        frames = list(load_frames(0x40000000, data))
+        self.assertEqual(len(frames), (len(data) + SFL_DATA_LENGTH - 1)//SFL_DATA_LENGTH)
+        self.assertEqual(frames[1].payload[:4], (0x40000000 + SFL_DATA_LENGTH).to_bytes(4, "big"))
+        self.assertEqual(b"".join(f.payload[4:] for f in frames), data)
+        self.assertTrue(all(len(f.payload) <= 255 for f in frames))
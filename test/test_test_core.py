@@ -0,0 +1,239 @@
+#
+# This file is part of Linux-on-LiteX-VexRiscv
+#
+# Copyright (c) 2019-2022, Linux-on-LiteX-VexRiscv Developers
+# SPDX-License-Identifier: BSD-2-Clause
+
+import unittest
+
+from migen import *
+
+from test_core_final.wb_send import RTLsend
+from test_core_final.wb_receive import RTLreceive
+from test_core_final import udp
+
+# Verilog Models -----------------------------------------------------------------------------------
+
+class DummyPlatform:
+    def add_source(self, filename):
+        pass
+
+class SendModel(Module):
+    """Migen model of send.v."""
+    def __init__(self, instance):
+        io = instance.get_io
+        out       = Signal(32)
+        out_valid = Signal()
+        wen       = Signal()
+        self.comb += [
+            wen.eq(io("tick") & io("input_buffer_empty") & (~out_valid | io("packet_out_ready"))),
+            io("packet_in_ready").eq(wen),
+            io("packet_out").eq(out),
+            io("packet_out_valid").eq(out_valid),
+        ]
+        self.sync += [
+            If(io("rst"),
+                out.eq(0),
+                out_valid.eq(0)
+            ).Elif(wen,
+                out.eq(io("packet_in")),
+                out_valid.eq(1)
+            ).Elif(io("packet_out_ready"),
+                out.eq(0),
+                out_valid.eq(0)
+            )
+        ]
+
+class ReceiveModel(Module):
+    """Migen model of receive.v."""
+    def __init__(self, instance):
+        io = instance.get_io
+        data  = Signal(32)
+        empty = Signal()
+        wen   = Signal()
+        self.comb += [
+            wen.eq(io("read_req") & io("packet_out_valid")),
+            io("packet_out_ready").eq(io("read_req")),
+            io("packet_in").eq(data),
+            io("input_buffer_empty").eq(empty),
+        ]
+        self.sync += [
+            If(io("rst"),
+                empty.eq(0),
+                data.eq(0)
+            ).Elif(wen,
+                empty.eq(1),
+                data.eq(io("packet_out"))
+            ).Else(
+                empty.eq(0),
+                data.eq(0)
+            )
+        ]
+
+class CoreInstance:
+    """Lowers the test_send/test_receive Verilog instances to their models (run_simulation
+    special_overrides)."""
+    @staticmethod
+    def lower(instance):
+        return {"test_send": SendModel, "test_receive": ReceiveModel}[instance.of](instance)
+
+def run(dut, generators):
+    top = Module()
+    top.clock_domains.cd_sys = ClockDomain()
+    top.submodules.dut = dut
+    run_simulation(top, generators, special_overrides={Instance: CoreInstance})
+
+# Wishbone Data Windows ----------------------------------------------------------------------------
+
+class TestWishbone(unittest.TestCase):
+    def test_send_backpressure(self):
+        dut = RTLsend(DummyPlatform(), with_wishbone=True, fifo_depth=4)
+        acks = []
+        def generator():
+            # Link stalled: the core holds one packet, the FIFO the next 4, then acks are refused.
+            yield dut.bus.cyc.eq(1)
+            yield dut.bus.stb.eq(1)
+            yield dut.bus.we.eq(1)
+            for i in range(8):
+                yield dut.bus.dat_w.eq(0x100 + i)
+                yield
+                acks.append((yield dut.bus.ack))
+            yield dut.bus.cyc.eq(0)
+            yield dut.bus.stb.eq(0)
+            yield
+            self.assertEqual(acks, [1]*5 + [0]*3)
+            self.assertEqual((yield dut.fifo.level), 4)
+            # Reads return the FIFO level.
+            self.assertEqual((yield from dut.bus.read(0)), 4)
+            # Link released: packets are output in order.
+            packets = []
+            yield dut.source.ready.eq(1)
+            for i in range(16):
+                yield
+                if (yield dut.source.valid):
+                    packets.append((yield dut.source.data))
+            self.assertEqual(packets, [0x100 + i for i in range(5)])
+            self.assertEqual((yield from dut.bus.read(0)), 0)
+        run(dut, generator())
+
+    def test_receive_pop(self):
+        dut = RTLreceive(DummyPlatform(), with_wishbone=True, fifo_depth=4)
+        def generator():
+            for i in range(3):
+                yield dut.sink.valid.eq(1)
+                yield dut.sink.data.eq(0x200 + i)
+                yield
+                while not (yield dut.sink.ready):
+                    yield
+            yield dut.sink.valid.eq(0)
+            for i in range(4):
+                yield
+            self.assertEqual((yield dut.fifo.level), 3)
+            # Each read pops one packet, reads from an empty FIFO return 0.
+            values = []
+            for i in range(4):
+                values.append((yield from dut.bus.read(0)))
+            self.assertEqual(values, [0x200, 0x201, 0x202, 0])
+            self.assertEqual((yield dut.fifo.level), 0)
+        run(dut, generator())
+
+# CSR Data Port ------------------------------------------------------------------------------------
+
+class TestCSR(unittest.TestCase):
+    def test_receive_pop(self):
+        # More packets than the FIFO depth through the CSR path: the link stalls while the FIFO
+        # is full and resumes as packets are popped, nothing is lost.
+        dut     = RTLreceive(DummyPlatform(), fifo_depth=4)
+        packets = [0x300 + i for i in range(20)]
+        received = []
+        def producer():
+            for p in packets:
+                yield dut.sink.valid.eq(1)
+                yield dut.sink.data.eq(p)
+                yield
+                while not (yield dut.sink.ready):
+                    yield
+            yield dut.sink.valid.eq(0)
+        def consumer():
+            for i in range(16):
+                yield
+            self.assertEqual((yield dut.status.fields.level), 4)
+            while len(received) < len(packets):
+                if (yield dut.status.fields.valid):
+                    received.append((yield dut.data.status))
+                    yield from dut.pop.write(1)
+                yield
+            for i in range(8):
+                yield
+            self.assertEqual((yield dut.status.fields.valid), 0)
+            self.assertEqual((yield dut.status.fields.level), 0)
+        run(dut, [producer(), consumer()])
+        self.assertEqual(received, packets)
+
+    def test_stream_and_pop(self):
+        # Back-to-back packets consumed by a stream sink: full rate.
+        dut     = RTLreceive(DummyPlatform(), fifo_depth=4)
+        packets = [0x400 + i for i in range(32)]
+        received = []
+        def producer():
+            for p in packets:
+                yield dut.sink.valid.eq(1)
+                yield dut.sink.data.eq(p)
+                yield
+                while not (yield dut.sink.ready):
+                    yield
+            yield dut.sink.valid.eq(0)
+        def consumer():
+            yield dut.source.ready.eq(1)
+            for i in range(len(packets) + 8):
+                yield
+                if (yield dut.source.valid):
+                    received.append((yield dut.source.data))
+        run(dut, [producer(), consumer()])
+        self.assertEqual(received, packets)
+
+# UDP Datagrams ------------------------------------------------------------------------------------
+
+class TestUDPFramer(unittest.TestCase):
+    def framer(self, bursts, packets_per_datagram=4, idle_timeout=16, ready=lambda cycle: 1):
+        dut       = udp.TestCoreUDPFramer(packets_per_datagram, idle_timeout)
+        datagrams = [[]]
+        def producer():
+            for burst, gap in bursts:
+                for p in burst:
+                    yield dut.sink.valid.eq(1)
+                    yield dut.sink.data.eq(p)
+                    yield
+                    while not (yield dut.sink.ready):
+                        yield
+                yield dut.sink.valid.eq(0)
+                for i in range(gap):
+                    yield
+        def consumer():
+            cycle = 0
+            while True:
+                yield dut.source.ready.eq(ready(cycle))
+                yield
+                cycle += 1
+                if (yield dut.source.valid) & (yield dut.source.ready):
+                    datagrams[-1].append((yield dut.source.data))
+                    if (yield dut.source.last):
+                        datagrams.append([])
+        run(dut, [producer(), passive(consumer)()])
+        return datagrams[:-1], datagrams[-1]
+
+    def test_full_datagrams(self):
+        datagrams, pending = self.framer([(list(range(8)), 0)])
+        self.assertEqual(datagrams, [[0, 1, 2, 3]])
+        # Last packet of the burst held: no more traffic and no idle cycles yet.
+        self.assertEqual(pending, [4, 5, 6])
+
+    def test_idle_flush(self):
+        # Low-rate traffic: partial datagrams are closed after idle_timeout cycles.
+        datagrams, pending = self.framer([([1, 2], 32), ([3], 32), (list(range(10, 16)), 32)])
+        self.assertEqual(datagrams, [[1, 2], [3], [10, 11, 12, 13], [14, 15]])
+        self.assertEqual(pending, [])
+
+    def test_backpressure(self):
+        datagrams, pending = self.framer([(list(range(10)), 64)], ready=lambda cycle: cycle % 3 == 0)
+        self.assertEqual(datagrams, [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]])
@@ -0,0 +1,39 @@
+#
+# This file is part of Linux-on-LiteX-VexRiscv
+#
+# Copyright (c) 2019-2022, Linux-on-LiteX-VexRiscv Developers
+# SPDX-License-Identifier: BSD-2-Clause
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from test_core_final.trace import write_trace, read_trace, TRACE_HEADER_DTYPE, TRACE_RECORD_DTYPE
+
+class TestTrace(unittest.TestCase):
+    def test_roundtrip(self):
+        with tempfile.TemporaryDirectory() as d:
+            filename = os.path.join(d, "test.trc")
+            data     = np.arange(1000, dtype=np.uint32)
+            write_trace(filename, data, cycles=10*np.arange(1000), clk_freq=int(50e6))
+            self.assertEqual(os.path.getsize(filename), 64 + 16*1000)
+            header, records = read_trace(filename)
+            self.assertEqual(header["clk_freq"], int(50e6))
+            self.assertEqual(header["count"],    1000)
+            np.testing.assert_array_equal(records["data"],  data)
+            np.testing.assert_array_equal(records["cycle"], 10*np.arange(1000))
+
+    def test_unfinalized_header(self):
+        # Interrupted recording: count is 0 in the header, derived from the file size.
+        with tempfile.TemporaryDirectory() as d:
+            filename = os.path.join(d, "test.trc")
+            write_trace(filename, [1, 2, 3])
+            with open(filename, "r+b") as f:
+                f.seek(TRACE_HEADER_DTYPE.fields["count"][1])
+                f.write(bytes(8))
+                f.seek(0, os.SEEK_END)
+                f.write(bytes(TRACE_RECORD_DTYPE.itemsize//2))
+            header, records = read_trace(filename)
+            self.assertEqual(list(records["data"]), [1, 2, 3])
@@ -20,6 +20,7 @@ module top #(
   
   wire [PK_W-1:0] pkg_o;
   wire pkg_o_valid;
+  wire pkg_o_ready;
   
   test_send #(.PACKET_WIDTH(PK_W)) send1
   (
@@ -31,7 +32,9 @@ module top #(
     .packet_in(packet_in),
 
     .packet_out(pkg_o),
-    .packet_out_valid(pkg_o_valid)
+    .packet_out_valid(pkg_o_valid),
+    .packet_out_ready(pkg_o_ready),
+    .packet_in_ready()
   );
   
   test_receive #(.PACKET_WIDTH(PK_W)) receive1
@@ -44,7 +47,8 @@ module top #(
     .packet_in(recv_packet_in),
     
     .packet_out(pkg_o),
-    .packet_out_valid(pkg_o_valid)
+    .packet_out_valid(pkg_o_valid),
+    .packet_out_ready(pkg_o_ready)
   );
     
 endmodule
@@ -0,0 +1,177 @@
+import os
+import re
+import json
+
+import numpy as np
+
+# Helpers ------------------------------------------------------------------------------------------
+
+def clog2(x):
+    return max(int(x) - 1, 0).bit_length()
+
+def field_dtype(width, signed):
+    """Smallest NumPy integer type (16-bit at least) holding a field of width bits."""
+    for dtype in ([np.int16, np.int32] if signed else [np.uint16, np.uint32]):
+        if np.iinfo(dtype).bits >= width:
+            return dtype
+    raise ValueError("Fields wider than 32 bits are not supported.")
+
+# Packet Layout ------------------------------------------------------------------------------------
+
+class PacketLayout:
+    """Test core packet layout: {dx, dy, axon, tick} packed MSB to LSB in PACKET_WIDTH bits.
+
+    Parameters match the test_send/test_receive Verilog parameters (PACKET_WIDTH must be 32). dx/dy
+    are signed (relative routing offsets), axon/tick are unsigned. Packets are handled as NumPy uint32 arrays and are
+    little-endian on the wire.
+    """
+    fields  = ["dx", "dy", "axon", "tick"]
+    signed  = ["dx", "dy"]
+
+    def __init__(self,
+        dx_msb       = 29,
+        dx_lsb       = 21,
+        dy_msb       = 20,
+        dy_lsb       = 12,
+        num_axons    = 256,
+        num_ticks    = 16,
+        packet_width = 32):
+        # Packets are 32-bit words everywhere (CSRs, Wishbone windows, packet link, UDP datagrams).
+        if packet_width != 32:
+            raise ValueError("Invalid packet width: {} (only 32-bit packets are supported).".format(packet_width))
+        self.dx_msb       = dx_msb
+        self.dx_lsb       = dx_lsb
+        self.dy_msb       = dy_msb
+        self.dy_lsb       = dy_lsb
+        self.num_axons    = num_axons
+        self.num_ticks    = num_ticks
+        self.packet_width = packet_width
+
+        tick_width = clog2(num_ticks)
+        axon_width = clog2(num_axons)
+        # Field name -> (lsb, width).
+        self.slices = {
+            "dx"   : (dx_lsb,     dx_msb - dx_lsb + 1),
+            "dy"   : (dy_lsb,     dy_msb - dy_lsb + 1),
+            "axon" : (tick_width, axon_width),
+            "tick" : (0,          tick_width),
+        }
+        used = 0
+        for name, (lsb, width) in self.slices.items():
+            mask = ((1 << width) - 1) << lsb
+            if width <= 0 or (used & mask) or (lsb + width) > packet_width:
+                raise ValueError("Invalid packet layout: {} field [{}:{}] overlaps or does not fit in {} bits.".format(
+                    name, lsb + width - 1, lsb, packet_width))
+            used |= mask
+        self.mask  = used
+        self.dtype = np.dtype([(name, field_dtype(self.slices[name][1], name in self.signed)) for name in self.fields])
+
+    # Verilog parameters, in PacketLayout arguments order.
+    parameters = ["DX_MSB", "DX_LSB", "DY_MSB", "DY_LSB", "NUM_AXONS", "NUM_TICKS", "PACKET_WIDTH"]
+
+    @classmethod
+    def from_verilog(cls, filename=os.path.join(os.path.dirname(__file__), "send.v"), **kwargs):
+        """Create the layout from the (non-commented) parameters of a test core Verilog file,
+        kwargs overriding them."""
+        params = {}
+        with open(filename) as f:
+            for line in f:
+                line = line.split("//")[0]
+                m = re.match(r"\s*parameter\s+(\w+)\s*=\s*(\d+)\s*,?\s*$", line)
+                if m is not None:
+                    params[m.group(1)] = int(m.group(2))
+        verilog_kwargs = {name.lower(): params[name] for name in cls.parameters if name in params}
+        verilog_kwargs.update(kwargs)
+        return cls(**verilog_kwargs)
+
+    @classmethod
+    def from_string(cls, s):
+        """Create the layout from "name=value,..." overrides of the Verilog parameters (e.g.
+        "num_axons=128,num_ticks=32")."""
+        kwargs = {}
+        for item in filter(None, s.split(",")):
+            name, _, value = item.partition("=")
+            name = name.strip().lower()
+            if name.upper() not in cls.parameters or not value:
+                raise ValueError("Invalid packet layout parameter: {} (expected name=value, name in {}).".format(
+                    item, ", ".join(p.lower() for p in cls.parameters)))
+            kwargs[name] = int(value, 0)
+        return cls.from_verilog(**kwargs)
+
+    @classmethod
+    def from_csr_json(cls, csr_json, prefix="test_core_"):
+        """Create the layout from the constants of a SoC csr.json (filename or dict), Verilog
+        parameters for the missing ones (SoCs built without test core constants)."""
+        if isinstance(csr_json, str):
+            with open(csr_json) as f:
+                csr_json = json.load(f)
+        constants = csr_json.get("constants", {})
+        kwargs    = {}
+        for name in cls.parameters:
+            if (prefix + name).lower() in constants:
+                kwargs[name.lower()] = int(constants[(prefix + name).lower()])
+        return cls.from_verilog(**kwargs)
+
+    def constants(self, prefix="TEST_CORE_"):
+        """SoC constants describing the layout (exported to csr.json, see from_csr_json)."""
+        return {prefix + name[len("p_"):]: value for name, value in self.verilog_parameters().items()}
+
+    def verilog_parameters(self):
+        """Instance parameters (p_XXX) for test_send/test_receive."""
+        return {
+            "p_DX_MSB"       : self.dx_msb,
+            "p_DX_LSB"       : self.dx_lsb,
+            "p_DY_MSB"       : self.dy_msb,
+            "p_DY_LSB"       : self.dy_lsb,
+            "p_NUM_AXONS"    : self.num_axons,
+            "p_NUM_TICKS"    : self.num_ticks,
+            "p_PACKET_WIDTH" : self.packet_width,
+        }
+
+    def field_range(self, name):
+        """(min, max) values of a field (inclusive)."""
+        lsb, width = self.slices[name]
+        if name in self.signed:
+            return -(1 << (width - 1)), (1 << (width - 1)) - 1
+        return 0, (1 << width) - 1
+
+    # Encode / Decode ------------------------------------------------------------------------------
+
+    def encode(self, dx=0, dy=0, axon=0, tick=0):
+        """Encode fields (scalars or arrays, broadcast together) to uint32 packets."""
+        values  = {"dx": dx, "dy": dy, "axon": axon, "tick": tick}
+        packets = np.zeros(np.broadcast(*[np.asarray(v) for v in values.values()]).shape, dtype=np.uint32)
+        for name, (lsb, width) in self.slices.items():
+            v = np.asarray(values[name], dtype=np.int64)
+            packets |= ((v & ((1 << width) - 1)) << lsb).astype(np.uint32)
+        return packets
+
+    def encode_array(self, fields):
+        """Encode a structured array (see dtype) to uint32 packets."""
+        return self.encode(**{name: fields[name] for name in self.fields})
+
+    def decode(self, packets):
+        """Decode uint32 packets to a structured array (see dtype)."""
+        packets = np.asarray(packets, dtype=np.uint32)
+        fields  = np.empty(packets.shape, dtype=self.dtype)
+        for name, (lsb, width) in self.slices.items():
+            v = (packets >> np.uint32(lsb)) & np.uint32((1 << width) - 1)
+            if name in self.signed:
+                v = v.astype(np.int32)
+                v = v - ((v >> (width - 1)) << width)
+            fields[name] = v
+        return fields
+
+    def random(self, n, rng=None):
+        """Generate n random valid packets (unused bits are 0)."""
+        rng = np.random.default_rng(rng)
+        return rng.integers(0, 1 << 32, size=n, dtype=np.uint32) & np.uint32(self.mask)
+
+    # Serialization --------------------------------------------------------------------------------
+
+    def to_bytes(self, packets):
+        return np.asarray(packets, dtype=np.uint32).astype("<u4").tobytes()
+
+    def from_bytes(self, data):
+        n = len(data)//4
+        return np.frombuffer(data, dtype="<u4", count=n).astype(np.uint32)
@@ -1,12 +1,12 @@
 module test_receive #(
     // parameter NUM_OUTPUTS = 256,
     // parameter NUM_NEURONS = 256,
-    // parameter NUM_AXONS = 256,
-    // parameter NUM_TICKS = 16,
-    // parameter DX_MSB = 29,
-    // parameter DX_LSB = 21,
-    // parameter DY_MSB = 20,
-    // parameter DY_LSB = 12,
+    parameter NUM_AXONS = 256,
+    parameter NUM_TICKS = 16,
+    parameter DX_MSB = 29,
+    parameter DX_LSB = 21,
+    parameter DY_MSB = 20,
+    parameter DY_LSB = 12,
     // parameter PACKET_WIDTH = (DX_MSB - DX_LSB + 1)+(DY_MSB - DY_LSB + 1)+$clog2(NUM_AXONS)+$clog2(NUM_TICKS)
     parameter PACKET_WIDTH = 32
 )(
@@ -18,6 +18,7 @@ module test_receive #(
     // output [$clog2(NUM_OUTPUTS)-1:0] packet_out,
     input [PACKET_WIDTH-1:0] packet_out,
     input packet_out_valid,
+    output packet_out_ready,
     // output ren_to_input_buffer,
     // output token_controller_error,
     // output scheduler_error
@@ -47,7 +48,8 @@ module test_receive #(
         end
     end
 
-    assign wen = read_req & (!empty) & packet_out_valid ;
+    assign wen = read_req & packet_out_valid ;
+    assign packet_out_ready = read_req;
     assign packet_in = in;
     assign input_buffer_empty = empty;
 
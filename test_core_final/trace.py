@@ -0,0 +1,79 @@
+import os
+
+import numpy as np
+
+# Packet Trace Format ------------------------------------------------------------------------------
+#
+# Little-endian binary file: a 64-byte header followed by fixed-size 16-byte records, so a trace
+# can be memory-mapped as a NumPy structured array (see sim_modules/packettrace for the simulation
+# recorder/replayer).
+#
+# Header: magic (8 bytes), version (u32), header_size (u32), record_size (u32), packet_width (u32),
+#         clk_freq (u64, Hz), count (u64, 0 when unknown: derived from the file size), reserved.
+# Record: cycle (u64, sys_clk cycle of the packet), data (u32), flags (u32, reserved).
+
+TRACE_MAGIC   = b"LXPKTTRC"
+TRACE_VERSION = 1
+
+TRACE_HEADER_DTYPE = np.dtype([
+    ("magic",        "S8"),
+    ("version",      "<u4"),
+    ("header_size",  "<u4"),
+    ("record_size",  "<u4"),
+    ("packet_width", "<u4"),
+    ("clk_freq",     "<u8"),
+    ("count",        "<u8"),
+    ("reserved",     "V24"),
+])
+
+TRACE_RECORD_DTYPE = np.dtype([
+    ("cycle", "<u8"),
+    ("data",  "<u4"),
+    ("flags", "<u4"),
+])
+
+assert TRACE_HEADER_DTYPE.itemsize == 64
+assert TRACE_RECORD_DTYPE.itemsize == 16
+
+# Read / Write -------------------------------------------------------------------------------------
+
+def write_trace(filename, data, cycles=None, clk_freq=int(100e6), packet_width=32):
+    """Write packets (and their cycles, back-to-back when None) to a trace file."""
+    data    = np.asarray(data, dtype=np.uint32)
+    records = np.zeros(data.shape[0], dtype=TRACE_RECORD_DTYPE)
+    records["data"]  = data
+    records["cycle"] = np.arange(data.shape[0]) if cycles is None else cycles
+    if np.any(np.diff(records["cycle"].astype(np.int64)) < 0):
+        raise ValueError("Trace cycles must be monotonic.")
+    header = np.zeros(1, dtype=TRACE_HEADER_DTYPE)
+    header["magic"]        = TRACE_MAGIC
+    header["version"]      = TRACE_VERSION
+    header["header_size"]  = TRACE_HEADER_DTYPE.itemsize
+    header["record_size"]  = TRACE_RECORD_DTYPE.itemsize
+    header["packet_width"] = packet_width
+    header["clk_freq"]     = clk_freq
+    header["count"]        = records.shape[0]
+    with open(filename, "wb") as f:
+        f.write(header.tobytes())
+        f.write(records.tobytes())
+
+def read_trace(filename, mode="r"):
+    """Return (header, records) of a trace file, records are memory-mapped."""
+    header = np.fromfile(filename, dtype=TRACE_HEADER_DTYPE, count=1)
+    if header.shape[0] != 1 or header["magic"][0] != TRACE_MAGIC:
+        raise ValueError("{} is not a packet trace.".format(filename))
+    header = header[0]
+    if header["version"] != TRACE_VERSION or header["record_size"] != TRACE_RECORD_DTYPE.itemsize:
+        raise ValueError("Unsupported packet trace version {}.".format(header["version"]))
+    # Count from the file size when the header was not finalized (interrupted recording).
+    count = (os.path.getsize(filename) - int(header["header_size"]))//TRACE_RECORD_DTYPE.itemsize
+    if header["count"]:
+        count = min(count, int(header["count"]))
+    if count == 0:
+        return header, np.zeros(0, dtype=TRACE_RECORD_DTYPE)
+    records = np.memmap(filename,
+        dtype  = TRACE_RECORD_DTYPE,
+        mode   = mode,
+        offset = int(header["header_size"]),
+        shape  = (count,))
+    return header, records
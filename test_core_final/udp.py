@@ -0,0 +1,81 @@
+from migen import *
+
+from litex.soc.interconnect import stream
+
+from liteeth.frontend.stream import LiteEthUDPStreamer
+
+class TestCoreUDPFramer(Module):
+    """Groups the `sink` packets into datagrams on `source` (`last` on the datagram last packet).
+
+    A datagram is closed every `packets_per_datagram` packets, or after `idle_timeout` cycles
+    without new packet: the last packet received is held until the next one (or the timeout) to
+    know if it ends the datagram, so partial bursts are sent without waiting for more traffic.
+    """
+    def __init__(self, packets_per_datagram=64, idle_timeout=1024):
+        self.sink   = sink   = stream.Endpoint([("data", 32)])
+        self.source = source = stream.Endpoint([("data", 32)])
+
+        count      = Signal(max=max(packets_per_datagram, 2))
+        idle       = Signal(max=idle_timeout + 1)
+        flush      = Signal()
+        held_valid = Signal()
+        held_data  = Signal(32)
+        self.comb += [
+            flush.eq(idle == idle_timeout),
+            # The held packet is output when the next one arrives (or on flush).
+            source.valid.eq(held_valid & (sink.valid | flush)),
+            source.data.eq(held_data),
+            source.last.eq((count == (packets_per_datagram - 1)) | flush),
+            sink.ready.eq(~held_valid | (source.ready & sink.valid)),
+        ]
+        self.sync += [
+            If(source.valid & source.ready,
+                held_valid.eq(0),
+                count.eq(count + 1),
+                If(source.last,
+                    count.eq(0)
+                )
+            ),
+            If(sink.valid & sink.ready,
+                held_valid.eq(1),
+                held_data.eq(sink.data)
+            ),
+            If((sink.valid & sink.ready) | ~held_valid,
+                idle.eq(0)
+            ).Elif(~flush,
+                idle.eq(idle + 1)
+            )
+        ]
+
+class TestCoreUDP(Module):
+    """Bridges the test core packet streams to a LiteEth hardware UDP/IP stack.
+
+    Packets from `sink` are sent to `ip_address:udp_port` (little-endian 32-bit words, up to
+    `packets_per_datagram` per datagram, partial datagrams sent after `idle_timeout` idle cycles),
+    packets received on `udp_port` are output on `source`.
+    """
+    def __init__(self, udp, ip_address, udp_port, packets_per_datagram=64, idle_timeout=1024):
+        self.sink   = sink   = stream.Endpoint([("data", 32)])
+        self.source = source = stream.Endpoint([("data", 32)])
+
+        self.submodules.streamer = streamer = LiteEthUDPStreamer(udp,
+            ip_address    = ip_address,
+            udp_port      = udp_port,
+            rx_fifo_depth = 4*packets_per_datagram,
+            tx_fifo_depth = 4*packets_per_datagram)
+        self.submodules.framer  = framer  = TestCoreUDPFramer(packets_per_datagram, idle_timeout)
+        self.submodules.tx_conv = tx_conv = stream.Converter(32, 8)
+        self.submodules.rx_conv = rx_conv = stream.Converter(8, 32)
+
+        # TX: datagrams closed by the framer (or when the TX FIFO is full).
+        self.comb += [
+            sink.connect(framer.sink),
+            framer.source.connect(tx_conv.sink),
+            tx_conv.source.connect(streamer.sink, keep={"valid", "ready", "last", "data"}),
+        ]
+
+        # RX.
+        self.comb += [
+            streamer.source.connect(rx_conv.sink, keep={"valid", "ready", "last", "data"}),
+            rx_conv.source.connect(source, keep={"valid", "ready", "data"}),
+        ]
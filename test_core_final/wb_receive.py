@@ -1,50 +1,92 @@
+import os
+
 from migen import *
 
 from litex.soc.interconnect.csr import *
 # need interrupt handle?
 from litex.soc.interconnect.csr_eventmanager import *
+from litex.soc.interconnect import wishbone
+from litex.soc.interconnect import stream
 
 from litex.soc.integration.doc import AutoDoc, ModuleDoc
 
 class RTLreceive (Module, AutoCSR, AutoDoc):
-    def __init__(self, platform):
+    def __init__(self, platform, with_wishbone=False, fifo_depth=16, layout=None):
         self.intro = ModuleDoc(""" test_send core""")
         self.control = CSRStorage(fields=[
-            CSRField("read_req", size=1, description="packet read request"),
+            CSRField("read_req", size=1, description="unused: packets are accepted while the packet FIFO has room"),
             CSRField("reset", size=1, description="reset control",)
         ])
-        self.status = CSRStatus(size=1, fields = [
-            CSRField("empty", size=1, description="receive input buffer empty")
+        fifo_depth = max(fifo_depth, 4)
+        self.status = CSRStatus(fields=[
+            CSRField("empty", size=1, description="receive input buffer empty"),
+            CSRField("valid", size=1, description="packet available in packet_in"),
+            CSRField("level", size=bits_for(fifo_depth), description="packet FIFO level"),
         ])
-        self.data = CSRStatus(32, reset=0x0, name="packet_in", description="packet_in" )
+        self.data = CSRStatus(32, reset=0x0, name="packet_in", description="packet_in (packet FIFO head)" )
+        self.pop  = CSR(name="pop")
 
+        PACKET_WIDTH = 32
         read_req = Signal()
         input_buffer_empty = Signal()
         core_reset = Signal()
+        self.comb += core_reset.eq(self.control.fields.reset)
+
+        self.comb += self.status.fields.empty.eq(input_buffer_empty)
+
+        packet_in = Signal(PACKET_WIDTH)
+
+        # Received packets stream: packets are buffered in a FIFO and the core only accepts new
+        # packets from the link while the FIFO can absorb the one in flight.
+        self.source = source = stream.Endpoint([("data", PACKET_WIDTH)])
+        self.submodules.fifo = fifo = ResetInserter()(stream.SyncFIFO([("data", PACKET_WIDTH)], fifo_depth))
         self.comb += [
-            read_req.eq(self.control.fields.read_req),
-            core_reset.eq(self.control.fields.reset),
+            fifo.reset.eq(core_reset),
+            read_req.eq((fifo.level + input_buffer_empty) < fifo.depth),
+            fifo.sink.valid.eq(input_buffer_empty),
+            fifo.sink.data.eq(packet_in),
+            source.valid.eq(fifo.source.valid),
+            source.data.eq(fifo.source.data),
+            fifo.source.ready.eq(source.ready | self.pop.re),
         ]
 
-        self.status.fields.empty.eq(input_buffer_empty),
-
-        packet_in = Signal()
+        # CSR data port: packet_in shows the FIFO head, writing pop removes it.
         self.comb += [
-            self.data.status.eq(packet_in)
+            self.status.fields.valid.eq(fifo.source.valid),
+            self.status.fields.level.eq(fifo.level),
+            If(fifo.source.valid,
+                self.data.status.eq(fifo.source.data)
+            )
         ]
 
-        PACKET_WIDTH = 32    
-        self.packet_out = Signal()
-        self.packet_out_valid = Signal()
-        self.specials += Instance("test_receive",
-            p_PACKET_WIDTH = PACKET_WIDTH,
+        # Wishbone data port: each read anywhere in the window pops one packet (bursts are acked
+        # every cycle). Reads from an empty FIFO return 0, software should check the status level
+        # first.
+        if with_wishbone:
+            self.bus = wishbone.Interface(data_width=32)
+            self.comb += [
+                If(source.valid,
+                    self.bus.dat_r.eq(source.data)
+                ),
+                If(self.bus.cyc & self.bus.stb,
+                    self.bus.ack.eq(1),
+                    source.ready.eq(~self.bus.we)
+                )
+            ]
+
+        # Packet link stream (valid/ready).
+        self.sink = sink = stream.Endpoint([("data", PACKET_WIDTH)])
+        # Packet field layout parameters (see packet.PacketLayout, 32-bit packets), Verilog defaults when None.
+        layout_params = {} if layout is None else layout.verilog_parameters()
+        self.specials += Instance("test_receive", **layout_params,
             i_clk = ClockSignal(),
             i_rst = ResetSignal() | core_reset,
             i_read_req = read_req,
             o_input_buffer_empty = input_buffer_empty,
             o_packet_in = packet_in,
-            i_packet_out = self.packet_out,
-            i_packet_out_valid = self.packet_out_valid,
+            i_packet_out = sink.data,
+            i_packet_out_valid = sink.valid,
+            o_packet_out_ready = sink.ready,
             )
 
-        platform.add_source("./receive.v")
+        platform.add_source(os.path.join(os.path.dirname(__file__), "receive.v"))
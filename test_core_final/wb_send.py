@@ -1,13 +1,17 @@
+import os
+
 from migen import *
 
 from litex.soc.interconnect.csr import *
 # need interrupt handle?
 from litex.soc.interconnect.csr_eventmanager import *
+from litex.soc.interconnect import wishbone
+from litex.soc.interconnect import stream
 
 from litex.soc.integration.doc import AutoDoc, ModuleDoc
 
 class RTLsend (Module, AutoCSR, AutoDoc):
-    def __init__(self, platform):
+    def __init__(self, platform, with_wishbone=False, fifo_depth=16, layout=None):
         self.intro = ModuleDoc(""" test_send core""")
         self.control = CSRStorage(fields=[
             CSRField("tick", size=1, description="enable tick"),
@@ -16,6 +20,7 @@ class RTLsend (Module, AutoCSR, AutoDoc):
         ])
         self.data = CSRStorage(32, reset=0x0, name="packet_in", description="packet_in" )
 
+        PACKET_WIDTH = 32
         tick = Signal()
         input_buffer_empty = Signal()
         core_reset = Signal()
@@ -25,23 +30,62 @@ class RTLsend (Module, AutoCSR, AutoDoc):
             core_reset.eq(self.control.fields.reset),
         ]
 
-        packet_in = Signal()
+        packet_in = Signal(PACKET_WIDTH)
         self.comb += [
             packet_in.eq(self.data.storage)
         ]
 
-        PACKET_WIDTH = 32    
-        self.packet_out = Signal()
-        self.packet_out_valid = Signal()
-        self.specials += Instance("test_send",
-            p_PACKET_WIDTH = PACKET_WIDTH,
+        # Packet input stream: when valid, it takes precedence over the CSR tick/packet_in.
+        self.sink = sink = stream.Endpoint([("data", PACKET_WIDTH)])
+        packet_in_ready = Signal()
+        self.comb += [
+            If(sink.valid,
+                tick.eq(1),
+                input_buffer_empty.eq(1),
+                packet_in.eq(sink.data)
+            ),
+            sink.ready.eq(packet_in_ready)
+        ]
+
+        # Wishbone data port: packets written anywhere in the window are queued in a FIFO and
+        # injected back-to-back into the core, bursts are acked every cycle while the FIFO has
+        # room. Reads return the FIFO level.
+        if with_wishbone:
+            self.bus    = wishbone.Interface(data_width=32)
+            self.status = CSRStatus(fields=[
+                CSRField("level", size=bits_for(fifo_depth), description="packet FIFO level")
+            ])
+            self.submodules.fifo = fifo = ResetInserter()(stream.SyncFIFO([("data", PACKET_WIDTH)], fifo_depth))
+            self.comb += [
+                fifo.reset.eq(core_reset),
+                self.status.fields.level.eq(fifo.level),
+                fifo.sink.data.eq(self.bus.dat_w),
+                self.bus.dat_r.eq(fifo.level),
+                If(self.bus.cyc & self.bus.stb,
+                    If(self.bus.we,
+                        fifo.sink.valid.eq(1),
+                        self.bus.ack.eq(fifo.sink.ready)
+                    ).Else(
+                        self.bus.ack.eq(1)
+                    )
+                ),
+                fifo.source.connect(sink)
+            ]
+
+        # Packet link stream (valid/ready).
+        self.source = source = stream.Endpoint([("data", PACKET_WIDTH)])
+        # Packet field layout parameters (see packet.PacketLayout, 32-bit packets), Verilog defaults when None.
+        layout_params = {} if layout is None else layout.verilog_parameters()
+        self.specials += Instance("test_send", **layout_params,
             i_clk = ClockSignal(),
             i_rst = ResetSignal() | core_reset,
             i_tick = tick,
             i_input_buffer_empty = input_buffer_empty,
             i_packet_in = packet_in,
-            o_packet_out = self.packet_out,
-            o_packet_out_valid = self.packet_out_valid,
+            o_packet_out = source.data,
+            o_packet_out_valid = source.valid,
+            i_packet_out_ready = source.ready,
+            o_packet_in_ready = packet_in_ready,
             )
 
-        platform.add_source("./send.v")
+        platform.add_source(os.path.join(os.path.dirname(__file__), "send.v"))
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+
+#
+# This file is part of Linux-on-LiteX-VexRiscv
+#
+# Copyright (c) 2019-2022, Linux-on-LiteX-VexRiscv Developers
+# SPDX-License-Identifier: BSD-2-Clause
+
+import time
+import socket
+import argparse
+
+import numpy as np
+
+from test_core_final.packet import PacketLayout
+from test_core_final.trace import write_trace
+
+# Test core packets are sent as little-endian 32-bit words, several packets per datagram.
+
+# Receive ------------------------------------------------------------------------------------------
+
+def receive(sock, layout, interval, duration, verbose, record=None, clk_freq=int(100e6)):
+    captures  = []
+    start     = time.time()
+    last      = start
+    packets   = 0
+    datagrams = 0
+    total     = 0
+    sock.settimeout(interval)
+    try:
+        while duration == 0 or (time.time() - start) < duration:
+            try:
+                datagram, address = sock.recvfrom(65536)
+                words = layout.from_bytes(datagram)
+                if record is not None:
+                    captures.append((time.time() - start, words))
+                packets   += len(words)
+                datagrams += 1
+                if verbose:
+                    for w, f in zip(words, layout.decode(words)):
+                        print("{}: 0x{:08x} dx={} dy={} axon={} tick={}".format(address[0], w, *f))
+            except socket.timeout:
+                pass
+            now = time.time()
+            if (now - last) >= interval:
+                print("{:8.1f}s: {:10.0f} packets/s, {:8.0f} datagrams/s, {:8.3f} Mbps".format(
+                    now - start, packets/(now - last), datagrams/(now - last), 32*packets/(now - last)/1e6))
+                total    += packets
+                packets   = 0
+                datagrams = 0
+                last      = now
+    except KeyboardInterrupt:
+        pass
+    total += packets
+    print("Received {} packets in {:.1f}s.".format(total, time.time() - start))
+
+    # Record to a packet trace (datagram arrival time converted to sys_clk cycles), that can be
+    # replayed in simulation with sim.py --packet-replay.
+    if record is not None:
+        cycles = [np.full(len(words), int(t*clk_freq), dtype=np.uint64) for t, words in captures]
+        data   = [words for t, words in captures]
+        write_trace(record,
+            data     = np.concatenate(data)   if data   else [],
+            cycles   = np.concatenate(cycles) if cycles else [],
+            clk_freq = clk_freq)
+        print("Recorded {} packets to {}.".format(total, record))
+
+# Send ---------------------------------------------------------------------------------------------
+
+def send(sock, layout, address, count, packets_per_datagram, rate):
+    start = time.time()
+    sent  = 0
+    rng   = np.random.default_rng(0)
+    while count == 0 or sent < count:
+        n = packets_per_datagram if count == 0 else min(packets_per_datagram, count - sent)
+        sock.sendto(layout.to_bytes(layout.random(n, rng)), address)
+        sent += n
+        if rate:
+            delay = start + sent/rate - time.time()
+            if delay > 0:
+                time.sleep(delay)
+    duration = time.time() - start
+    print("Sent {} packets in {:.1f}s ({:.0f} packets/s).".format(sent, duration, sent/duration if duration else 0))
+
+# Main ---------------------------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Test core UDP packet link host tool.")
+    parser.add_argument("--port",     default=2000, type=int,   help="UDP port.")
+    parser.add_argument("--send",     default=None,             help="Send packets to the SoC at this IP address (default: receive).")
+    parser.add_argument("--count",    default=0,    type=int,   help="Packets to send (0 for infinite).")
+    parser.add_argument("--batch",    default=64,   type=int,   help="Packets per datagram when sending.")
+    parser.add_argument("--rate",     default=0,    type=float, help="Send rate in packets/s (0 for unlimited).")
+    parser.add_argument("--interval", default=1.0,  type=float, help="Receive statistics interval in seconds.")
+    parser.add_argument("--duration", default=0,    type=float, help="Receive duration in seconds (0 for infinite).")
+    parser.add_argument("--record",   default=None,             help="Record received packets to a packet trace file.")
+    parser.add_argument("--clk-freq", default=100e6, type=float, help="SoC clock frequency used for the trace timing.")
+    parser.add_argument("--csr-json", default=None,             help="SoC csr.json (packet layout, default: Verilog parameters).")
+    parser.add_argument("--verbose",  action="store_true",      help="Print received packets.")
+    args = parser.parse_args()
+
+    layout = PacketLayout.from_verilog() if args.csr_json is None else PacketLayout.from_csr_json(args.csr_json)
+    sock   = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        if args.send is not None:
+            send(sock, layout, (args.send, args.port), args.count, args.batch, args.rate)
+        else:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1<<22)
+            sock.bind(("", args.port))
+            receive(sock, layout, args.interval, args.duration, args.verbose, args.record, int(args.clk_freq))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()